@@ -12,7 +12,7 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 # Импортируем наши модели и конфигурацию
 from app.core.config import settings
 from app.models.base import Base
-from app.models import user, patient, medical, room  # Импортируем все модели
+from app.models import user, patient, medical, room, bracelet_vitals  # Импортируем все модели
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,92 @@
+"""add bracelet vitals samples and rollups
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "a7b8c9d0e1f2"
+down_revision = "f6a7b8c9d0e1"
+branch_labels = None
+depends_on = None
+
+_METRIC_COLUMNS = (
+    "pulse",
+    "spo2",
+    "temp",
+    "respiration",
+    "press",
+    "hrv",
+    "stress",
+    "sleep",
+    "battery",
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    if "bracelet_samples" not in tables:
+        op.create_table(
+            "bracelet_samples",
+            sa.Column("id", sa.BigInteger(), nullable=False),
+            sa.Column("ts", sa.DateTime(), nullable=False),
+            sa.Column("ble_mac", sa.String(length=32), nullable=False),
+            sa.Column("patient_id", sa.Integer(), nullable=True),
+            *[sa.Column(name, sa.Float(), nullable=True) for name in _METRIC_COLUMNS],
+            sa.ForeignKeyConstraint(["patient_id"], ["patients.id"], ondelete="SET NULL"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_bracelet_samples_patient_ts", "bracelet_samples", ["patient_id", "ts"])
+        op.create_index("ix_bracelet_samples_mac_ts", "bracelet_samples", ["ble_mac", "ts"])
+        op.create_index("ix_bracelet_samples_ts", "bracelet_samples", ["ts"])
+
+    if "bracelet_rollups" not in tables:
+        op.create_table(
+            "bracelet_rollups",
+            sa.Column("id", sa.BigInteger(), nullable=False),
+            sa.Column("patient_id", sa.Integer(), nullable=False),
+            sa.Column("metric", sa.String(length=16), nullable=False),
+            sa.Column("resolution", sa.SmallInteger(), nullable=False),
+            sa.Column("bucket_start", sa.DateTime(), nullable=False),
+            sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("sum", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("min", sa.Float(), nullable=False),
+            sa.Column("max", sa.Float(), nullable=False),
+            sa.Column("last", sa.Float(), nullable=False),
+            sa.ForeignKeyConstraint(["patient_id"], ["patients.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint(
+                "patient_id",
+                "metric",
+                "resolution",
+                "bucket_start",
+                name="uq_bracelet_rollups_bucket",
+            ),
+        )
+        op.create_index(
+            "ix_bracelet_rollups_resolution_bucket",
+            "bracelet_rollups",
+            ["resolution", "bucket_start"],
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = inspector.get_table_names()
+
+    if "bracelet_rollups" in tables:
+        op.drop_index("ix_bracelet_rollups_resolution_bucket", table_name="bracelet_rollups")
+        op.drop_table("bracelet_rollups")
+    if "bracelet_samples" in tables:
+        op.drop_index("ix_bracelet_samples_ts", table_name="bracelet_samples")
+        op.drop_index("ix_bracelet_samples_mac_ts", table_name="bracelet_samples")
+        op.drop_index("ix_bracelet_samples_patient_ts", table_name="bracelet_samples")
+        op.drop_table("bracelet_samples")
@@ -0,0 +1,54 @@
+"""unique bracelet sample per device and timestamp
+
+Revision ID: c9d0e1f2a3b4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "c9d0e1f2a3b4"
+down_revision = "b8c9d0e1f2a3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "bracelet_samples" not in inspector.get_table_names():
+        return
+    indexes = {index["name"] for index in inspector.get_indexes("bracelet_samples")}
+    if "uq_bracelet_samples_mac_ts" in indexes:
+        return
+
+    # Повторы одного замера (ble_mac, ts) до уникального индекса: оставляем первую строку
+    op.execute(
+        """
+        DELETE FROM bracelet_samples a
+        USING bracelet_samples b
+        WHERE a.ble_mac = b.ble_mac AND a.ts = b.ts AND a.id > b.id
+        """
+    )
+    op.create_index(
+        "uq_bracelet_samples_mac_ts",
+        "bracelet_samples",
+        ["ble_mac", "ts"],
+        unique=True,
+    )
+    if "ix_bracelet_samples_mac_ts" in indexes:
+        op.drop_index("ix_bracelet_samples_mac_ts", table_name="bracelet_samples")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "bracelet_samples" not in inspector.get_table_names():
+        return
+    indexes = {index["name"] for index in inspector.get_indexes("bracelet_samples")}
+    if "ix_bracelet_samples_mac_ts" not in indexes:
+        op.create_index("ix_bracelet_samples_mac_ts", "bracelet_samples", ["ble_mac", "ts"])
+    if "uq_bracelet_samples_mac_ts" in indexes:
+        op.drop_index("uq_bracelet_samples_mac_ts", table_name="bracelet_samples")
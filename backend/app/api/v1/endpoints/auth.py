@@ -18,8 +18,9 @@ class LoginRequest(BaseModel):
     
 router = APIRouter(tags=["Authentication"])
 
+# Обычный def: bcrypt и синхронная Session выполняются в пуле потоков, не в event loop
 @router.post("/login", response_model=Token)
-async def login_for_access_token(
+def login_for_access_token(
     login_request: LoginRequest,
     db: Session = Depends(get_db)
 ):
@@ -41,7 +42,7 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.post("/register", response_model=dict)
-async def register_user(
+def register_user(
     user: UserCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
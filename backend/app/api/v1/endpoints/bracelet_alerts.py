@@ -1,5 +1,8 @@
 """API мониторинга браслетов и оповещений."""
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app.bracelet_alerts.assignment import (
@@ -17,8 +20,11 @@ from app.bracelet_alerts.patient_thresholds import (
     update_patient_thresholds,
 )
 from app.bracelet_alerts.service import BraceletAlertService
+from app.bracelet_alerts.downsample import DOWNSAMPLE_MODES
 from app.bracelet_alerts.threshold_resolver import default_thresholds_dict
+from app.bracelet_alerts.thresholds import BRACELET_THRESHOLDS, CANONICAL_METRICS
 from app.bracelet_alerts.types import PatientBraceletSnapshot
+from app.bracelet_alerts.vitals_history import canonical_metric, get_trend_series
 from app.core.config import settings
 from app.core.database import get_db
 from app.deps import get_current_active_user
@@ -29,6 +35,7 @@ from app.schemas.bracelet_alerts import (
     BraceletAssignmentPair,
     BraceletCheckResponse,
     BraceletOverviewResponse,
+    BraceletTrendResponse,
     DistributeBraceletsResponse,
     MetricThresholdValues,
     PatientBraceletView,
@@ -41,6 +48,9 @@ from app.schemas.bracelet_alerts import (
 
 router = APIRouter(prefix="/bracelet-alerts", tags=["Bracelet Alerts"])
 
+TREND_DEFAULT_WINDOW = timedelta(hours=6)
+TREND_MAX_POINTS = 2000
+
 
 def _snapshot_to_view(snap: PatientBraceletSnapshot) -> PatientBraceletView:
     return PatientBraceletView(
@@ -133,15 +143,60 @@ def delete_patient_thresholds(
     return _thresholds_response(clear_patient_thresholds(db, patient))
 
 
-@router.get("/overview", response_model=BraceletOverviewResponse)
-def bracelet_overview(
+def _utc_naive(value: datetime) -> datetime:
+    """История пишется в naive UTC; время с зоной приводим к нему."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@router.get("/patients/{patient_id}/trend", response_model=BraceletTrendResponse)
+def get_patient_vitals_trend(
+    patient_id: int,
+    metric: str = Query(..., description="Каноническая метрика или её алиас (pulse, spo2, temp, …)"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    points: int = Query(500, ge=10, le=TREND_MAX_POINTS),
+    mode: str = Query("lttb", description="lttb — форма графика, minmax — выбросы"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ):
+    """Тренд показателя пациента: не больше ``points`` точек при любой длине окна."""
     _require_nurse_or_admin(current_user)
-    service = BraceletAlertService()
+    canonical = canonical_metric(metric)
+    if canonical not in CANONICAL_METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric: {metric}")
+    if mode not in DOWNSAMPLE_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode: {mode}")
+    end = _utc_naive(end) if end else datetime.utcnow()
+    start = _utc_naive(start) if start else end - TREND_DEFAULT_WINDOW
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be earlier than 'to'")
+    if not get_patient_or_none(db, patient_id):
+        raise HTTPException(status_code=404, detail="Patient not found")
+
+    series = get_trend_series(db, patient_id, canonical, start, end, points, mode)
+    threshold = BRACELET_THRESHOLDS.get(canonical)
+    return BraceletTrendResponse(
+        patient_id=patient_id,
+        metric=canonical,
+        unit=threshold.unit if threshold else "",
+        mode=mode,
+        resolution=series.resolution,
+        source_points=series.source_points,
+        timestamps=series.timestamps,
+        values=series.values,
+    )
+
+
+def build_bracelet_overview(
+    db: Session,
+    service: Optional[BraceletAlertService] = None,
+) -> BraceletOverviewResponse:
+    """Обзор браслетов (REST и WS-поток ``bracelets``; поток передаёт свой ``service``)."""
+    service = service or BraceletAlertService()
     result = service.get_overview(db)
-    notifier = MaxBotNotifier()
+    notifier = service.notifier
     unassigned_raw, _, unassigned_err = get_unassigned_devices(db)
     patients_without_mac = sum(1 for s in result.snapshots if not s.ble_mac)
     overview_error = result.error or unassigned_err
@@ -168,6 +223,15 @@ def bracelet_overview(
     )
 
 
+@router.get("/overview", response_model=BraceletOverviewResponse)
+def bracelet_overview(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    _require_nurse_or_admin(current_user)
+    return build_bracelet_overview(db)
+
+
 @router.delete("/patients/{patient_id}/bracelet", response_model=UnassignBraceletResponse)
 def unassign_bracelet(
     patient_id: int,
@@ -236,10 +300,12 @@ def bracelet_check_now(
         alerts_found=result.alerts_found,
         alerts_sent=result.alerts_sent,
         alerts_skipped_dedup=result.alerts_skipped_dedup,
+        alerts_queued=result.alerts_queued,
         monitoring_connected=result.monitoring_connected,
         message=(
             f"Найдено отклонений: {result.alerts_found}, "
-            f"отправлено в MAX: {result.alerts_sent}"
+            f"отправлено в MAX: {result.alerts_sent}, "
+            f"в очереди MAX: {result.alerts_queued}"
         ),
     )
 
@@ -10,12 +10,14 @@ router = APIRouter(prefix="/1c", tags=["Integration"])
 
 @router.post("/sync")
 def sync_with_1c_endpoint(
+    dry_run: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    """Импорт из 1С; ``dry_run=true`` — только разница (``diff``) без записи в БД."""
     if current_user.role not in (UserRole.ADMIN, UserRole.NURSE):
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    result = sync_with_1c(db)
+    result = sync_with_1c(db, dry_run=dry_run)
     return result
 
 
@@ -1,13 +1,15 @@
 from datetime import date, datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
-from sqlalchemy import desc
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.deps import get_current_user, require_auth_or_public_display
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
+from app.core.etag import conditional_get, row_version_async
 from app.schemas.user import User
 from app.core.websocket_manager import manager
 
@@ -48,14 +50,14 @@ from app.services.prescription_package_service import (
 
 # ✅ CRUD функции
 from app.crud.medical import (
-    get_observations_by_patient,
-    create_observation,
-    update_observation_in_db,
-    delete_observation_from_db,
-    get_procedures_by_patient,
-    update_procedure_status,
-    create_procedure,
-    get_appointments_by_patient
+    get_observations_by_patient_async,
+    create_observation_async,
+    update_observation_in_db_async,
+    delete_observation_from_db_async,
+    get_procedures_by_patient_async,
+    update_procedure_status_async,
+    create_procedure_async,
+    get_appointments_by_patient_async
 )
 
 router = APIRouter(tags=["Medical"])
@@ -68,41 +70,41 @@ class ProcedureStatusUpdate(BaseModel):
 @router.get("/observations/{patient_id}", response_model=List[Observation])
 async def get_observations(
     patient_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    observations = get_observations_by_patient(db, patient_id)
+    observations = await get_observations_by_patient_async(db, patient_id)
     return observations
 
 @router.post("/observations", response_model=Observation)
-async def add_observation(observation: ObservationCreate, db: Session = Depends(get_db), current_user= Depends(get_current_user)):
-    return create_observation(db, observation, current_user.id)
+async def add_observation(observation: ObservationCreate, db: AsyncSession = Depends(get_async_db), current_user= Depends(get_current_user)):
+    return await create_observation_async(db, observation, current_user.id)
 
 @router.put("/observations/{observation_id}", response_model=Observation)
 async def update_observation(
     observation_id: int,
     observation_update: ObservationUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    return update_observation_in_db(db, observation_id, observation_update, current_user.id)
+    return await update_observation_in_db_async(db, observation_id, observation_update, current_user.id)
 
 @router.delete("/observations/{observation_id}", response_model=dict)
 async def delete_observation(
     observation_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    delete_observation_from_db(db, observation_id)
+    await delete_observation_from_db_async(db, observation_id)
     return {"message": "Наблюдение успешно удалено"}
 
 @router.get("/procedures/{patient_id}", response_model=List[Procedure])
 async def get_procedures(
     patient_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    procedures = get_procedures_by_patient(db, patient_id)
+    procedures = await get_procedures_by_patient_async(db, patient_id)
     return procedures
 
 
@@ -110,36 +112,36 @@ async def get_procedures(
 async def update_procedure_status_endpoint(
     procedure_id: int,
     body: ProcedureStatusUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    return update_procedure_status(db, procedure_id, body.status)
+    return await update_procedure_status_async(db, procedure_id, body.status)
 
 
 @router.patch("/procedures/{procedure_id}", response_model=Procedure)
 async def update_procedure_status_compat(
     procedure_id: int,
     body: ProcedureStatusUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    return update_procedure_status(db, procedure_id, body.status)
+    return await update_procedure_status_async(db, procedure_id, body.status)
 
 @router.post("/procedures", response_model=Procedure)
 async def add_procedure(
     procedure: ProcedureCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    return create_procedure(db, procedure, user_id=current_user.id)
+    return await create_procedure_async(db, procedure, user_id=current_user.id)
 
 @router.get("/appointments/{patient_id}", response_model=List[dict])
 async def get_appointments(
     patient_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
-    appointments = get_appointments_by_patient(db, patient_id)
+    appointments = await get_appointments_by_patient_async(db, patient_id)
     return appointments
 
 
@@ -147,11 +149,21 @@ async def get_appointments(
 async def create_appointment_stub(current_user: User = Depends(get_current_user)):
     raise HTTPException(status_code=501, detail="Appointment creation not implemented yet")
 
+
+async def _get_prescription_with_patient(db: AsyncSession, prescription_id: int) -> Optional[PrescriptionModel]:
+    result = await db.execute(
+        select(PrescriptionModel)
+        .options(joinedload(PrescriptionModel.patient))
+        .where(PrescriptionModel.id == prescription_id)
+    )
+    return result.scalars().first()
+
+
 # ✅ Создание назначения (только врач)
 @router.post("/prescriptions", response_model=PrescriptionSchema)
 async def create_prescription(
     prescription: PrescriptionCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     db_prescription = PrescriptionModel(  # ✅ Используем модель БД
@@ -167,15 +179,15 @@ async def create_prescription(
         status=PrescriptionStatus.ACTIVE
     )
     db.add(db_prescription)
-    db.commit()
-    db.refresh(db_prescription)
+    await db.commit()
+    await db.refresh(db_prescription)
     return db_prescription  # ✅ Автоматически конвертируется в схему
 
 
 @router.post("/prescriptions/batch", response_model=List[PrescriptionSchema])
 async def create_prescriptions_batch(
     body: PrescriptionsBatchCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     items = [
@@ -189,7 +201,7 @@ async def create_prescriptions_batch(
             detail="Выберите хотя бы одну процедуру или измерение",
         )
 
-    patient = db.query(Patient).filter(Patient.id == body.patient_id).first()
+    patient = await db.get(Patient, body.patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
 
@@ -199,7 +211,7 @@ async def create_prescriptions_batch(
         general_notes=body.general_notes.strip() if body.general_notes else None,
     )
     db.add(package)
-    db.flush()
+    await db.flush()
 
     created: List[PrescriptionModel] = []
     for item in items:
@@ -222,10 +234,10 @@ async def create_prescriptions_batch(
         db.add(db_prescription)
         created.append(db_prescription)
 
-    db.commit()
+    await db.commit()
     for p in created:
-        db.refresh(p)
-    db.refresh(package)
+        await db.refresh(p)
+    await db.refresh(package)
 
     await manager.broadcast(
         {
@@ -249,46 +261,68 @@ async def create_prescriptions_batch(
 )
 async def get_prescription_packages_by_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: Optional[User] = Depends(require_auth_or_public_display),
 ):
-    packages = (
-        db.query(PrescriptionPackageModel)
+    not_modified = conditional_get(
+        request,
+        response,
+        "prescription_packages_by_patient",
+        patient_id,
+        *await row_version_async(
+            db,
+            (PrescriptionPackageModel, (PrescriptionPackageModel.patient_id == patient_id,)),
+            (PrescriptionModel, (PrescriptionModel.patient_id == patient_id,)),
+        ),
+    )
+    if not_modified is not None:
+        return not_modified
+    result = await db.execute(
+        select(PrescriptionPackageModel)
         .options(joinedload(PrescriptionPackageModel.prescriptions))
-        .filter(PrescriptionPackageModel.patient_id == patient_id)
+        .where(PrescriptionPackageModel.patient_id == patient_id)
         .order_by(desc(PrescriptionPackageModel.created_at))
-        .all()
     )
-    return packages
+    return result.unique().scalars().all()
 
 
 # ✅ Получение назначений пациента
 @router.get("/prescriptions/patient/{patient_id}", response_model=List[PrescriptionSchema])
 async def get_prescriptions_by_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: Optional[User] = Depends(require_auth_or_public_display),
 ):
-    prescriptions = db.query(PrescriptionModel).filter(  # ✅ Используем модель БД
-        PrescriptionModel.patient_id == patient_id,
-        # PrescriptionModel.status != PrescriptionStatus.CANCELLED
-    ).order_by(desc(PrescriptionModel.created_at)).all()
-    return prescriptions  # ✅ Автоматически конвертируется в список схем
+    not_modified = conditional_get(
+        request,
+        response,
+        "prescriptions_by_patient",
+        patient_id,
+        *await row_version_async(db, (PrescriptionModel, (PrescriptionModel.patient_id == patient_id,))),
+    )
+    if not_modified is not None:
+        return not_modified
+    result = await db.execute(
+        select(PrescriptionModel).where(  # ✅ Используем модель БД
+            PrescriptionModel.patient_id == patient_id,
+            # PrescriptionModel.status != PrescriptionStatus.CANCELLED
+        ).order_by(desc(PrescriptionModel.created_at))
+    )
+    return result.scalars().all()  # ✅ Автоматически конвертируется в список схем
 
 # ✅ Выполнение назначения (только медсестра)
 @router.post("/prescriptions/{prescription_id}/execute", response_model=Procedure)
 async def execute_prescription(
     prescription_id: int,
     execution_data: PrescriptionExecution,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    prescription = (
-        db.query(PrescriptionModel)
-        .options(joinedload(PrescriptionModel.patient))
-        .filter(PrescriptionModel.id == prescription_id)
-        .first()
-    )
+    prescription = await _get_prescription_with_patient(db, prescription_id)
     if not prescription:
         raise HTTPException(status_code=404, detail="Назначение не найдено")
     
@@ -331,25 +365,20 @@ async def execute_prescription(
         )
 
     if prescription.package_id:
-        refresh_package_status(db, prescription.package_id)
+        await db.run_sync(refresh_package_status, prescription.package_id)
 
-    db.commit()
-    db.refresh(procedure)
+    await db.commit()
+    await db.refresh(procedure)
     return procedure
 
 @router.patch("/prescriptions/{prescription_id}/cancel", response_model=PrescriptionSchema)
 async def cancel_prescription(
     prescription_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Отменить активное назначение. Врач — только свои."""
-    prescription = (
-        db.query(PrescriptionModel)
-        .options(joinedload(PrescriptionModel.patient))
-        .filter(PrescriptionModel.id == prescription_id)
-        .first()
-    )
+    prescription = await _get_prescription_with_patient(db, prescription_id)
     if not prescription:
         raise HTTPException(status_code=404, detail="Назначение не найдено")
 
@@ -362,12 +391,12 @@ async def cancel_prescription(
     if current_user.role == UserRole.DOCTOR and prescription.created_by != current_user.id:
         raise HTTPException(status_code=403, detail="Можно отменить только свои назначения")
 
+    patient_name = prescription.patient.full_name if prescription.patient else ""
     prescription.status = PrescriptionStatus.CANCELLED
     prescription.completed_at = datetime.utcnow()
-    db.commit()
-    db.refresh(prescription)
+    await db.commit()
+    await db.refresh(prescription)
 
-    patient_name = prescription.patient.full_name if prescription.patient else ""
     await manager.broadcast(
         {
             "type": "prescription_cancelled",
@@ -383,7 +412,7 @@ async def cancel_prescription(
 
 
 @router.get("/form-530n/{patient_id}", response_model=Form530nResponse)
-async def get_form_530n(
+def get_form_530n(
     patient_id: int,
     date_from: Optional[date] = Query(None, description="Начало периода (YYYY-MM-DD)"),
     date_to: Optional[date] = Query(None, description="Конец периода (YYYY-MM-DD)"),
@@ -397,7 +426,7 @@ async def get_form_530n(
 
 
 @router.get("/form-530n/{patient_id}/print", response_class=HTMLResponse)
-async def print_form_530n(
+def print_form_530n(
     patient_id: int,
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
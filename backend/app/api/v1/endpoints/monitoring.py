@@ -1,7 +1,8 @@
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, select
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
@@ -19,13 +20,11 @@ from app.schemas.monitoring import (
     MonitorZoneUpdate,
 )
 from app.deps import get_current_active_user
+from app.services.monitoring_cache import get_monitoring_snapshot, monitoring_snapshot_cache
 from app.services.monitoring_service import (
     ATM_METRICS,
-    fetch_atmosphere_for_zone,
-    fetch_monitoring_snapshot,
-    list_available_atm_zones,
+    async_monitoring_service,
     metrics_from_device,
-    monitoring_service,
     normalize_mac,
     normalize_atm_zone,
     parse_online_flag,
@@ -94,46 +93,46 @@ def _ble_view(mac: str, data: Optional[Dict[str, Any]]) -> Optional[BleDeviceVie
 
 
 @router.get("/health")
-def monitoring_health(
+async def monitoring_health(
     current_user: Optional[User] = Depends(require_auth_or_public_display),
 ):
     try:
-        data = monitoring_service.get_health()
+        data = await async_monitoring_service.get_health()
         return data
     except Exception as exc:
         raise HTTPException(status_code=503, detail=str(exc)) from exc
 
 
 @router.get("/state")
-def monitoring_state(
+async def monitoring_state(
     current_user: Optional[User] = Depends(require_auth_or_public_display),
 ):
     try:
-        return monitoring_service.get_state()
+        return await async_monitoring_service.get_state()
     except Exception as exc:
         raise HTTPException(status_code=503, detail=str(exc)) from exc
 
 
 @router.get("/atm/{room}")
-def monitoring_atm_room(
+async def monitoring_atm_room(
     room: int,
     current_user: Optional[User] = Depends(require_auth_or_public_display),
 ):
     try:
-        raw = monitoring_service.get_atm_room(room)
+        raw = await async_monitoring_service.get_atm_room(room)
         return {"room": room, "raw": raw, "metrics": normalize_atm_zone(_as_dict(raw))}
     except Exception as exc:
         raise HTTPException(status_code=503, detail=str(exc)) from exc
 
 
 @router.get("/atm/{room}/{metric}")
-def monitoring_atm_metric(
+async def monitoring_atm_metric(
     room: int,
     metric: str,
     current_user: Optional[User] = Depends(require_auth_or_public_display),
 ):
     try:
-        raw = monitoring_service.get_atm_metric(room, metric)
+        raw = await async_monitoring_service.get_atm_metric(room, metric)
         if isinstance(raw, dict):
             return {"room": room, "metric": metric.lower(), "value": unwrap_metric(raw), "raw": raw}
         return {"room": room, "metric": metric.lower(), "value": raw, "raw": raw}
@@ -150,9 +149,8 @@ def monitoring_atm_zones(
     current_user: Optional[User] = Depends(require_auth_or_public_display),
 ):
     try:
-        snapshot = fetch_monitoring_snapshot(monitoring_service)
-        zones = list_available_atm_zones(snapshot["atm"], monitoring_service)
-        return {"zones": zones}
+        snapshot = get_monitoring_snapshot()
+        return {"zones": list(snapshot["atm_zones"])}
     except Exception as exc:
         raise HTTPException(status_code=503, detail=str(exc)) from exc
 
@@ -173,28 +171,43 @@ def set_room_monitor_zone(
     return {"room_id": room_id, "monitor_zone": room.monitor_zone}
 
 
-@router.get("/dashboard", response_model=MonitoringDashboard)
-def monitoring_dashboard(
-    room_id: int = Query(..., description="ID палаты в БД"),
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(require_auth_or_public_display),
-):
-    room = db.query(Room).filter(Room.id == room_id).first()
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
-
+def _room_beds_with_patients(db: Session, room_id: int) -> List[Tuple[Bed, Optional[Patient]]]:
+    """Койки палаты и их активный пациент одним запросом (первый по id, если их несколько)."""
+    rows = db.execute(
+        select(Bed, Patient)
+        .outerjoin(Patient, and_(Patient.bed_id == Bed.id, Patient.status == PatientStatus.ACTIVE))
+        .where(Bed.room_id == room_id)
+        .order_by(Bed.id, Patient.id)
+    ).all()
+    result: Dict[int, Tuple[Bed, Optional[Patient]]] = {}
+    for bed, patient in rows:
+        result.setdefault(bed.id, (bed, patient))
+    return list(result.values())
+
+
+def build_monitoring_dashboard(
+    db: Session,
+    room: Room,
+    snapshot: Optional[Dict[str, Any]] = None,
+    allow_fetch: bool = True,
+) -> MonitoringDashboard:
+    """Дашборд палаты из общего снимка мониторинга (REST и WS-поток ``monitoring:{room_id}``).
+
+    Поток передаёт ``allow_fetch=False``: атмосфера только из кэша зон, без HTTP в цикле рассылки.
+    """
+    room_id = room.id
     assigned_macs: set[str] = set()
     available_atm_zones: List[int] = []
     monitor_zone: Optional[int] = None
 
     try:
-        snapshot = fetch_monitoring_snapshot(monitoring_service)
-        available_atm_zones = list_available_atm_zones(snapshot["atm"], monitoring_service)
+        if snapshot is None:
+            snapshot = get_monitoring_snapshot()
+        available_atm_zones = list(snapshot["atm_zones"])
         monitor_zone = _resolve_monitor_zone(room, available_atm_zones)
         connected = bool(snapshot["health"].get("ok", True)) and "error" not in snapshot.get("state", {})
         health_raw = snapshot["health"]
         ble_map: Dict[str, Dict[str, Any]] = snapshot["ble"]
-        atm_map: Dict[str, Dict[str, Any]] = snapshot["atm"]
         error = snapshot.get("state", {}).get("error")
     except Exception as exc:
         now = _utc_now_iso()
@@ -215,20 +228,7 @@ def monitoring_dashboard(
     atmosphere_error: Optional[str] = None
 
     if monitor_zone is not None:
-        zone_key = str(monitor_zone)
-        parsed_atm = dict(atm_map.get(zone_key) or {})
-        if not _atmosphere_has_data(parsed_atm):
-            parsed_atm = fetch_atmosphere_for_zone(monitoring_service, monitor_zone)
-        else:
-            for key in ATM_METRICS:
-                if parsed_atm.get(key) is None:
-                    try:
-                        raw = monitoring_service.get_atm_metric(monitor_zone, key)
-                        if is_atm_error_response(raw):
-                            continue
-                        parsed_atm[key] = unwrap_metric(raw) if isinstance(raw, dict) else raw
-                    except Exception:
-                        pass
+        parsed_atm = monitoring_snapshot_cache.zone_atmosphere(monitor_zone, snapshot, allow_fetch)
         atmosphere = AtmosphereView(
             zone=monitor_zone,
             temp=parsed_atm.get("temp"),
@@ -240,17 +240,8 @@ def monitoring_dashboard(
     else:
         atmosphere_error = _build_atmosphere_error(None, available_atm_zones, {})
 
-    room_beds = db.query(Bed).filter(Bed.room_id == room.id).all()
-
-    patients_by_bed: Dict[int, Patient] = {}
-    for bed in room_beds:
-        for patient in bed.patients:
-            if patient.status == PatientStatus.ACTIVE:
-                patients_by_bed[bed.id] = patient
-
     beds: List[BedMonitoringView] = []
-    for bed in room_beds:
-        patient = patients_by_bed.get(bed.id)
+    for bed, patient in _room_beds_with_patients(db, room.id):
         ble_mac = normalize_mac(patient.ble_mac) if patient and patient.ble_mac else None
         ble_data = ble_map.get(ble_mac) if ble_mac else None
         if ble_mac:
@@ -307,3 +298,15 @@ def monitoring_dashboard(
         refreshed_at=now,
         sensors_updated_at=sensors_at,
     )
+
+
+@router.get("/dashboard", response_model=MonitoringDashboard)
+def monitoring_dashboard(
+    room_id: int = Query(..., description="ID палаты в БД"),
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(require_auth_or_public_display),
+):
+    room = db.query(Room).filter(Room.id == room_id).first()
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    return build_monitoring_dashboard(db, room)
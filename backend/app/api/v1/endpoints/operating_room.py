@@ -1,30 +1,37 @@
 from datetime import datetime, timezone
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 from uuid import uuid4
+import asyncio
 import json
 import logging
+import time
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session, joinedload
-import redis
+from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.database import get_db
+from app.core.etag import conditional_get
+from app.core.metrics import metrics
 from app.core.websocket_manager import manager
 from app.deps import get_current_active_user
-from app.models.medical import MedicalRecord, PrescriptionStatus
-from app.models.patient import Patient, PatientStatus
 from app.models.user import User, UserRole
 from app.schemas.monitoring import AtmosphereView
-from app.services.monitoring_service import fetch_atmosphere_for_zone, monitoring_service
+from app.services.monitoring_service import async_monitoring_service, fetch_atmosphere_for_zone_async
+from app.services.or_stats import or_stats_cache
+from app.services.shared_state import SharedStateConflict, VersionedDocument, _get_redis
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/operating-room", tags=["Operating Room"])
 
 REDIS_KEY = "operating_room:state"
+ATM_CACHE_KEY = "operating_room:atm_cache"
+ATM_POLL_SLOT_KEY = "operating_room:atm_poll:slot"
+# Инфоэкраны получают полное or_board_changed один раз, дальше — патчи с seq
+OR_BOARD_PATCH_TYPE = "or_board_patch"
 
 
 class OrStatus(str, Enum):
@@ -126,63 +133,48 @@ _DEFAULT_STATE: Dict[str, Any] = {
     },
 }
 
-_or_state: Dict[str, Any] = json.loads(json.dumps(_DEFAULT_STATE))
-_redis: Optional[redis.Redis] = None
 
+def _normalize_state(data: Any) -> Dict[str, Any]:
+    """Состояние из Redis поверх значений по умолчанию (старые записи без новых полей)."""
+    merged = json.loads(json.dumps(_DEFAULT_STATE))
+    if not isinstance(data, dict) or "status" not in data:
+        return merged
+    merged.update({k: data.get(k, merged[k]) for k in merged.keys()})
+    if isinstance(data.get("display"), dict):
+        merged["display"] = {**_DEFAULT_STATE["display"], **data["display"]}
+    if isinstance(data.get("atmosphere"), dict):
+        merged["atmosphere"] = {**_DEFAULT_STATE["atmosphere"], **data["atmosphere"]}
+    if not isinstance(merged.get("announcements"), list):
+        merged["announcements"] = []
+    return merged
 
-def _utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
+# Общие для всех воркеров: чтение из памяти, запись — CAS в Redis с рассылкой инвалидации
+_or_store = VersionedDocument(REDIS_KEY, _DEFAULT_STATE, normalize=_normalize_state)
+
+
+def _or_state() -> Dict[str, Any]:
+    return _or_store.get()
+
+
+def _update_or_state(mutate: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+    """CAS-запись в Redis с повторами — блокирующая; из async-маршрутов через ``asyncio.to_thread``."""
+
+    def apply(state: Dict[str, Any]) -> None:
+        mutate(state)
+        state["updated_at"] = _utc_now_iso()
 
-def _get_redis() -> Optional[redis.Redis]:
-    global _redis
-    if _redis is not None:
-        return _redis
-    try:
-        client = redis.from_url(settings.REDIS_URL, decode_responses=True, socket_timeout=1)
-        client.ping()
-        _redis = client
-        return _redis
-    except Exception as exc:
-        logger.warning("OR Redis unavailable: %s", exc)
-        return None
-
-
-def _load_state() -> None:
-    global _or_state
-    client = _get_redis()
-    if not client:
-        return
-    try:
-        raw = client.get(REDIS_KEY)
-        if not raw:
-            return
-        data = json.loads(raw)
-        if isinstance(data, dict) and "status" in data:
-            merged = json.loads(json.dumps(_DEFAULT_STATE))
-            merged.update({k: data.get(k, merged[k]) for k in merged.keys()})
-            if isinstance(data.get("display"), dict):
-                merged["display"].update(data["display"])
-            if isinstance(data.get("atmosphere"), dict):
-                merged["atmosphere"].update(data["atmosphere"])
-            if isinstance(data.get("announcements"), list):
-                merged["announcements"] = data["announcements"]
-            _or_state = merged
-    except Exception as exc:
-        logger.warning("OR state load failed: %s", exc)
-
-
-def _save_state() -> None:
-    client = _get_redis()
-    if not client:
-        return
     try:
-        client.set(REDIS_KEY, json.dumps(_or_state, ensure_ascii=False))
-    except Exception as exc:
-        logger.warning("OR state save failed: %s", exc)
+        return _or_store.update(apply)
+    except SharedStateConflict:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Состояние операционной одновременно меняется, повторите запрос",
+        )
 
 
-_load_state()
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
 def _require_admin(user: User) -> None:
@@ -195,11 +187,11 @@ def _require_admin(user: User) -> None:
 
 
 def _display_settings() -> OrDisplaySettings:
-    return OrDisplaySettings(**_or_state["display"])
+    return OrDisplaySettings(**_or_state()["display"])
 
 
 def _atmosphere_config() -> OrAtmosphereConfig:
-    raw = _or_state["atmosphere"]
+    raw = _or_state()["atmosphere"]
     return OrAtmosphereConfig(
         source=AtmosphereSource(raw["source"]),
         monitor_zone=raw.get("monitor_zone"),
@@ -210,11 +202,11 @@ def _atmosphere_config() -> OrAtmosphereConfig:
 
 
 def _announcements() -> List[OrAnnouncement]:
-    return [OrAnnouncement(**item) for item in _or_state["announcements"]]
+    return [OrAnnouncement(**item) for item in _or_state()["announcements"]]
 
 
 def _manual_atmosphere_view() -> AtmosphereView:
-    cfg = _or_state["atmosphere"]
+    cfg = _or_state()["atmosphere"]
     return AtmosphereView(
         zone=cfg.get("monitor_zone"),
         temp=cfg.get("temp"),
@@ -227,8 +219,8 @@ def _manual_atmosphere_view() -> AtmosphereView:
 def get_or_status_payload() -> Dict[str, Any]:
     return {
         "type": "or_status_changed",
-        "status": _or_state["status"],
-        "updated_at": _or_state["updated_at"],
+        "status": _or_state()["status"],
+        "updated_at": _or_state()["updated_at"],
     }
 
 
@@ -237,133 +229,249 @@ def get_or_board_payload() -> Dict[str, Any]:
     atmosphere_payload = None
     if cfg.source == AtmosphereSource.manual:
         atmosphere_payload = _manual_atmosphere_view().model_dump()
-    elif _atm_cache.get("zone") == cfg.monitor_zone and _atm_cache.get("atmosphere"):
-        atmosphere_payload = _atm_cache["atmosphere"]
+    else:
+        atm_cache = _atm_cache()
+        if atm_cache.get("zone") == cfg.monitor_zone and atm_cache.get("atmosphere"):
+            atmosphere_payload = atm_cache["atmosphere"]
+    state = _or_state()
     return {
         "type": "or_board_changed",
-        "status": _or_state["status"],
-        "updated_at": _or_state["updated_at"],
-        "display": dict(_or_state["display"]),
-        "announcements": list(_or_state["announcements"]),
-        "atmosphere_config": dict(_or_state["atmosphere"]),
+        "status": state["status"],
+        "updated_at": state["updated_at"],
+        "display": dict(state["display"]),
+        "announcements": list(state["announcements"]),
+        "atmosphere_config": dict(state["atmosphere"]),
         "atmosphere": atmosphere_payload,
     }
 
 
 async def _broadcast_or_state() -> None:
-    await manager.broadcast(get_or_status_payload(), "or")
-    await manager.broadcast(get_or_board_payload(), "or")
+    await manager.broadcast(get_or_status_payload(), "or", coalesce_key="or_status_changed")
+    await manager.broadcast_state(get_or_board_payload(), "or", OR_BOARD_PATCH_TYPE)
+
+
+# Кэш последних успешных показаний датчиков — UI не мигает при кратком сбое.
+# poll_* — итог последнего опроса (его делает один воркер), остальные читают отсюда.
+_atm_store = VersionedDocument(
+    ATM_CACHE_KEY,
+    {
+        "zone": None,
+        "atmosphere": None,
+        "updated_at": None,
+        "poll_zone": None,
+        "poll_error": None,
+        "poll_stale_error": None,
+        "polled_at": None,
+    },
+)
 
 
-def _touch_and_persist() -> None:
-    _or_state["updated_at"] = _utc_now_iso()
-    _save_state()
+def _atm_cache() -> Dict[str, Any]:
+    return _atm_store.get()
 
 
-# Кэш последних успешных показаний датчиков — UI не мигает при кратком сбое
-_atm_cache: Dict[str, Any] = {
-    "zone": None,
-    "atmosphere": None,
-    "updated_at": None,
-}
+def _poll_max_age() -> float:
+    return settings.OR_ATMOSPHERE_POLL_SEC * 3 + settings.OR_ATMOSPHERE_TIMEOUT_SEC
 
 
-def _resolve_sensor_atmosphere() -> tuple[Optional[AtmosphereView], Optional[str]]:
-    """Читаем зону ATM с таймаутом; при сбое отдаём последний удачный снимок."""
-    from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+def _remember_atmosphere(
+    zone: int,
+    atmosphere: Optional[Dict[str, Any]],
+    error: Optional[str] = None,
+    stale_error: Optional[str] = None,
+) -> bool:
+    """Сохранить итог опроса в общий кэш; ``True``, если изменились показания.
+
+    Итог без изменений переписывается не чаще раза в половину срока годности опроса —
+    этого хватает, чтобы остальные воркеры считали опрос свежим.
+    """
+    cache = _atm_cache()
+    atmosphere_changed = atmosphere is not None and (
+        cache.get("zone") != zone or cache.get("atmosphere") != atmosphere
+    )
+    polled_at = cache.get("polled_at") or 0.0
+    status_fresh = (
+        cache.get("poll_zone") == zone
+        and cache.get("poll_error") == error
+        and cache.get("poll_stale_error") == stale_error
+        and time.time() - polled_at < _poll_max_age() / 2
+    )
+    if not atmosphere_changed and status_fresh:
+        return False
+
+    def apply(state: Dict[str, Any]) -> None:
+        state.update(poll_zone=zone, poll_error=error, poll_stale_error=stale_error, polled_at=time.time())
+        if atmosphere_changed:
+            state.update(zone=zone, atmosphere=atmosphere, updated_at=_utc_now_iso())
+
+    try:
+        _atm_store.update(apply)
+    except SharedStateConflict as exc:
+        logger.warning("OR atmosphere cache not saved: %s", exc)
+        return False
+    return atmosphere_changed
+
+
+class OrAtmospherePoller:
+    """Фоновый опрос датчиков зоны операционной; запросы и WebSocket читают только ``_atm_cache``.
+
+    Задача запускается в каждом воркере uvicorn, но опрашивает только тот, кто занял слот
+    интервала в Redis (как ``BraceletVitalsRecorder``): раз в ``OR_ATMOSPHERE_POLL_SEC`` читает
+    ``monitor_zone`` async-клиентом и пишет в ``_atm_cache`` показания и ошибку опроса.
+    Если показания изменились — рассылает ``or_board_changed`` в комнату ``or``. После смены
+    зоны воркер, принявший запрос, опрашивает сразу, не дожидаясь слота.
+    """
+
+    def __init__(self) -> None:
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._interval = settings.OR_ATMOSPHERE_POLL_SEC
+
+    @staticmethod
+    def status(zone: int) -> tuple[bool, Optional[str], Optional[str]]:
+        """``(опрошена ли зона недавно, ошибка без снимка, ошибка при показе снимка)``."""
+        cache = _atm_cache()
+        polled_at = cache.get("polled_at")
+        if cache.get("poll_zone") != zone or not polled_at:
+            return False, None, None
+        if time.time() - polled_at > _poll_max_age():
+            return False, None, None
+        return True, cache.get("poll_error"), cache.get("poll_stale_error")
+
+    def _claim_slot(self) -> bool:
+        """Один воркер uvicorn на интервал: остальные видят занятый слот и пропускают."""
+        client = _get_redis()
+        if client is None:
+            return True
+        slot = int(time.time() // self._interval)
+        try:
+            return bool(
+                client.set(f"{ATM_POLL_SLOT_KEY}:{slot}", "1", nx=True, ex=int(self._interval * 2) + 1)
+            )
+        except Exception as exc:
+            logger.debug("OR atmosphere slot lock unavailable: %s", exc)
+            return True
+
+    async def poll_once(self, force: bool = False) -> None:
+        cfg = _or_state()["atmosphere"]
+        zone = cfg.get("monitor_zone")
+        if cfg.get("source") != AtmosphereSource.sensor.value or zone is None:
+            return
+        if not force and not await asyncio.to_thread(self._claim_slot):
+            return
+        zone_i = int(zone)
+        started = time.monotonic()
+        atmosphere: Optional[AtmosphereView] = None
+        error: Optional[str] = None
+        stale_error: Optional[str] = None
+        try:
+            parsed = await asyncio.wait_for(
+                fetch_atmosphere_for_zone_async(async_monitoring_service, zone_i),
+                timeout=settings.OR_ATMOSPHERE_TIMEOUT_SEC,
+            )
+            atmosphere = AtmosphereView(
+                zone=zone_i,
+                temp=parsed.get("temp"),
+                hum=parsed.get("hum"),
+                press=parsed.get("press"),
+                co2=parsed.get("co2"),
+            )
+            if not any(getattr(atmosphere, key) is not None for key in ("temp", "hum", "press")):
+                atmosphere = None
+                error = f"Зона {zone_i}: нет показаний с датчиков"
+                stale_error = f"Зона {zone_i}: нет новых показаний, показан последний снимок"
+        except asyncio.TimeoutError:
+            error = f"Таймаут датчиков (зона {zone_i})"
+            stale_error = f"Таймаут датчиков (зона {zone_i}), показан последний снимок"
+        except Exception as exc:
+            logger.warning("OR atmosphere zone %s failed: %s", zone_i, exc)
+            error = f"Ошибка мониторинга (зона {zone_i}): {exc}"
+            stale_error = f"Ошибка мониторинга (зона {zone_i}), показан последний снимок"
+        metrics.observe("or_atmosphere_poll_seconds", time.monotonic() - started)
+
+        changed = await asyncio.to_thread(
+            _remember_atmosphere,
+            zone_i,
+            atmosphere.model_dump() if atmosphere is not None else None,
+            error,
+            stale_error,
+        )
+        if changed:
+            await manager.broadcast_state(get_or_board_payload(), "or", OR_BOARD_PATCH_TYPE)
+
+    async def _run(self) -> None:
+        force = False
+        while True:
+            try:
+                await self.poll_once(force=force)
+            except Exception as exc:
+                logger.warning("OR atmosphere poll failed: %s", exc)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._interval)
+                force = True
+            except asyncio.TimeoutError:
+                force = False
+            self._wakeup.clear()
+
+    def wake(self) -> None:
+        """Опросить зону сразу (после смены настроек атмосферы), минуя слот."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self, interval: Optional[float] = None) -> None:
+        """Запуск в event loop FastAPI (из lifespan)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._interval = interval if interval is not None else settings.OR_ATMOSPHERE_POLL_SEC
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("OR atmosphere poller started (every %.1fs)", self._interval)
+
+    async def stop(self) -> None:
+        task = self._task
+        self._task = None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+or_atmosphere_poller = OrAtmospherePoller()
+
 
-    cfg = _or_state["atmosphere"]
+def _resolve_sensor_atmosphere() -> tuple[Optional[AtmosphereView], Optional[str]]:
+    """Показания зоны из ``_atm_cache`` (их обновляет ``or_atmosphere_poller``), без запросов к мониторингу."""
+    cfg = _or_state()["atmosphere"]
     zone = cfg.get("monitor_zone")
     if zone is None:
         return None, "Не задана зона датчиков атмосферы"
 
     zone_i = int(zone)
     cached = None
-    if _atm_cache.get("zone") == zone_i and _atm_cache.get("atmosphere"):
-        cached = AtmosphereView(**_atm_cache["atmosphere"])
+    atm_cache = _atm_cache()
+    if atm_cache.get("zone") == zone_i and atm_cache.get("atmosphere"):
+        cached = AtmosphereView(**atm_cache["atmosphere"])
 
-    pool = ThreadPoolExecutor(max_workers=1)
-    try:
-        parsed = pool.submit(
-            fetch_atmosphere_for_zone, monitoring_service, zone_i
-        ).result(timeout=2.5)
-        atmosphere = AtmosphereView(
-            zone=zone_i,
-            temp=parsed.get("temp"),
-            hum=parsed.get("hum"),
-            press=parsed.get("press"),
-            co2=parsed.get("co2"),
-        )
-        if not any(getattr(atmosphere, key) is not None for key in ("temp", "hum", "press")):
-            if cached is not None:
-                return cached, f"Зона {zone_i}: нет новых показаний, показан последний снимок"
-            return atmosphere, f"Зона {zone_i}: нет показаний с датчиков"
-        _atm_cache["zone"] = zone_i
-        _atm_cache["atmosphere"] = atmosphere.model_dump()
-        _atm_cache["updated_at"] = _utc_now_iso()
-        return atmosphere, None
-    except FuturesTimeout:
-        if cached is not None:
-            return cached, f"Таймаут датчиков (зона {zone_i}), показан последний снимок"
-        return None, f"Таймаут датчиков (зона {zone_i})"
-    except Exception as exc:
-        logger.warning("OR atmosphere zone %s failed: %s", zone_i, exc)
-        if cached is not None:
-            return cached, f"Ошибка мониторинга (зона {zone_i}), показан последний снимок"
-        return None, f"Ошибка мониторинга (зона {zone_i}): {exc}"
-    finally:
-        pool.shutdown(wait=False, cancel_futures=True)
+    polled, error, stale_error = or_atmosphere_poller.status(zone_i)
+    if cached is not None:
+        return cached, stale_error if polled else None
+    if not polled:
+        return None, f"Зона {zone_i}: ожидание показаний датчиков"
+    return None, error or f"Зона {zone_i}: нет показаний с датчиков"
 
 
 def _resolve_atmosphere() -> tuple[Optional[AtmosphereView], Optional[str]]:
-    cfg = _or_state["atmosphere"]
+    cfg = _or_state()["atmosphere"]
     if cfg.get("source") == AtmosphereSource.sensor.value:
         return _resolve_sensor_atmosphere()
     return _manual_atmosphere_view(), None
 
 
 def _compute_stats(db: Session) -> OrStatsView:
-    patients = (
-        db.query(Patient)
-        .options(joinedload(Patient.prescriptions))
-        .filter(Patient.status == PatientStatus.ACTIVE)
-        .all()
-    )
-    patient_ids = [p.id for p in patients]
-    obs_counts: Dict[int, int] = {pid: 0 for pid in patient_ids}
-    if patient_ids:
-        records = (
-            db.query(MedicalRecord.patient_id)
-            .filter(MedicalRecord.patient_id.in_(patient_ids))
-            .all()
-        )
-        for (pid,) in records:
-            obs_counts[pid] = obs_counts.get(pid, 0) + 1
-
-    awaiting = 0
-    active_prescriptions = 0
-    completed_prescriptions = 0
-    ready_for_discharge = 0
-
-    for patient in patients:
-        prescriptions = list(patient.prescriptions or [])
-        obs_count = obs_counts.get(patient.id, 0)
-        if not prescriptions and obs_count == 0:
-            awaiting += 1
-        if any(p.status == PrescriptionStatus.ACTIVE for p in prescriptions):
-            active_prescriptions += 1
-        if prescriptions and all(p.status == PrescriptionStatus.COMPLETED for p in prescriptions):
-            completed_prescriptions += 1
-        if prescriptions and not any(p.status == PrescriptionStatus.ACTIVE for p in prescriptions):
-            ready_for_discharge += 1
-
-    return OrStatsView(
-        active_patients=len(patients),
-        awaiting_examination=awaiting,
-        active_prescriptions=active_prescriptions,
-        completed_prescriptions=completed_prescriptions,
-        ready_for_discharge=ready_for_discharge,
-    )
+    return OrStatsView(**or_stats_cache.get(db))
 
 
 def _build_config() -> OrConfigResponse:
@@ -371,8 +479,8 @@ def _build_config() -> OrConfigResponse:
     # Ручной режим — сразу значения. Датчики — только через /board, чтобы не тормозить админку.
     atmosphere = _manual_atmosphere_view() if cfg.source == AtmosphereSource.manual else None
     return OrConfigResponse(
-        status=OrStatus(_or_state["status"]),
-        updated_at=_or_state["updated_at"],
+        status=OrStatus(_or_state()["status"]),
+        updated_at=_or_state()["updated_at"],
         display=_display_settings(),
         announcements=_announcements(),
         atmosphere_config=cfg,
@@ -380,17 +488,24 @@ def _build_config() -> OrConfigResponse:
     )
 
 
-def _build_board(db: Session) -> OrBoardResponse:
-    atmosphere, atmosphere_error = _resolve_atmosphere()
+def _build_board(
+    db: Session,
+    atmosphere: Optional[AtmosphereView] = None,
+    atmosphere_error: Optional[str] = None,
+    resolved: bool = False,
+    stats: Optional[OrStatsView] = None,
+) -> OrBoardResponse:
+    if not resolved:
+        atmosphere, atmosphere_error = _resolve_atmosphere()
     return OrBoardResponse(
-        status=OrStatus(_or_state["status"]),
-        updated_at=_or_state["updated_at"],
+        status=OrStatus(_or_state()["status"]),
+        updated_at=_or_state()["updated_at"],
         display=_display_settings(),
         announcements=_announcements(),
         atmosphere_config=_atmosphere_config(),
         atmosphere=atmosphere,
         atmosphere_error=atmosphere_error,
-        stats=_compute_stats(db),
+        stats=stats or _compute_stats(db),
     )
 
 
@@ -408,19 +523,21 @@ def get_operating_room_atmosphere() -> dict:
 @router.get("/status", response_model=OrStatusResponse)
 def get_operating_room_status() -> OrStatusResponse:
     return OrStatusResponse(
-        status=OrStatus(_or_state["status"]),
-        updated_at=_or_state["updated_at"],
+        status=OrStatus(_or_state()["status"]),
+        updated_at=_or_state()["updated_at"],
     )
 
 
 @router.put("/status", response_model=OrStatusResponse)
 async def set_operating_room_status(body: OrStatusUpdate) -> OrStatusResponse:
-    _or_state["status"] = body.status.value
-    _touch_and_persist()
+    def apply(state: Dict[str, Any]) -> None:
+        state["status"] = body.status.value
+
+    state = await asyncio.to_thread(_update_or_state, apply)
     await _broadcast_or_state()
     return OrStatusResponse(
         status=body.status,
-        updated_at=_or_state["updated_at"],
+        updated_at=state["updated_at"],
     )
 
 
@@ -431,8 +548,27 @@ def get_operating_room_config() -> OrConfigResponse:
 
 
 @router.get("/board", response_model=OrBoardResponse)
-def get_operating_room_board(db: Session = Depends(get_db)) -> OrBoardResponse:
-    return _build_board(db)
+def get_operating_room_board(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+) -> OrBoardResponse:
+    atmosphere, atmosphere_error = _resolve_atmosphere()
+    state = _or_state()
+    stats = _compute_stats(db)
+    not_modified = conditional_get(
+        request,
+        response,
+        "or_board",
+        _or_store.version,
+        state["updated_at"],
+        atmosphere.model_dump() if atmosphere else None,
+        atmosphere_error,
+        stats.model_dump(),
+    )
+    if not_modified is not None:
+        return not_modified
+    return _build_board(db, atmosphere, atmosphere_error, resolved=True, stats=stats)
 
 
 @router.put("/display", response_model=OrDisplaySettings)
@@ -441,11 +577,14 @@ async def update_operating_room_display(
     current_user: User = Depends(get_current_active_user),
 ) -> OrDisplaySettings:
     _require_admin(current_user)
-    for key in ("show_stats", "show_atmosphere", "show_announcements"):
-        value = getattr(body, key)
-        if value is not None:
-            _or_state["display"][key] = value
-    _touch_and_persist()
+
+    def apply(state: Dict[str, Any]) -> None:
+        for key in ("show_stats", "show_atmosphere", "show_announcements"):
+            value = getattr(body, key)
+            if value is not None:
+                state["display"][key] = value
+
+    await asyncio.to_thread(_update_or_state, apply)
     await _broadcast_or_state()
     return _display_settings()
 
@@ -456,14 +595,18 @@ async def update_operating_room_atmosphere(
     current_user: User = Depends(get_current_active_user),
 ) -> OrAtmosphereConfig:
     _require_admin(current_user)
-    _or_state["atmosphere"] = {
-        "source": body.source.value,
-        "monitor_zone": body.monitor_zone,
-        "temp": body.temp,
-        "hum": body.hum,
-        "press": body.press,
-    }
-    _touch_and_persist()
+
+    def apply(state: Dict[str, Any]) -> None:
+        state["atmosphere"] = {
+            "source": body.source.value,
+            "monitor_zone": body.monitor_zone,
+            "temp": body.temp,
+            "hum": body.hum,
+            "press": body.press,
+        }
+
+    await asyncio.to_thread(_update_or_state, apply)
+    or_atmosphere_poller.wake()
     await _broadcast_or_state()
     return _atmosphere_config()
 
@@ -482,9 +625,11 @@ async def create_operating_room_announcement(
         "text": text,
         "created_at": _utc_now_iso(),
     }
-    _or_state["announcements"].insert(0, item)
-    _or_state["announcements"] = _or_state["announcements"][:50]
-    _touch_and_persist()
+
+    def apply(state: Dict[str, Any]) -> None:
+        state["announcements"] = [item, *state["announcements"]][:50]
+
+    await asyncio.to_thread(_update_or_state, apply)
     await _broadcast_or_state()
     return OrAnnouncement(**item)
 
@@ -495,12 +640,15 @@ async def delete_operating_room_announcement(
     current_user: User = Depends(get_current_active_user),
 ) -> dict:
     _require_admin(current_user)
-    before = len(_or_state["announcements"])
-    _or_state["announcements"] = [
-        item for item in _or_state["announcements"] if item["id"] != announcement_id
-    ]
-    if len(_or_state["announcements"]) == before:
-        raise HTTPException(status_code=404, detail="Объявление не найдено")
-    _touch_and_persist()
+
+    def apply(state: Dict[str, Any]) -> None:
+        before = len(state["announcements"])
+        state["announcements"] = [
+            item for item in state["announcements"] if item["id"] != announcement_id
+        ]
+        if len(state["announcements"]) == before:
+            raise HTTPException(status_code=404, detail="Объявление не найдено")
+
+    await asyncio.to_thread(_update_or_state, apply)
     await _broadcast_or_state()
     return {"ok": True}
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import datetime
 
+from app.crud.patient import get_patient_by_id_async, get_patients_by_status_async
 from app.models.patient import Patient as PatientModel, PatientStatus
 from app.schemas.patient import Patient as PatientSchema, PatientFeatureFlagsUpdate
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.etag import conditional_get, row_version_async
 from app.deps import get_current_user, require_auth_or_public_display
 from app.models.user import User
 
@@ -14,30 +16,37 @@ router = APIRouter()
 
 @router.get("/", response_model=List[PatientSchema])
 async def get_patients(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User | None = Depends(require_auth_or_public_display),
 ):
     """Получить всех активных пациентов"""
-    patients = db.query(PatientModel).filter(PatientModel.status == PatientStatus.ACTIVE).all()
+    active = PatientModel.status == PatientStatus.ACTIVE
+    version = await row_version_async(db, (PatientModel, (active,)))
+    not_modified = conditional_get(request, response, "patients", *version)
+    if not_modified is not None:
+        return not_modified
+    patients = await get_patients_by_status_async(db, PatientStatus.ACTIVE)
     return patients
 
 @router.get("/archived", response_model=List[PatientSchema])  # ✅ Сначала этот
 async def get_archived_patients(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Получить список архивных пациентов"""
-    patients = db.query(PatientModel).filter(PatientModel.status == PatientStatus.DISCHARGED).all()
+    patients = await get_patients_by_status_async(db, PatientStatus.DISCHARGED)
     return patients
 
 @router.post("/{patient_id}/select")
 async def select_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Выбор пациента для отображения на планшете палаты."""
-    patient = db.query(PatientModel).filter(PatientModel.id == patient_id).first()
+    patient = await get_patient_by_id_async(db, patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     return {
@@ -51,11 +60,11 @@ async def select_patient(
 @router.get("/{patient_id}", response_model=PatientSchema)
 async def get_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Получить пациента по ID"""
-    patient = db.query(PatientModel).filter(PatientModel.id == patient_id).first()
+    patient = await get_patient_by_id_async(db, patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     return patient
@@ -63,29 +72,29 @@ async def get_patient(
 @router.patch("/{patient_id}/archive", response_model=PatientSchema)
 async def archive_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Выписать пациента и отправить в архив"""
-    patient = db.query(PatientModel).filter(PatientModel.id == patient_id).first()
+    patient = await get_patient_by_id_async(db, patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
     patient.status = PatientStatus.DISCHARGED
     patient.discharge_date = datetime.utcnow()
-    db.commit()
-    db.refresh(patient)
+    await db.commit()
+    await db.refresh(patient)
     return patient
 
 @router.patch("/{patient_id}/feature-flags", response_model=PatientSchema)
 async def update_patient_feature_flags(
     patient_id: int,
     body: PatientFeatureFlagsUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     """Обновить особенности пациента (флажки на экране палаты)."""
-    patient = db.query(PatientModel).filter(PatientModel.id == patient_id).first()
+    patient = await get_patient_by_id_async(db, patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
 
@@ -94,24 +103,24 @@ async def update_patient_feature_flags(
     patient.flag_red = body.flag_red
     patient.flag_orange = body.flag_orange
     patient.flag_green = body.flag_green
-    db.commit()
-    db.refresh(patient)
+    await db.commit()
+    await db.refresh(patient)
     return patient
 
 
 @router.patch("/{patient_id}/restore", response_model=PatientSchema)
 async def restore_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """Вернуть пациента из архива"""
-    patient = db.query(PatientModel).filter(PatientModel.id == patient_id).first()
+    patient = await get_patient_by_id_async(db, patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
     
     patient.status = PatientStatus.ACTIVE
     patient.discharge_date = None
-    db.commit()
-    db.refresh(patient)
+    await db.commit()
+    await db.refresh(patient)
     return patient
\ No newline at end of file
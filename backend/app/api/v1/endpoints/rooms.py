@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from app.schemas.room import Room as RoomSchema, RoomDisplayBinding
-from app.crud.room import get_all_rooms_with_beds
-from app.core.database import get_db
+from app.crud.room import get_all_rooms_with_beds_async, get_rooms_version_async
+from app.core.database import get_async_db
+from app.core.etag import conditional_get
 from app.deps import require_auth_or_public_display
 from app.models.user import User
 from app.services.room_display_binding import resolve_room_id_for_client
@@ -38,8 +39,14 @@ async def get_room_display_binding(
 
 @router.get("/", response_model=List[RoomSchema])
 async def get_rooms(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: Optional[User] = Depends(require_auth_or_public_display),
 ):
-    rooms = get_all_rooms_with_beds(db)
+    """Палаты с койками и активными пациентами; неизменённое дерево — 304 по ETag."""
+    not_modified = conditional_get(request, response, "rooms", *await get_rooms_version_async(db))
+    if not_modified is not None:
+        return not_modified
+    rooms = await get_all_rooms_with_beds_async(db)
     return rooms
\ No newline at end of file
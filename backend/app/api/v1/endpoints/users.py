@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List
 
 from app import crud, schemas
-from app.crud.user import get_user_by_username, get_user_by_email
-from app.core.database import get_db
+from app.crud.user import get_user_by_username, get_user_by_email, get_users_async
+from app.core.database import get_async_db, get_db
 from app.deps import get_current_user
 from app.models.user import User as UserModel, UserRole
 
@@ -18,19 +19,20 @@ async def read_users_me(current_user: UserModel = Depends(get_current_user)):
 
 @router.get("/", response_model=List[schemas.User])
 async def get_users(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: UserModel = Depends(get_current_user)
 ):
     """Получить список всех пользователей (только для админа)"""
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    users = crud.get_users(db)
+    users = await get_users_async(db)
     # Исключаем других админов из списка для безопасности
     return [user for user in users if user.role != UserRole.ADMIN]
 
+# Обычный def: bcrypt и синхронная Session выполняются в пуле потоков, не в event loop
 @router.post("/register", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
-async def register_user(
+def register_user(
     user_in: schemas.user.UserCreate,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
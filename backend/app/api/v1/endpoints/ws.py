@@ -6,6 +6,8 @@ from app.core.config import settings
 from app.core.database import get_db
 from app.core.websocket_manager import manager
 from app.crud.user import get_user_by_username
+from app.models.user import UserRole
+from app.services.monitoring_stream import BRACELETS_CHANNEL, MONITORING_CHANNEL_PREFIX
 import json
 import logging
 
@@ -15,6 +17,28 @@ router = APIRouter()
 PUBLIC_WS_ROOMS = {"or"}
 
 
+def _is_public_room(room_id: str) -> bool:
+    # Поток дашборда палаты доступен планшетам так же, как GET /monitoring/dashboard
+    if room_id.startswith(MONITORING_CHANNEL_PREFIX):
+        return settings.ALLOW_PUBLIC_ROOM_DISPLAY
+    return room_id in PUBLIC_WS_ROOMS
+
+
+def _is_resync_request(data: str) -> bool:
+    try:
+        message = json.loads(data)
+    except ValueError:
+        return False
+    return isinstance(message, dict) and message.get("type") == "resync"
+
+
+async def _send_full_state(websocket: WebSocket, room_id: str) -> None:
+    """Полное состояние комнаты: при подключении и по запросу resync после пропуска seq."""
+    message = await manager.full_state_message(room_id)
+    if message is not None:
+        await manager.send_personal(message, websocket)
+
+
 async def get_current_user_ws(websocket: WebSocket, db: Session):
     token = websocket.query_params.get("token")
     if not token:
@@ -41,42 +65,49 @@ async def get_current_user_ws(websocket: WebSocket, db: Session):
 
 @router.websocket("/ws/{room_id}")
 async def websocket_endpoint(websocket: WebSocket, room_id: str, db: Session = Depends(get_db)):
-    is_public = room_id in PUBLIC_WS_ROOMS
+    is_public = _is_public_room(room_id)
     user = None
 
     if not is_public:
         user = await get_current_user_ws(websocket, db)
         if not user:
             return
+        if room_id == BRACELETS_CHANNEL and user.role not in (UserRole.ADMIN, UserRole.NURSE):
+            await websocket.close(code=1008)
+            return
 
     await manager.connect(websocket, room_id)
 
     try:
-        await websocket.send_text(
-            json.dumps(
-                {
-                    "type": "connected",
-                    "user": user.full_name if user else "public",
-                    "role": user.role.value if user else "public",
-                    "room": room_id,
-                },
-                ensure_ascii=False,
-            )
+        await manager.send_personal(
+            {
+                "type": "connected",
+                "user": user.full_name if user else "public",
+                "role": user.role.value if user else "public",
+                "room": room_id,
+            },
+            websocket,
         )
 
         if room_id == "or":
             from app.api.v1.endpoints.operating_room import (
+                OR_BOARD_PATCH_TYPE,
                 get_or_board_payload,
                 get_or_status_payload,
             )
 
-            await websocket.send_text(json.dumps(get_or_status_payload(), ensure_ascii=False))
-            await websocket.send_text(json.dumps(get_or_board_payload(), ensure_ascii=False))
+            await manager.send_personal(get_or_status_payload(), websocket)
+            # Остальным уйдёт патч, если доска успела измениться (например, датчики)
+            await manager.broadcast_state(get_or_board_payload(), "or", OR_BOARD_PATCH_TYPE)
+
+        await _send_full_state(websocket, room_id)
 
         while True:
             data = await websocket.receive_text()
             who = user.username if user else "public"
             logger.debug(f"WS message from {who}: {data[:100]}")
+            if _is_resync_request(data):
+                await _send_full_state(websocket, room_id)
 
     except WebSocketDisconnect:
         manager.disconnect(websocket, room_id)
@@ -9,10 +9,9 @@ from sqlalchemy.orm import Session, joinedload
 from app.bracelet_alerts.evaluator import normalize_bracelet_metrics
 from app.models.bed import Bed
 from app.models.patient import Patient, PatientStatus
+from app.services.monitoring_cache import get_monitoring_snapshot
 from app.services.monitoring_service import (
-    fetch_monitoring_snapshot,
     metrics_from_device,
-    monitoring_service,
     normalize_mac,
     parse_online_flag,
 )
@@ -55,7 +54,7 @@ def get_unassigned_devices(
     devices: List[Dict[str, Any]] = []
 
     try:
-        snapshot = fetch_monitoring_snapshot(monitoring_service)
+        snapshot = get_monitoring_snapshot()
         monitoring_connected = bool(snapshot["health"].get("ok", True)) and "error" not in snapshot.get(
             "state", {}
         )
@@ -0,0 +1,158 @@
+"""Пакетная проверка показателей многих браслетов за один проход.
+
+Показатели укладываются в столбцы NumPy (строка — устройство, столбец —
+каноническая метрика, NaN — нет значения), пороги пациентов — так же, и уровни
+для всего отделения получаются одним векторным сравнением. Без NumPy — поштучный
+``evaluate_metrics``; результат в обоих случаях одинаковый.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy есть в образе backend
+    np = None
+
+from app.bracelet_alerts.evaluator import _build_message, _format_range, _to_float, evaluate_metrics
+from app.bracelet_alerts.thresholds import (
+    BRACELET_THRESHOLDS,
+    CANONICAL_METRICS,
+    METRIC_ALIASES,
+    AlertLevel,
+    MetricThreshold,
+)
+from app.bracelet_alerts.types import VitalAlert
+
+ThresholdMap = Dict[str, MetricThreshold]
+BatchItem = Tuple[Dict[str, Any], Optional[ThresholdMap]]
+
+_METRIC_INDEX: Dict[str, int] = {key: i for i, key in enumerate(CANONICAL_METRICS)}
+# Порядок совпадает с индексами в массиве границ
+_BOUND_FIELDS = (
+    "normal_min",
+    "normal_max",
+    "warning_low",
+    "warning_high",
+    "critical_low",
+    "critical_high",
+)
+_LEVELS = (AlertLevel.NORMAL, AlertLevel.WARNING, AlertLevel.CRITICAL)
+
+
+def _resolve_thresholds(threshold_map: Optional[ThresholdMap]) -> Optional[List[Optional[MetricThreshold]]]:
+    """Пороги по столбцам; None — карта с метриками вне канонических (считаем поштучно)."""
+    thresholds = threshold_map or BRACELET_THRESHOLDS
+    if threshold_map and any(
+        METRIC_ALIASES.get(key, key) not in _METRIC_INDEX for key in threshold_map
+    ):
+        return None
+    return [thresholds.get(key) or BRACELET_THRESHOLDS.get(key) for key in CANONICAL_METRICS]
+
+
+def _evaluate_vectorized(
+    items: Sequence[BatchItem],
+    rows: List[int],
+    columns: List[List[Optional[MetricThreshold]]],
+) -> Dict[int, List[VitalAlert]]:
+    n_rows = len(rows)
+    n_metrics = len(CANONICAL_METRICS)
+
+    # Один ключ на метрику — обычный случай; hr + pulse одновременно — второй «слой»
+    entries: List[Tuple[int, int, int, float, int]] = []
+    depth = 1
+    for row, item_index in enumerate(rows):
+        occurrences = [0] * n_metrics
+        for position, (raw_key, raw_value) in enumerate(items[item_index][0].items()):
+            lowered = raw_key.lower()
+            column = _METRIC_INDEX.get(METRIC_ALIASES.get(lowered, lowered))
+            if column is None or columns[row][column] is None:
+                continue
+            value = _to_float(raw_value)
+            if value is None:
+                continue
+            layer = occurrences[column]
+            occurrences[column] += 1
+            depth = max(depth, layer + 1)
+            entries.append((layer, row, column, value, position))
+
+    values = np.full((depth, n_rows, n_metrics), np.nan)
+    positions = np.zeros((depth, n_rows, n_metrics), dtype=np.int64)
+    if entries:
+        layers, row_idx, col_idx, vals, pos = zip(*entries)
+        values[layers, row_idx, col_idx] = vals
+        positions[layers, row_idx, col_idx] = pos
+
+    bounds = np.full((len(_BOUND_FIELDS), n_rows, n_metrics), np.nan)
+    for row, thresholds in enumerate(columns):
+        for column, threshold in enumerate(thresholds):
+            if threshold is None:
+                continue
+            for field_index, field_name in enumerate(_BOUND_FIELDS):
+                bound = getattr(threshold, field_name)
+                if bound is not None:
+                    bounds[field_index, row, column] = bound
+    normal_min, normal_max, warning_low, warning_high, critical_low, critical_high = bounds
+
+    # Сравнение с NaN всегда False — это и есть «граница не задана» / «значения нет»
+    critical = (values < critical_low) | (values > critical_high)
+    warning = (
+        (values < warning_low)
+        | (values > warning_high)
+        | (values < normal_min)
+        | (values > normal_max)
+    )
+    levels = np.where(critical, 2, np.where(warning, 1, 0))
+
+    abnormal = levels > 0
+    first_layer = abnormal.argmax(axis=0)
+    alert_rows, alert_columns = np.nonzero(abnormal.any(axis=0))
+
+    found: Dict[int, List[Tuple[int, VitalAlert]]] = {}
+    for row, column in zip(alert_rows.tolist(), alert_columns.tolist()):
+        layer = int(first_layer[row, column])
+        value = float(values[layer, row, column])
+        level = _LEVELS[int(levels[layer, row, column])]
+        threshold = columns[row][column]
+        alert = VitalAlert(
+            metric=CANONICAL_METRICS[column],
+            label=threshold.label,
+            value=value,
+            unit=threshold.unit,
+            level=level,
+            message=_build_message(threshold, value, level),
+            normal_range=_format_range(threshold),
+        )
+        found.setdefault(rows[row], []).append((int(positions[layer, row, column]), alert))
+
+    return {
+        item_index: [alert for _, alert in sorted(pairs, key=lambda pair: pair[0])]
+        for item_index, pairs in found.items()
+    }
+
+
+def evaluate_metrics_batch(items: Sequence[BatchItem]) -> List[List[VitalAlert]]:
+    """``evaluate_metrics`` для каждой пары (показатели, пороги) — одним проходом."""
+    if np is None or not items:
+        return [evaluate_metrics(metrics, threshold_map) for metrics, threshold_map in items]
+
+    results: List[List[VitalAlert]] = [[] for _ in items]
+    resolved: Dict[int, Optional[List[Optional[MetricThreshold]]]] = {}
+    rows: List[int] = []
+    columns: List[List[Optional[MetricThreshold]]] = []
+
+    for item_index, (metrics, threshold_map) in enumerate(items):
+        key = id(threshold_map)
+        if key not in resolved:
+            resolved[key] = _resolve_thresholds(threshold_map)
+        thresholds = resolved[key]
+        if thresholds is None:
+            results[item_index] = evaluate_metrics(metrics, threshold_map)
+            continue
+        rows.append(item_index)
+        columns.append(thresholds)
+
+    if rows:
+        for item_index, alerts in _evaluate_vectorized(items, rows, columns).items():
+            results[item_index] = alerts
+    return results
@@ -6,16 +6,19 @@ from typing import Any, Dict, List, Optional
 
 from sqlalchemy.orm import Session, joinedload
 
-from app.bracelet_alerts.evaluator import evaluate_metrics, normalize_bracelet_metrics
-from app.bracelet_alerts.threshold_resolver import get_patient_threshold_map, has_custom_thresholds
+from app.bracelet_alerts.evaluator import normalize_bracelet_metrics
+from app.bracelet_alerts.incremental import (
+    DeviceReading,
+    IncrementalBraceletEvaluator,
+    bracelet_evaluator,
+)
 from app.bracelet_alerts.types import PatientBraceletSnapshot
 from app.models.bed import Bed
 from app.models.patient import Patient, PatientStatus
 from app.models.room import Room
+from app.services.monitoring_cache import get_monitoring_snapshot
 from app.services.monitoring_service import (
-    fetch_monitoring_snapshot,
     metrics_from_device,
-    monitoring_service,
     normalize_mac,
     parse_online_flag,
 )
@@ -39,7 +42,11 @@ def _admission_date_label(patient: Patient) -> Optional[str]:
     return patient.admission_date.isoformat()
 
 
-def collect_patient_snapshots(db: Session) -> tuple[List[PatientBraceletSnapshot], bool, Optional[str]]:
+def collect_patient_snapshots(
+    db: Session,
+    evaluator: Optional[IncrementalBraceletEvaluator] = None,
+) -> tuple[List[PatientBraceletSnapshot], bool, Optional[str]]:
+    evaluator = evaluator or bracelet_evaluator
     patients = (
         db.query(Patient)
         .options(joinedload(Patient.bed).joinedload(Bed.room))
@@ -52,7 +59,7 @@ def collect_patient_snapshots(db: Session) -> tuple[List[PatientBraceletSnapshot
     ble_map: Dict[str, Dict[str, Any]] = {}
 
     try:
-        snapshot = fetch_monitoring_snapshot(monitoring_service)
+        snapshot = get_monitoring_snapshot()
         monitoring_connected = bool(snapshot["health"].get("ok", True)) and "error" not in snapshot.get(
             "state", {}
         )
@@ -64,14 +71,16 @@ def collect_patient_snapshots(db: Session) -> tuple[List[PatientBraceletSnapshot
         monitoring_error = str(exc)
 
     results: List[PatientBraceletSnapshot] = []
+    readings: List[DeviceReading] = []
+    reading_snapshots: List[PatientBraceletSnapshot] = []
 
     for patient in patients:
         mac = normalize_mac(patient.ble_mac) if patient.ble_mac else None
         room_number, bed_number = _room_bed_labels(patient)
         admission_date = _admission_date_label(patient)
 
-        custom = has_custom_thresholds(patient.vital_threshold_overrides)
-        threshold_map = get_patient_threshold_map(patient.vital_threshold_overrides)
+        compiled = evaluator.thresholds_for(patient.id, patient.vital_threshold_overrides)
+        custom = compiled.has_custom
 
         if not mac:
             results.append(
@@ -109,21 +118,24 @@ def collect_patient_snapshots(db: Session) -> tuple[List[PatientBraceletSnapshot
             continue
 
         metrics = normalize_bracelet_metrics(metrics_from_device(device))
-        alerts = evaluate_metrics(metrics, threshold_map)
-
-        results.append(
-            PatientBraceletSnapshot(
-                patient_id=patient.id,
-                patient_name=patient.full_name,
-                ble_mac=mac,
-                room_number=room_number,
-                bed_number=bed_number,
-                admission_date=admission_date,
-                online=parse_online_flag(device),
-                metrics=metrics,
-                alerts=alerts,
-                has_custom_thresholds=custom,
-            )
+        snap = PatientBraceletSnapshot(
+            patient_id=patient.id,
+            patient_name=patient.full_name,
+            ble_mac=mac,
+            room_number=room_number,
+            bed_number=bed_number,
+            admission_date=admission_date,
+            online=parse_online_flag(device),
+            metrics=metrics,
+            alerts=[],
+            has_custom_thresholds=custom,
         )
+        results.append(snap)
+        readings.append(DeviceReading(mac=mac, patient_id=patient.id, metrics=metrics, thresholds=compiled))
+        reading_snapshots.append(snap)
+
+    for snap, alerts in zip(reading_snapshots, evaluator.alerts_for_devices(readings)):
+        snap.alerts = alerts
 
+    evaluator.retain({patient.id for patient in patients}, {reading.mac for reading in readings})
     return results, monitoring_connected, monitoring_error
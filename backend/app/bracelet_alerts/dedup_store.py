@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 import logging
-from typing import Optional
+from typing import List, Optional, Sequence, Tuple
 
 import redis
 
@@ -10,15 +10,54 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# (patient_id, metric, level, value)
+DedupCandidate = Tuple[int, str, str, float]
+
+# Проверка и отметка одним атомарным шагом: два параллельных цикла
+# (Celery beat и ручной /check) не отправят одно и то же дважды.
+_CLAIM_SCRIPT = """
+local claimed = {}
+for i, key in ipairs(KEYS) do
+    local value = ARGV[i + 1]
+    if redis.call('GET', key) ~= value then
+        redis.call('SETEX', key, ARGV[1], value)
+        claimed[i] = 1
+    else
+        claimed[i] = 0
+    end
+end
+return claimed
+"""
+
+# Снять отметку, если отправка не удалась и ключ никто не перезаписал
+_RELEASE_SCRIPT = """
+for i, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[i] then
+        redis.call('DEL', key)
+    end
+end
+return 0
+"""
+
 
 class AlertDedupStore:
-    def __init__(self, redis_url: Optional[str] = None, cooldown_seconds: Optional[int] = None):
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        cooldown_seconds: Optional[int] = None,
+        atomic: Optional[bool] = None,
+    ):
         self.cooldown_seconds = cooldown_seconds or settings.BRACELET_ALERT_COOLDOWN_SEC
+        self.atomic = settings.BRACELET_ALERT_DEDUP_ATOMIC if atomic is None else atomic
         self._client: Optional[redis.Redis] = None
+        self._claim = None
+        self._release = None
         url = redis_url or settings.REDIS_URL
         try:
             self._client = redis.from_url(url, decode_responses=True)
             self._client.ping()
+            self._claim = self._client.register_script(_CLAIM_SCRIPT)
+            self._release = self._client.register_script(_RELEASE_SCRIPT)
         except Exception as exc:
             logger.warning("Redis dedup unavailable, alerts may repeat: %s", exc)
             self._client = None
@@ -40,3 +79,38 @@ class AlertDedupStore:
             return
         key = self._key(patient_id, metric, level)
         self._client.setex(key, self.cooldown_seconds, str(value))
+
+    def filter_unsent(self, candidates: Sequence[DedupCandidate]) -> List[bool]:
+        """``should_send`` для всех кандидатов одним MGET."""
+        if not self._client or not candidates:
+            return [True] * len(candidates)
+        keys = [self._key(pid, metric, level) for pid, metric, level, _ in candidates]
+        stored = self._client.mget(keys)
+        return [
+            current is None or current != str(value)
+            for current, (_, _, _, value) in zip(stored, candidates)
+        ]
+
+    def mark_sent_many(self, candidates: Sequence[DedupCandidate]) -> None:
+        """``mark_sent`` для всех отправленных одним pipeline."""
+        if not self._client or not candidates:
+            return
+        with self._client.pipeline(transaction=False) as pipe:
+            for pid, metric, level, value in candidates:
+                pipe.setex(self._key(pid, metric, level), self.cooldown_seconds, str(value))
+            pipe.execute()
+
+    def claim(self, candidates: Sequence[DedupCandidate]) -> List[bool]:
+        """Атомарно проверить и отметить; True — этот вызов должен отправить алерт."""
+        if not self._client or not candidates:
+            return [True] * len(candidates)
+        keys = [self._key(pid, metric, level) for pid, metric, level, _ in candidates]
+        args = [self.cooldown_seconds, *(str(value) for _, _, _, value in candidates)]
+        return [bool(flag) for flag in self._claim(keys=keys, args=args)]
+
+    def release(self, candidates: Sequence[DedupCandidate]) -> None:
+        """Вернуть захваченные ``claim`` ключи, если отправка не удалась."""
+        if not self._client or not candidates:
+            return
+        keys = [self._key(pid, metric, level) for pid, metric, level, _ in candidates]
+        self._release(keys=keys, args=[str(value) for _, _, _, value in candidates])
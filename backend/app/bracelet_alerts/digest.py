@@ -0,0 +1,186 @@
+"""Сводные сообщения MAX: алерты цикла группируются в несколько HTML-сообщений.
+
+Режим задаётся на чат (``MAX_ALERT_DIGEST_MODE`` / ``MAX_ALERT_DIGEST_CHAT_MODES``):
+
+- ``room`` — одно сообщение на палату (без палаты — на пациента);
+- ``severity`` — одно сообщение на уровень (предупреждения отдельно);
+- ``off`` — как раньше, сообщение на каждый алерт.
+
+Критические алерты в сводку не попадают: у каждого пациента своё сообщение, и оно
+уходит первым. Длинная сводка делится на части не длиннее ``MESSAGE_LIMIT``
+по границам пациентов, так что каждая часть подтверждается отдельно.
+"""
+from __future__ import annotations
+
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.bracelet_alerts.dedup_store import DedupCandidate
+from app.bracelet_alerts.thresholds import AlertLevel
+from app.bracelet_alerts.types import PatientBraceletSnapshot, VitalAlert
+from app.core.config import settings
+
+DIGEST_MODES = ("room", "severity", "off")
+MESSAGE_LIMIT = 4000
+
+CRITICAL_PREFIX = "critical:"
+
+AlertJob = Dict[str, Any]
+DigestMessage = Tuple[str, List[AlertJob]]
+
+
+def parse_chat_digest_modes(raw: str) -> Dict[int, str]:
+    """Формат: ``-100123=severity,-100456=off`` (chat_id → режим)."""
+    result: Dict[int, str] = {}
+    for part in raw.split(","):
+        part = part.strip()
+        if not part or "=" not in part:
+            continue
+        chat_raw, mode = part.split("=", 1)
+        mode = mode.strip().lower()
+        if mode not in DIGEST_MODES:
+            continue
+        try:
+            result[int(chat_raw.strip())] = mode
+        except ValueError:
+            continue
+    return result
+
+
+def digest_mode_for_chat(chat_id: Optional[int]) -> str:
+    if chat_id is not None:
+        mode = parse_chat_digest_modes(settings.MAX_ALERT_DIGEST_CHAT_MODES).get(chat_id)
+        if mode:
+            return mode
+    mode = (settings.MAX_ALERT_DIGEST_MODE or "room").strip().lower()
+    return mode if mode in DIGEST_MODES else "room"
+
+
+def _alert_to_dict(alert: VitalAlert) -> Dict[str, Any]:
+    return {
+        "metric": alert.metric,
+        "label": alert.label,
+        "value": alert.value,
+        "unit": alert.unit,
+        "level": alert.level.value,
+        "message": alert.message,
+        "normal_range": alert.normal_range,
+    }
+
+
+def build_alert_job(snapshot: PatientBraceletSnapshot, alerts: Sequence[VitalAlert], group: str) -> AlertJob:
+    """Сериализуемое задание: алерты одного пациента в одной группе сводки."""
+    return {
+        "id": uuid.uuid4().hex,
+        "group": group,
+        "patient_id": snapshot.patient_id,
+        "patient_name": snapshot.patient_name,
+        "room_number": snapshot.room_number,
+        "bed_number": snapshot.bed_number,
+        "alerts": [_alert_to_dict(alert) for alert in alerts],
+        "attempts": 0,
+        "enqueued_at": time.time(),
+    }
+
+
+def build_patient_jobs(
+    snapshot: PatientBraceletSnapshot,
+    alerts: Sequence[VitalAlert],
+    mode: str,
+) -> List[AlertJob]:
+    """Разложить алерты пациента по группам сводки; критические — отдельным заданием."""
+    if mode == "off":
+        return [
+            build_alert_job(snapshot, [alert], f"alert:{snapshot.patient_id}:{alert.metric}")
+            for alert in alerts
+        ]
+
+    critical = [alert for alert in alerts if alert.level == AlertLevel.CRITICAL]
+    rest = [alert for alert in alerts if alert.level != AlertLevel.CRITICAL]
+    jobs: List[AlertJob] = []
+    if critical:
+        jobs.append(build_alert_job(snapshot, critical, f"{CRITICAL_PREFIX}{snapshot.patient_id}"))
+    if rest:
+        if mode == "severity":
+            group = f"severity:{AlertLevel.WARNING.value}"
+        elif snapshot.room_number:
+            group = f"room:{snapshot.room_number}"
+        else:
+            group = f"patient:{snapshot.patient_id}"
+        jobs.append(build_alert_job(snapshot, rest, group))
+    return jobs
+
+
+def dedup_candidates(job: AlertJob) -> List[DedupCandidate]:
+    return [(job["patient_id"], a["metric"], a["level"], a["value"]) for a in job["alerts"]]
+
+
+def render_jobs(jobs: Sequence[AlertJob]) -> List[DigestMessage]:
+    """Сводки по всем группам заданий; критические — первыми."""
+    groups: Dict[str, List[AlertJob]] = {}
+    for job in jobs:
+        groups.setdefault(job["group"], []).append(job)
+    return [
+        message
+        for group in sorted(groups, key=lambda g: not is_priority_group(g))
+        for message in render_digest(group, groups[group])
+    ]
+
+
+def is_priority_group(group: str) -> bool:
+    return group.startswith(CRITICAL_PREFIX)
+
+
+def _header(group: str, jobs: Sequence[AlertJob]) -> str:
+    critical = any(a["level"] == AlertLevel.CRITICAL.value for job in jobs for a in job["alerts"])
+    emoji = "🔴" if critical else "🟠"
+    if group.startswith("room:"):
+        return f"{emoji} <b>Браслеты — сводка по палате {group.split(':', 1)[1]}</b>"
+    if group.startswith("severity:"):
+        return f"{emoji} <b>Браслеты — сводка отклонений</b>"
+    if critical:
+        return f"{emoji} <b>Браслет — критическое отклонение</b>"
+    return f"{emoji} <b>Браслет — отклонение показателя</b>"
+
+
+def _location(job: AlertJob) -> str:
+    parts = []
+    if job.get("room_number"):
+        parts.append(f"палата {job['room_number']}")
+    if job.get("bed_number"):
+        parts.append(f"койка {job['bed_number']}")
+    return ", ".join(parts) if parts else "место не указано"
+
+
+def _patient_block(jobs: Sequence[AlertJob]) -> str:
+    job = jobs[-1]
+    lines = [f"Пациент: {job['patient_name']} ({_location(job)})"]
+    for alert in (a for j in jobs for a in j["alerts"]):
+        lines.append(
+            f"• {alert['label']} = {alert['value']:g} {alert['unit']} "
+            f"(норма: {alert['normal_range']}) — {alert['message']}"
+        )
+    return "\n".join(lines)
+
+
+def render_digest(group: str, jobs: Sequence[AlertJob], limit: int = MESSAGE_LIMIT) -> List[DigestMessage]:
+    """Сообщения группы: (текст, задания в нём); части не длиннее ``limit``."""
+    by_patient: Dict[Any, List[AlertJob]] = {}
+    for job in jobs:
+        by_patient.setdefault(job["patient_id"], []).append(job)
+
+    header = _header(group, jobs)
+    messages: List[DigestMessage] = []
+    text = header
+    included: List[AlertJob] = []
+    for patient_jobs in by_patient.values():
+        block = _patient_block(patient_jobs)
+        if included and len(text) + 2 + len(block) > limit:
+            messages.append((text, included))
+            text, included = header, []
+        text = f"{text}\n\n{block}"[:limit]
+        included.extend(patient_jobs)
+    if included:
+        messages.append((text, included))
+    return messages
@@ -0,0 +1,259 @@
+"""Очередь исходящих оповещений MAX в Redis.
+
+Проверка браслетов только ставит алерты в очередь (``enqueue_jobs``),
+доставкой занимается отдельная Celery-задача (``deliver_pending``):
+
+- задания лежат в Redis (``max_outbox:*``) и переживают перезапуск воркеров;
+  взятое в работу задание без подтверждения возвращается в очередь по истечении аренды;
+- задания одной группы склеиваются в сводку (``digest``), критические уходят первыми;
+- отправка — пулом потоков под общим token bucket (``MAX_DISPATCH_RATE_PER_SEC``);
+- ошибка — повтор с экспоненциальной задержкой, после ``MAX_DISPATCH_MAX_ATTEMPTS``
+  попыток задание удаляется, а отметки дедупа снимаются, чтобы алерт нашёлся снова;
+- сообщение, которому не хватило токена до конца бюджета запуска, не отправлялось вовсе:
+  его задания возвращаются в очередь без траты попытки.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, List, Optional, Sequence
+
+import redis
+
+from app.bracelet_alerts.dedup_store import AlertDedupStore
+from app.bracelet_alerts.digest import (
+    AlertJob,
+    DigestMessage,
+    dedup_candidates,
+    render_jobs,
+)
+from app.bracelet_alerts.max_notifier import MaxBotNotifier
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+JOBS_KEY = "max_outbox:jobs"
+READY_KEY = "max_outbox:ready"
+INFLIGHT_KEY = "max_outbox:inflight"
+BUCKET_KEY = "max_outbox:bucket"
+
+MAX_BACKOFF_SECONDS = 300.0
+
+# Вернуть просроченные аренды в очередь и забрать готовые задания
+_CLAIM_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, id in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('ZADD', KEYS[1], ARGV[1], id)
+end
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[1], id)
+    redis.call('ZADD', KEYS[2], ARGV[2], id)
+end
+return ids
+"""
+
+# Token bucket: 0 — токен взят, иначе сколько секунд ждать следующего
+_TOKEN_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+
+class SendOutcome(str, Enum):
+    SENT = "sent"
+    FAILED = "failed"
+    # Токен не получен до конца бюджета — отправка не начиналась
+    DEFERRED = "deferred"
+
+
+@dataclass
+class DeliveryResult:
+    claimed: int = 0
+    messages_sent: int = 0
+    retried: int = 0
+    dropped: int = 0
+    deferred: int = 0
+
+
+class MaxDispatchQueue:
+    def __init__(self, redis_url: Optional[str] = None):
+        self._client: Optional[redis.Redis] = None
+        self._claim = None
+        self._take_token = None
+        try:
+            client = redis.from_url(redis_url or settings.REDIS_URL, decode_responses=True)
+            client.ping()
+            self._claim = client.register_script(_CLAIM_SCRIPT)
+            self._take_token = client.register_script(_TOKEN_SCRIPT)
+            self._client = client
+        except Exception as exc:
+            logger.warning("MAX dispatch queue unavailable, alerts will be sent inline: %s", exc)
+
+    @property
+    def available(self) -> bool:
+        return self._client is not None
+
+    def enqueue_jobs(self, jobs: Sequence[AlertJob]) -> None:
+        """Задания цикла (``digest.build_patient_jobs``) — одним pipeline."""
+        if not jobs:
+            return
+        with self._client.pipeline() as pipe:
+            for job in jobs:
+                pipe.hset(JOBS_KEY, job["id"], json.dumps(job, ensure_ascii=False))
+                pipe.zadd(READY_KEY, {job["id"]: job["enqueued_at"]})
+            pipe.execute()
+        metrics.inc("max_dispatch_enqueued", sum(len(job["alerts"]) for job in jobs))
+
+    def pending_count(self) -> int:
+        if not self._client:
+            return 0
+        return int(self._client.zcard(READY_KEY)) + int(self._client.zcard(INFLIGHT_KEY))
+
+    def _claim_jobs(self, limit: int, lease_seconds: float) -> List[Dict[str, Any]]:
+        now = time.time()
+        ids = self._claim(keys=[READY_KEY, INFLIGHT_KEY], args=[now, now + lease_seconds, limit])
+        if not ids:
+            return []
+        jobs: List[Dict[str, Any]] = []
+        orphans: List[str] = []
+        for job_id, raw in zip(ids, self._client.hmget(JOBS_KEY, ids)):
+            if raw is None:
+                orphans.append(job_id)
+                continue
+            jobs.append(json.loads(raw))
+        if orphans:
+            self._client.zrem(INFLIGHT_KEY, *orphans)
+        return jobs
+
+    def _ack(self, jobs: Sequence[Dict[str, Any]]) -> None:
+        ids = [job["id"] for job in jobs]
+        with self._client.pipeline() as pipe:
+            pipe.hdel(JOBS_KEY, *ids)
+            pipe.zrem(INFLIGHT_KEY, *ids)
+            pipe.execute()
+
+    def _retry(self, jobs: Sequence[Dict[str, Any]], max_attempts: int, backoff: float) -> List[Dict[str, Any]]:
+        """Отложить задания; вернуть те, у которых кончились попытки (уже удалены)."""
+        dropped: List[Dict[str, Any]] = []
+        now = time.time()
+        with self._client.pipeline() as pipe:
+            for job in jobs:
+                job["attempts"] = int(job.get("attempts", 0)) + 1
+                if job["attempts"] >= max_attempts:
+                    dropped.append(job)
+                    pipe.hdel(JOBS_KEY, job["id"])
+                    pipe.zrem(INFLIGHT_KEY, job["id"])
+                    continue
+                delay = min(MAX_BACKOFF_SECONDS, backoff * 2 ** (job["attempts"] - 1))
+                pipe.hset(JOBS_KEY, job["id"], json.dumps(job, ensure_ascii=False))
+                pipe.zrem(INFLIGHT_KEY, job["id"])
+                pipe.zadd(READY_KEY, {job["id"]: now + delay})
+            pipe.execute()
+        return dropped
+
+    def _defer(self, jobs: Sequence[Dict[str, Any]]) -> None:
+        """Вернуть неотправленные задания в очередь на прежнее место, не трогая ``attempts``."""
+        with self._client.pipeline() as pipe:
+            for job in jobs:
+                pipe.zrem(INFLIGHT_KEY, job["id"])
+                pipe.zadd(READY_KEY, {job["id"]: job["enqueued_at"]})
+            pipe.execute()
+
+    def _acquire_token(self, rate: float, burst: int, deadline: float) -> bool:
+        while True:
+            wait = float(self._take_token(keys=[BUCKET_KEY], args=[rate, burst, time.time()]))
+            if wait <= 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def deliver_pending(
+        self,
+        notifier: Optional[MaxBotNotifier] = None,
+        dedup: Optional[AlertDedupStore] = None,
+    ) -> DeliveryResult:
+        """Забрать готовые задания, собрать сводки и отправить в пределах бюджета времени."""
+        result = DeliveryResult()
+        if not self._client:
+            return result
+        notifier = notifier or MaxBotNotifier()
+        if not notifier.is_configured:
+            return result
+
+        budget = float(settings.MAX_DISPATCH_RUN_BUDGET_SEC)
+        deadline = time.monotonic() + budget
+        jobs = self._claim_jobs(settings.MAX_DISPATCH_BATCH_SIZE, lease_seconds=budget + notifier.timeout)
+        result.claimed = len(jobs)
+        if not jobs:
+            return result
+
+        # Критические — отдельными сообщениями и первыми в очереди к token bucket
+        messages = render_jobs(jobs)
+
+        def deliver(message: DigestMessage) -> SendOutcome:
+            if not self._acquire_token(
+                settings.MAX_DISPATCH_RATE_PER_SEC, settings.MAX_DISPATCH_BURST, deadline
+            ):
+                return SendOutcome.DEFERRED
+            return SendOutcome.SENT if notifier.send_text(message[0]) else SendOutcome.FAILED
+
+        workers = max(1, min(settings.MAX_DISPATCH_WORKERS, len(messages)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="max-dispatch") as pool:
+            outcomes = list(pool.map(deliver, messages))
+
+        delivered: List[Dict[str, Any]] = []
+        failed: List[Dict[str, Any]] = []
+        deferred: List[Dict[str, Any]] = []
+        for (_, message_jobs), outcome in zip(messages, outcomes):
+            if outcome is SendOutcome.SENT:
+                delivered.extend(message_jobs)
+                result.messages_sent += 1
+            elif outcome is SendOutcome.FAILED:
+                failed.extend(message_jobs)
+            else:
+                deferred.extend(message_jobs)
+
+        if delivered:
+            self._ack(delivered)
+        if deferred:
+            self._defer(deferred)
+            result.deferred = len(deferred)
+        if failed:
+            dropped = self._retry(
+                failed, settings.MAX_DISPATCH_MAX_ATTEMPTS, settings.MAX_DISPATCH_BACKOFF_SEC
+            )
+            result.retried = len(failed) - len(dropped)
+            result.dropped = len(dropped)
+            if dropped:
+                logger.error("MAX dispatch: dropped %s alert job(s) after retries", len(dropped))
+                (dedup or AlertDedupStore()).release(
+                    [candidate for job in dropped for candidate in dedup_candidates(job)]
+                )
+
+        metrics.inc("max_dispatch_messages_sent", result.messages_sent)
+        metrics.inc("max_dispatch_retries", result.retried)
+        metrics.inc("max_dispatch_dropped", result.dropped)
+        metrics.inc("max_dispatch_deferred", result.deferred)
+        return result
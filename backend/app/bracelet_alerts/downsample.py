@@ -0,0 +1,84 @@
+"""Прореживание рядов тренда до заданного числа точек.
+
+- ``lttb`` — Largest-Triangle-Three-Buckets: из каждой корзины берётся точка,
+  образующая наибольший треугольник с соседями; форма графика сохраняется.
+- ``minmax`` — из каждой корзины минимум и максимум в порядке времени;
+  кратковременные выбросы (провал SpO2, скачок пульса) не теряются.
+
+Ряды — параллельные списки ``timestamps`` (секунды Unix) и значений, по возрастанию времени.
+"""
+from __future__ import annotations
+
+from typing import List, Optional, Sequence, Tuple
+
+DOWNSAMPLE_MODES = ("lttb", "minmax")
+
+Series = Tuple[List[int], List[float]]
+
+
+def lttb(timestamps: Sequence[int], values: Sequence[float], threshold: int) -> Series:
+    """LTTB: не больше ``threshold`` точек (``threshold >= 3``), первая и последняя сохраняются."""
+    n = len(timestamps)
+    if threshold >= n or threshold < 3:
+        return list(timestamps), list(values)
+
+    out_t: List[int] = [timestamps[0]]
+    out_v: List[float] = [values[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Средняя точка следующей корзины — третья вершина треугольника
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        span = next_end - next_start
+        avg_t = sum(timestamps[next_start:next_end]) / span
+        avg_v = sum(values[next_start:next_end]) / span
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        at, av = timestamps[a], values[a]
+        best_area = -1.0
+        best = start
+        for j in range(start, end):
+            area = abs((at - avg_t) * (values[j] - av) - (at - timestamps[j]) * (avg_v - av))
+            if area > best_area:
+                best_area = area
+                best = j
+        out_t.append(timestamps[best])
+        out_v.append(values[best])
+        a = best
+
+    out_t.append(timestamps[-1])
+    out_v.append(values[-1])
+    return out_t, out_v
+
+
+def minmax(
+    timestamps: Sequence[int],
+    mins: Sequence[float],
+    maxs: Optional[Sequence[float]],
+    threshold: int,
+) -> Series:
+    """Не больше ``threshold`` точек: минимум и максимум каждой из ``threshold // 2`` корзин.
+
+    Для агрегатов ``mins``/``maxs`` — границы корзины, для сырых замеров ``maxs`` не задают.
+    """
+    maxs = maxs if maxs is not None else mins
+    n = len(timestamps)
+    buckets = min(n, max(1, threshold // 2))
+    out_t: List[int] = []
+    out_v: List[float] = []
+    for b in range(buckets):
+        idx = range(b * n // buckets, (b + 1) * n // buckets)
+        lo = min(idx, key=lambda i: mins[i])
+        hi = max(idx, key=lambda i: maxs[i])
+        if mins[lo] == maxs[hi]:
+            out_t.append(timestamps[lo])
+            out_v.append(mins[lo])
+            continue
+        # Внутри корзины точки идут по времени, чтобы линия не шла назад
+        pair = ((lo, mins[lo]), (hi, maxs[hi])) if lo <= hi else ((hi, maxs[hi]), (lo, mins[lo]))
+        for i, value in pair:
+            out_t.append(timestamps[i])
+            out_v.append(value)
+    return out_t, out_v
@@ -0,0 +1,120 @@
+"""Инкрементальная проверка браслетов: пересчёт только изменившихся устройств.
+
+Хранит на процесс скомпилированную таблицу порогов каждого пациента и последний
+вектор показаний каждого MAC. ``evaluate_metrics`` вызывается заново, только если
+изменились показания устройства или персональные пороги пациента (все такие
+устройства — одним пакетом ``evaluate_metrics_batch``); иначе отдаются алерты
+прошлого цикла. Работа за цикл растёт с числом изменений, а не с размером
+отделения.
+"""
+from __future__ import annotations
+
+import copy
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Collection, Dict, List, Optional, Sequence
+
+from app.bracelet_alerts.batch_evaluator import evaluate_metrics_batch
+from app.bracelet_alerts.threshold_resolver import get_patient_threshold_map, has_custom_thresholds
+from app.bracelet_alerts.thresholds import MetricThreshold
+from app.bracelet_alerts.types import VitalAlert
+from app.core.metrics import metrics as app_metrics
+
+
+@dataclass
+class CompiledThresholds:
+    overrides: Optional[Dict[str, Any]]
+    threshold_map: Dict[str, MetricThreshold]
+    has_custom: bool
+
+
+@dataclass
+class DeviceReading:
+    mac: str
+    patient_id: int
+    metrics: Dict[str, Any]
+    thresholds: CompiledThresholds
+
+
+@dataclass
+class _DeviceState:
+    patient_id: int
+    thresholds: CompiledThresholds
+    metrics: Dict[str, Any]
+    alerts: List[VitalAlert] = field(default_factory=list)
+
+
+class IncrementalBraceletEvaluator:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._thresholds: Dict[int, CompiledThresholds] = {}
+        self._devices: Dict[str, _DeviceState] = {}
+
+    def thresholds_for(self, patient_id: int, overrides: Optional[Dict[str, Any]]) -> CompiledThresholds:
+        """Таблица порогов пациента; пересобирается только при смене overrides."""
+        with self._lock:
+            compiled = self._thresholds.get(patient_id)
+            if compiled is not None and compiled.overrides == overrides:
+                return compiled
+            compiled = CompiledThresholds(
+                overrides=copy.deepcopy(overrides),
+                threshold_map=get_patient_threshold_map(overrides),
+                has_custom=has_custom_thresholds(overrides),
+            )
+            self._thresholds[patient_id] = compiled
+            return compiled
+
+    def alerts_for_devices(self, devices: Sequence[DeviceReading]) -> List[List[VitalAlert]]:
+        """Алерты по каждому устройству; изменившиеся считаются одним пакетом."""
+        results: List[List[VitalAlert]] = [[] for _ in devices]
+        pending: List[int] = []
+        with self._lock:
+            for index, device in enumerate(devices):
+                state = self._devices.get(device.mac)
+                if (
+                    state is not None
+                    and state.patient_id == device.patient_id
+                    and state.thresholds is device.thresholds
+                    and state.metrics == device.metrics
+                ):
+                    results[index] = list(state.alerts)
+                else:
+                    pending.append(index)
+
+        skipped = len(devices) - len(pending)
+        if skipped:
+            app_metrics.inc("bracelet_alert_evaluations_skipped", skipped)
+        if not pending:
+            return results
+
+        evaluated = evaluate_metrics_batch(
+            [(devices[i].metrics, devices[i].thresholds.threshold_map) for i in pending]
+        )
+        app_metrics.inc("bracelet_alert_evaluations", len(pending))
+        with self._lock:
+            for index, alerts in zip(pending, evaluated):
+                device = devices[index]
+                self._devices[device.mac] = _DeviceState(
+                    patient_id=device.patient_id,
+                    thresholds=device.thresholds,
+                    metrics=dict(device.metrics),
+                    alerts=alerts,
+                )
+                results[index] = list(alerts)
+        return results
+
+    def retain(self, patient_ids: Collection[int], macs: Collection[str]) -> None:
+        """Забыть выписанных пациентов и отвязанные/пропавшие браслеты."""
+        with self._lock:
+            for patient_id in [pid for pid in self._thresholds if pid not in patient_ids]:
+                del self._thresholds[patient_id]
+            for mac in [m for m in self._devices if m not in macs]:
+                del self._devices[mac]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._thresholds.clear()
+            self._devices.clear()
+
+
+bracelet_evaluator = IncrementalBraceletEvaluator()
@@ -23,6 +23,7 @@ class MaxBotNotifier:
         self.chat_id = chat_id if chat_id is not None else settings.MAX_ALERT_CHAT_ID
         base = (api_base or settings.MAX_API_BASE_URL or "https://platform-api.max.ru").rstrip("/")
         self.messages_url = f"{base}/messages"
+        self.timeout = settings.MAX_API_TIMEOUT
 
     @property
     def is_configured(self) -> bool:
@@ -41,7 +42,7 @@ class MaxBotNotifier:
                     "Content-Type": "application/json",
                 },
                 json={"text": text[:4000], "notify": True, "format": "html"},
-                timeout=settings.MAX_API_TIMEOUT,
+                timeout=self.timeout,
             )
             response.raise_for_status()
             return True
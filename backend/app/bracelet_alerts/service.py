@@ -4,12 +4,20 @@ from __future__ import annotations
 import json
 import logging
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
 from app.bracelet_alerts.collector import collect_patient_snapshots
-from app.bracelet_alerts.dedup_store import AlertDedupStore
+from app.bracelet_alerts.dedup_store import AlertDedupStore, DedupCandidate
+from app.bracelet_alerts.digest import (
+    AlertJob,
+    build_patient_jobs,
+    dedup_candidates,
+    digest_mode_for_chat,
+    render_jobs,
+)
+from app.bracelet_alerts.dispatch_queue import MaxDispatchQueue
 from app.bracelet_alerts.max_notifier import MaxBotNotifier
 from app.bracelet_alerts.types import CheckResult, PatientBraceletSnapshot, VitalAlert
 from app.core.config import settings
@@ -19,26 +27,45 @@ logger = logging.getLogger(__name__)
 LAST_CHECK_REDIS_KEY = "ble_alerts:last_check"
 
 
+PendingAlert = Tuple[Tuple[PatientBraceletSnapshot, VitalAlert], DedupCandidate]
+
+
 class BraceletAlertService:
     def __init__(
         self,
         notifier: Optional[MaxBotNotifier] = None,
         dedup: Optional[AlertDedupStore] = None,
+        queue: Optional[MaxDispatchQueue] = None,
     ):
         self.notifier = notifier or MaxBotNotifier()
         self.dedup = dedup or AlertDedupStore()
+        self._queue = queue
         self._enabled = settings.BRACELET_ALERTS_ENABLED
 
-    def check_and_notify(self, db: Session, send_to_max: bool = True) -> CheckResult:
+    @property
+    def queue(self) -> MaxDispatchQueue:
+        # Подключаемся к очереди только когда есть что отправлять
+        if self._queue is None:
+            self._queue = MaxDispatchQueue()
+        return self._queue
+
+    def check_and_notify(
+        self,
+        db: Session,
+        send_to_max: bool = True,
+        store_last_check: bool = True,
+    ) -> CheckResult:
         checked_at = datetime.now(timezone.utc).isoformat()
         snapshots, monitoring_connected, monitoring_error = collect_patient_snapshots(db)
 
         alerts_found = 0
         alerts_sent = 0
+        alerts_queued = 0
         alerts_skipped = 0
         patients_with_ble = 0
         patients_online = 0
 
+        pending: List[Tuple[PatientBraceletSnapshot, VitalAlert]] = []
         for snap in snapshots:
             if snap.ble_mac:
                 patients_with_ble += 1
@@ -51,12 +78,47 @@ class BraceletAlertService:
                     continue
                 if not self.notifier.is_configured:
                     continue
-                if not self.dedup.should_send(snap.patient_id, alert.metric, alert.level.value, alert.value):
-                    alerts_skipped += 1
-                    continue
-                if self._send_single_alert(snap, alert):
-                    self.dedup.mark_sent(snap.patient_id, alert.metric, alert.level.value, alert.value)
-                    alerts_sent += 1
+                pending.append((snap, alert))
+
+        if pending:
+            candidates = [
+                (snap.patient_id, alert.metric, alert.level.value, alert.value) for snap, alert in pending
+            ]
+            if self.dedup.atomic:
+                allowed = self.dedup.claim(candidates)
+            else:
+                allowed = self.dedup.filter_unsent(candidates)
+            to_send: List[PendingAlert] = [
+                item for item, ok in zip(zip(pending, candidates), allowed) if ok
+            ]
+            alerts_skipped = len(pending) - len(to_send)
+
+            jobs = self._build_jobs(item for item, _ in to_send)
+            queued: List[DedupCandidate] = []
+            if jobs and settings.MAX_DISPATCH_QUEUE_ENABLED and self.queue.available:
+                try:
+                    self.queue.enqueue_jobs(jobs)
+                    queued = [candidate for _, candidate in to_send]
+                    alerts_queued = len(queued)
+                    jobs = []
+                except Exception as exc:
+                    logger.warning("MAX enqueue failed, sending inline: %s", exc)
+
+            # Без очереди (нет Redis или выключена) — сводки отправляются сразу
+            sent: List[DedupCandidate] = []
+            failed: List[DedupCandidate] = []
+            for text, message_jobs in render_jobs(jobs):
+                candidates_in_message = [c for job in message_jobs for c in dedup_candidates(job)]
+                if self.notifier.send_text(text):
+                    sent.extend(candidates_in_message)
+                    alerts_sent += len(candidates_in_message)
+                else:
+                    failed.extend(candidates_in_message)
+
+            if self.dedup.atomic:
+                self.dedup.release(failed)
+            else:
+                self.dedup.mark_sent_many(sent + queued)
 
         result = CheckResult(
             checked_at=checked_at,
@@ -69,13 +131,23 @@ class BraceletAlertService:
             monitoring_connected=monitoring_connected,
             error=monitoring_error,
             snapshots=snapshots,
+            alerts_queued=alerts_queued,
         )
-        self._store_last_check(result)
+        if store_last_check:
+            self._store_last_check(result)
         return result
 
-    def _send_single_alert(self, snapshot: PatientBraceletSnapshot, alert: VitalAlert) -> bool:
-        text = self.notifier.format_alert_message(snapshot, alert)
-        return self.notifier.send_text(text)
+    def _build_jobs(self, items: Iterable[Tuple[PatientBraceletSnapshot, VitalAlert]]) -> List[AlertJob]:
+        """Алерты цикла → задания сводки в режиме чата (``digest``)."""
+        by_patient: Dict[int, Tuple[PatientBraceletSnapshot, List[VitalAlert]]] = {}
+        for snap, alert in items:
+            by_patient.setdefault(snap.patient_id, (snap, []))[1].append(alert)
+        mode = digest_mode_for_chat(self.notifier.chat_id)
+        return [
+            job
+            for snap, alerts in by_patient.values()
+            for job in build_patient_jobs(snap, alerts, mode)
+        ]
 
     def _store_last_check(self, result: CheckResult) -> None:
         try:
@@ -86,6 +158,7 @@ class BraceletAlertService:
                 "checked_at": result.checked_at,
                 "alerts_found": result.alerts_found,
                 "alerts_sent": result.alerts_sent,
+                "alerts_queued": result.alerts_queued,
                 "monitoring_connected": result.monitoring_connected,
             }
             client.setex(LAST_CHECK_REDIS_KEY, 86400, json.dumps(payload, ensure_ascii=False))
@@ -93,5 +166,5 @@ class BraceletAlertService:
             logger.debug("Could not store last check: %s", exc)
 
     def get_overview(self, db: Session) -> CheckResult:
-        """Только сбор данных без отправки в MAX."""
-        return self.check_and_notify(db, send_to_max=False)
+        """Только сбор данных: без отправки в MAX и без записи «последней проверки»."""
+        return self.check_and_notify(db, send_to_max=False, store_last_check=False)
@@ -44,3 +44,4 @@ class CheckResult:
     monitoring_connected: bool
     error: Optional[str] = None
     snapshots: List[PatientBraceletSnapshot] = field(default_factory=list)
+    alerts_queued: int = 0
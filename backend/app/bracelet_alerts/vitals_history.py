@@ -0,0 +1,439 @@
+"""История показаний браслетов: сырые замеры, минутные/часовые агрегаты и тренды.
+
+Фоновый refresher снимка мониторинга раз в ``BRACELET_VITALS_SAMPLE_SEC`` передаёт
+снимок в ``BraceletVitalsRecorder``: одна пачка ``INSERT ... ON CONFLICT DO NOTHING``
+в ``bracelet_samples`` (замер уникален по ``(ble_mac, ts)``) и один upsert агрегатов
+``bracelet_rollups`` (count/sum/min/max/last по минуте и часу) — только из вставленных строк.
+Тренд пациента читается из агрегатов; сырые замеры — только для коротких окон,
+где минутных корзин меньше запрошенного числа точек (``get_trend_series``).
+Старые данные удаляет Celery-задача ``prune_bracelet_vitals``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.bracelet_alerts.downsample import lttb, minmax
+from app.bracelet_alerts.evaluator import _to_float, normalize_bracelet_metrics
+from app.bracelet_alerts.thresholds import CANONICAL_METRICS, METRIC_ALIASES
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.bracelet_vitals import BraceletRollup, BraceletSample
+from app.models.patient import Patient, PatientStatus
+from app.services.monitoring_service import metrics_from_device, normalize_mac, parse_online_flag
+
+logger = logging.getLogger(__name__)
+
+RESOLUTION_RAW = 0
+RESOLUTION_MINUTE = 60
+RESOLUTION_HOUR = 3600
+ROLLUP_RESOLUTIONS = (RESOLUTION_MINUTE, RESOLUTION_HOUR)
+
+_DEVICE_TIME_FIELDS = ("updated_at", "last_seen", "ts")
+_PATIENT_MAP_TTL_SEC = 60.0
+
+
+@dataclass
+class VitalsReading:
+    ble_mac: str
+    patient_id: Optional[int]
+    ts: datetime
+    values: Dict[str, float]
+
+
+@dataclass
+class TrendBucket:
+    bucket_start: datetime
+    avg: float
+    min: float
+    max: float
+    last: float
+    count: int
+
+
+@dataclass
+class TrendSeries:
+    """Прореженный ряд в столбцах: ``timestamps`` — секунды Unix (UTC)."""
+
+    resolution: int
+    source_points: int
+    timestamps: List[int]
+    values: List[float]
+
+
+def canonical_metric(metric: str) -> str:
+    lowered = metric.lower()
+    return METRIC_ALIASES.get(lowered, lowered)
+
+
+def canonical_values(metrics: Dict[str, Any]) -> Dict[str, float]:
+    """Первое числовое значение каждой канонической метрики."""
+    result: Dict[str, float] = {}
+    for raw_key, raw_value in metrics.items():
+        lowered = raw_key.lower()
+        canonical = METRIC_ALIASES.get(lowered, lowered)
+        if canonical not in CANONICAL_METRICS or canonical in result:
+            continue
+        value = _to_float(raw_value)
+        if value is not None:
+            result[canonical] = value
+    return result
+
+
+def bucket_start(ts: datetime, resolution: int) -> datetime:
+    if resolution == RESOLUTION_HOUR:
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(second=0, microsecond=0)
+
+
+def _aggregate(readings: List[VitalsReading]) -> List[Dict[str, Any]]:
+    """Свернуть пачку в строки агрегатов (ключи уникальны — иначе ON CONFLICT упадёт)."""
+    buckets: Dict[Tuple[int, str, int, datetime], Dict[str, Any]] = {}
+    for reading in sorted(readings, key=lambda r: r.ts):
+        if reading.patient_id is None:
+            continue
+        for metric, value in reading.values.items():
+            for resolution in ROLLUP_RESOLUTIONS:
+                key = (reading.patient_id, metric, resolution, bucket_start(reading.ts, resolution))
+                row = buckets.get(key)
+                if row is None:
+                    buckets[key] = {
+                        "patient_id": key[0],
+                        "metric": metric,
+                        "resolution": resolution,
+                        "bucket_start": key[3],
+                        "count": 1,
+                        "sum": value,
+                        "min": value,
+                        "max": value,
+                        "last": value,
+                    }
+                    continue
+                row["count"] += 1
+                row["sum"] += value
+                row["min"] = min(row["min"], value)
+                row["max"] = max(row["max"], value)
+                row["last"] = value
+    return list(buckets.values())
+
+
+def store_readings(db: Session, readings: List[VitalsReading]) -> int:
+    """Записать пачку замеров и обновить агрегаты одной транзакцией.
+
+    Замер, уже записанный другим воркером или до перезапуска, отбрасывается индексом
+    ``(ble_mac, ts)`` и в агрегаты не попадает. Возвращает число вставленных замеров.
+    """
+    if not readings:
+        return 0
+    stmt = pg_insert(BraceletSample).values(
+        [
+            {"ts": r.ts, "ble_mac": r.ble_mac, "patient_id": r.patient_id, **r.values}
+            for r in readings
+        ]
+    )
+    inserted = {
+        (row.ble_mac, row.ts)
+        for row in db.execute(
+            stmt.on_conflict_do_nothing(index_elements=["ble_mac", "ts"]).returning(
+                BraceletSample.ble_mac, BraceletSample.ts
+            )
+        )
+    }
+    readings = [r for r in readings if (r.ble_mac, r.ts) in inserted]
+    rollups = _aggregate(readings)
+    if rollups:
+        stmt = pg_insert(BraceletRollup).values(rollups)
+        excluded = stmt.excluded
+        db.execute(
+            stmt.on_conflict_do_update(
+                constraint="uq_bracelet_rollups_bucket",
+                set_={
+                    "count": BraceletRollup.count + excluded.count,
+                    "sum": BraceletRollup.sum + excluded.sum,
+                    "min": func.least(BraceletRollup.min, excluded.min),
+                    "max": func.greatest(BraceletRollup.max, excluded.max),
+                    "last": excluded.last,
+                },
+            )
+        )
+    db.commit()
+    return len(readings)
+
+
+def prune_vitals(db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+    """Удалить сырые замеры и агрегаты старше сроков хранения."""
+    now = now or datetime.utcnow()
+    raw_cutoff = now - timedelta(hours=settings.BRACELET_VITALS_RAW_RETENTION_HOURS)
+    minute_cutoff = now - timedelta(days=settings.BRACELET_VITALS_MINUTE_RETENTION_DAYS)
+    hour_cutoff = now - timedelta(days=settings.BRACELET_VITALS_HOUR_RETENTION_DAYS)
+
+    samples = db.execute(delete(BraceletSample).where(BraceletSample.ts < raw_cutoff)).rowcount
+    minutes = db.execute(
+        delete(BraceletRollup).where(
+            BraceletRollup.resolution == RESOLUTION_MINUTE,
+            BraceletRollup.bucket_start < minute_cutoff,
+        )
+    ).rowcount
+    hours = db.execute(
+        delete(BraceletRollup).where(
+            BraceletRollup.resolution == RESOLUTION_HOUR,
+            BraceletRollup.bucket_start < hour_cutoff,
+        )
+    ).rowcount
+    db.commit()
+    return {"samples": samples or 0, "minute_rollups": minutes or 0, "hour_rollups": hours or 0}
+
+
+def choose_resolution(start: datetime, end: datetime, now: Optional[datetime] = None) -> int:
+    """Минуты — для коротких окон в пределах хранения минутных агрегатов, иначе часы."""
+    now = now or datetime.utcnow()
+    minute_horizon = now - timedelta(days=settings.BRACELET_VITALS_MINUTE_RETENTION_DAYS)
+    window = end - start
+    if start >= minute_horizon and window <= timedelta(hours=settings.BRACELET_VITALS_MINUTE_WINDOW_HOURS):
+        return RESOLUTION_MINUTE
+    return RESOLUTION_HOUR
+
+
+def get_patient_trend(
+    db: Session,
+    patient_id: int,
+    metric: str,
+    start: datetime,
+    end: datetime,
+    resolution: Optional[int] = None,
+) -> List[TrendBucket]:
+    """Тренд пациента по метрике за окно ``[start, end)`` из агрегатов."""
+    canonical = canonical_metric(metric)
+    resolution = resolution or choose_resolution(start, end)
+    rows = db.execute(
+        select(
+            BraceletRollup.bucket_start,
+            BraceletRollup.count,
+            BraceletRollup.sum,
+            BraceletRollup.min,
+            BraceletRollup.max,
+            BraceletRollup.last,
+        )
+        .where(
+            BraceletRollup.patient_id == patient_id,
+            BraceletRollup.metric == canonical,
+            BraceletRollup.resolution == resolution,
+            BraceletRollup.bucket_start >= bucket_start(start, resolution),
+            BraceletRollup.bucket_start < end,
+        )
+        .order_by(BraceletRollup.bucket_start)
+    ).all()
+    return [
+        TrendBucket(
+            bucket_start=row.bucket_start,
+            avg=row.sum / row.count if row.count else row.last,
+            min=row.min,
+            max=row.max,
+            last=row.last,
+            count=row.count,
+        )
+        for row in rows
+    ]
+
+
+def _raw_series(
+    db: Session,
+    patient_id: int,
+    metric: str,
+    start: datetime,
+    end: datetime,
+) -> List[Tuple[datetime, float]]:
+    column = getattr(BraceletSample, metric)
+    rows = db.execute(
+        select(BraceletSample.ts, column)
+        .where(
+            BraceletSample.patient_id == patient_id,
+            BraceletSample.ts >= start,
+            BraceletSample.ts < end,
+            column.isnot(None),
+        )
+        .order_by(BraceletSample.ts)
+    ).all()
+    return [(row[0], row[1]) for row in rows]
+
+
+def _epoch(ts: datetime) -> int:
+    return int(ts.replace(tzinfo=timezone.utc).timestamp())
+
+
+def get_trend_series(
+    db: Session,
+    patient_id: int,
+    metric: str,
+    start: datetime,
+    end: datetime,
+    points: int,
+    mode: str = "lttb",
+) -> TrendSeries:
+    """Ряд для графика: не больше ``points`` точек при любой длине окна.
+
+    Сырые замеры читаются, только если окно в пределах их хранения и минутных
+    корзин в нём меньше ``points``; иначе — агрегаты (``choose_resolution``).
+    """
+    canonical = canonical_metric(metric)
+    now = datetime.utcnow()
+    raw_horizon = now - timedelta(hours=settings.BRACELET_VITALS_RAW_RETENTION_HOURS)
+    if start >= raw_horizon and (end - start).total_seconds() / RESOLUTION_MINUTE < points:
+        raw = _raw_series(db, patient_id, canonical, start, end)
+        timestamps = [_epoch(ts) for ts, _ in raw]
+        values = [value for _, value in raw]
+        resolution = RESOLUTION_RAW
+        mins, maxs = values, None
+    else:
+        resolution = choose_resolution(start, end, now)
+        buckets = get_patient_trend(db, patient_id, canonical, start, end, resolution)
+        timestamps = [_epoch(b.bucket_start) for b in buckets]
+        values = [b.avg for b in buckets]
+        mins, maxs = [b.min for b in buckets], [b.max for b in buckets]
+
+    if mode == "minmax":
+        out_t, out_v = minmax(timestamps, mins, maxs, points)
+    else:
+        out_t, out_v = lttb(timestamps, values, points)
+    return TrendSeries(
+        resolution=resolution,
+        source_points=len(timestamps),
+        timestamps=out_t,
+        values=out_v,
+    )
+
+
+def _device_ts(value: Any, now: datetime) -> Optional[datetime]:
+    """Время замера из устройства (Unix-секунды/миллисекунды или ISO 8601) в naive UTC.
+
+    Нераспознанное время или время с явно сбитых часов (в будущем или старше срока
+    хранения сырых замеров) — ``None``: такой замер пишется со временем записи.
+    """
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            try:
+                parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError:
+                return None
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            return parsed if _plausible_ts(parsed, now) else None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    seconds = value / 1000 if value > 1e12 else value
+    try:
+        parsed = datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+    except (OverflowError, OSError, ValueError):
+        return None
+    return parsed if _plausible_ts(parsed, now) else None
+
+
+def _plausible_ts(ts: datetime, now: datetime) -> bool:
+    oldest = now - timedelta(hours=settings.BRACELET_VITALS_RAW_RETENTION_HOURS)
+    return oldest <= ts <= now + timedelta(minutes=1)
+
+
+class BraceletVitalsRecorder:
+    """Слушатель снимка мониторинга: пишет показания не чаще ``BRACELET_VITALS_SAMPLE_SEC``."""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = float(interval if interval is not None else settings.BRACELET_VITALS_SAMPLE_SEC)
+        self._last_run = 0.0
+        self._patient_map: Dict[str, int] = {}
+        self._patient_map_at = 0.0
+        self._device_times: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._redis: Optional[redis.Redis] = None
+        try:
+            self._redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        except Exception as exc:
+            logger.warning("Vitals recorder without Redis slot lock: %s", exc)
+
+    async def on_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        if now - self._last_run < self.interval:
+            return
+        self._last_run = now
+        await asyncio.to_thread(self.record, snapshot)
+
+    def _claim_slot(self) -> bool:
+        """Один воркер uvicorn на интервал: остальные видят занятый слот и пропускают."""
+        if self._redis is None:
+            return True
+        slot = int(time.time() // self.interval)
+        try:
+            return bool(
+                self._redis.set(f"bracelet_vitals:slot:{slot}", "1", nx=True, ex=int(self.interval * 2) + 1)
+            )
+        except Exception as exc:
+            logger.debug("Vitals slot lock unavailable: %s", exc)
+            return True
+
+    def _mac_patients(self, db: Session) -> Dict[str, int]:
+        if time.monotonic() - self._patient_map_at < _PATIENT_MAP_TTL_SEC:
+            return self._patient_map
+        rows = db.execute(
+            select(Patient.id, Patient.ble_mac).where(
+                Patient.status == PatientStatus.ACTIVE,
+                Patient.ble_mac.isnot(None),
+            )
+        ).all()
+        self._patient_map = {normalize_mac(row.ble_mac): row.id for row in rows if row.ble_mac}
+        self._patient_map_at = time.monotonic()
+        return self._patient_map
+
+    def _readings(self, snapshot: Dict[str, Any], mac_patients: Dict[str, int]) -> List[VitalsReading]:
+        now = datetime.utcnow()
+        readings: List[VitalsReading] = []
+        devices = snapshot.get("ble") or {}
+        # Только устройства текущего снимка — пропавшие браслеты не копятся в памяти
+        self._device_times = {mac: t for mac, t in self._device_times.items() if mac in devices}
+        for mac, device in devices.items():
+            if parse_online_flag(device) is False:
+                continue
+            # Устройство сообщает время замера — тот же замер не отправляем в БД повторно
+            # (между воркерами и после перезапуска повтор отсекает индекс (ble_mac, ts))
+            device_time = next((device[f] for f in _DEVICE_TIME_FIELDS if device.get(f) is not None), None)
+            if device_time is not None:
+                if self._device_times.get(mac) == device_time:
+                    continue
+                self._device_times[mac] = device_time
+            values = canonical_values(normalize_bracelet_metrics(metrics_from_device(device)))
+            if values:
+                ts = _device_ts(device_time, now) if device_time is not None else None
+                readings.append(VitalsReading(mac, mac_patients.get(mac), ts or now, values))
+        return readings
+
+    def record(self, snapshot: Dict[str, Any]) -> int:
+        if not self._lock.acquire(blocking=False):
+            return 0
+        try:
+            if not self._claim_slot():
+                return 0
+            db = SessionLocal()
+            try:
+                readings = self._readings(snapshot, self._mac_patients(db))
+                return store_readings(db, readings)
+            except Exception as exc:
+                db.rollback()
+                logger.warning("Bracelet vitals write failed: %s", exc)
+                return 0
+            finally:
+                db.close()
+        finally:
+            self._lock.release()
+
+
+bracelet_vitals_recorder = BraceletVitalsRecorder()
@@ -1,23 +1,59 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import QueuePool
-from typing import Generator
-from app.models import patient, user, medical, room, bed
+from typing import AsyncGenerator, Generator
+from app.models import patient, user, medical, room, bed, bracelet_vitals
+from app.services.or_stats import register_session_listeners
 from .config import settings
 
+
+def _create_engine(pool_size: int, max_overflow: int) -> Engine:
+    return create_engine(
+        settings.DATABASE_URL,
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+        echo=settings.DEBUG,
+    )
+
+
 # Создаем engine с настройками пула соединений
-engine = create_engine(
-    settings.DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=settings.DATABASE_POOL_SIZE,
-    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+engine = _create_engine(settings.DATABASE_POOL_SIZE, settings.DATABASE_MAX_OVERFLOW)
+
+# Создаем фабрику сессий
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine для async-маршрутов: запросы не блокируют event loop воркера uvicorn.
+# expire_on_commit=False — после commit объекты сериализуются без ленивой догрузки.
+async_engine: AsyncEngine = create_async_engine(
+    settings.async_database_url(),
+    pool_size=settings.ASYNC_DATABASE_POOL_SIZE,
+    max_overflow=settings.ASYNC_DATABASE_MAX_OVERFLOW,
     pool_pre_ping=True,
     echo=settings.DEBUG,
 )
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
-# Создаем фабрику сессий
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Сброс кэша счётчиков табло операционной после commit — для API и воркеров Celery
+register_session_listeners()
+
+
+def configure_engine(pool_size: int, max_overflow: int) -> Engine:
+    """Пересоздать engine с другим пулом; ``SessionLocal`` переключается на него.
+
+    Для Celery: каждый процесс воркера получает свой пул под свою конкурентность.
+    Соединения, унаследованные после fork, не закрываются — они принадлежат родителю.
+    """
+    global engine
+    previous = engine
+    engine = _create_engine(pool_size, max_overflow)
+    SessionLocal.configure(bind=engine)
+    previous.dispose(close=False)
+    return engine
 
 # Базовый класс для моделей
 Base = declarative_base()
@@ -33,4 +69,10 @@ def get_db() -> Generator[Session, None, None]:
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """AsyncSession для ``async def`` маршрутов; закрывается после ответа."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,73 @@
+"""Условные GET: ETag из дешёвой версии ресурса и ответ 304 на ``If-None-Match``.
+
+Версия — то, что меняется при любом изменении выдачи (число строк и max(updated_at)
+таблиц — ``row_version``, версия общего состояния, …); тело ответа для сравнения
+не строится. Попадания и промахи — счётчик ``http_conditional_requests{route,result}``.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+
+# (модель с ``updated_at``, условия WHERE)
+VersionSource = Tuple[Any, Sequence[Any]]
+
+
+def _row_version_stmt(*sources: VersionSource):
+    columns = []
+    for model, criteria in sources:
+        columns.append(select(func.count()).select_from(model).where(*criteria).scalar_subquery())
+        columns.append(select(func.max(model.updated_at)).where(*criteria).scalar_subquery())
+    return select(*columns)
+
+
+def row_version(db: Session, *sources: VersionSource) -> Tuple:
+    """Число строк и max(updated_at) по каждому источнику — одним SELECT."""
+    return tuple(db.execute(_row_version_stmt(*sources)).one())
+
+
+async def row_version_async(db: AsyncSession, *sources: VersionSource) -> Tuple:
+    """Как ``row_version``, но на AsyncSession."""
+    return tuple((await db.execute(_row_version_stmt(*sources))).one())
+
+
+def compute_etag(*parts: Any) -> str:
+    """Слабый ETag: выдача эквивалентна, но побайтно совпадать не обязана."""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Сравнение слабое: W/ у клиента и у нас не учитывается
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def conditional_get(request: Request, response: Response, route: str, *version: Any) -> Optional[Response]:
+    """Ответ 304, если у клиента актуальная версия ``route``; иначе ETag ставится в ``response``."""
+    etag = compute_etag(route, *version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    hit = etag_matches(request, etag)
+    metrics.inc("http_conditional_requests", route=route, result="hit" if hit else "miss")
+    if hit:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -1,39 +1,231 @@
 # app/core/websocket_manager.py
-from typing import Dict, Set
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
 from fastapi import WebSocket
+import asyncio
+import copy
 import json
 import logging
+import time
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.ws_delta import diff_state
+from app.core.ws_pubsub import RedisFanout
 
 logger = logging.getLogger(__name__)
 
+StateProvider = Callable[[str], Awaitable[Optional[dict]]]
+
+
+class _Outbound:
+    """Очередь исходящих кадров одного сокета и задача, которая их отправляет.
+
+    Медленный планшет копит кадры только в своей очереди и не задерживает
+    остальных. Очередь ограничена: при переполнении старые кадры выбрасываются,
+    а если у комнаты есть полное состояние — очередь схлопывается в один свежий снимок.
+    """
+
+    def __init__(self, manager: "ConnectionManager", websocket: WebSocket, room_id: str):
+        self.manager = manager
+        self.websocket = websocket
+        self.room_id = room_id
+        self.frames: Deque[Tuple[Optional[str], str]] = deque()
+        self.wakeup = asyncio.Event()
+        self.needs_resync = False
+        self.task: Optional[asyncio.Task] = None
+
+    def enqueue(self, text: str, coalesce_key: Optional[str] = None) -> None:
+        if coalesce_key is not None:
+            for i, (key, _) in enumerate(self.frames):
+                if key == coalesce_key:
+                    self.frames[i] = (key, text)
+                    metrics.inc("ws_frames_coalesced", room=self.room_id)
+                    return
+        if len(self.frames) >= settings.WS_OUTBOUND_QUEUE_SIZE:
+            self.frames.popleft()
+            metrics.inc("ws_frames_dropped", room=self.room_id)
+            if self.manager.has_state(self.room_id):
+                self.needs_resync = True
+        self.frames.append((coalesce_key, text))
+        self.wakeup.set()
+
+    async def _next_frame(self) -> Optional[str]:
+        if self.needs_resync:
+            self.needs_resync = False
+            self.frames.clear()
+            message = await self.manager.full_state_message(self.room_id)
+            if message is not None:
+                return json.dumps(message, ensure_ascii=False)
+        if self.frames:
+            return self.frames.popleft()[1]
+        return None
+
+    async def run(self) -> None:
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while True:
+                text = await self._next_frame()
+                if text is None:
+                    break
+                started = time.perf_counter()
+                try:
+                    await asyncio.wait_for(
+                        self.websocket.send_text(text), timeout=settings.WS_SEND_TIMEOUT_SEC
+                    )
+                except asyncio.TimeoutError:
+                    metrics.inc("ws_send_timeouts", room=self.room_id)
+                    logger.warning("WS send timeout in room %s, closing slow socket", self.room_id)
+                    await self.manager.drop(self.websocket, self.room_id)
+                    return
+                except Exception:
+                    await self.manager.drop(self.websocket, self.room_id)
+                    return
+                metrics.observe("ws_send_seconds", time.perf_counter() - started, room=self.room_id)
+
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, Set[WebSocket]] = {}
-    
+        self._outbound: Dict[WebSocket, _Outbound] = {}
+        # Последнее разосланное состояние комнаты и его номер: {"seq": int, "state": dict}
+        self._states: Dict[str, Dict[str, Any]] = {}
+        # Полное состояние комнат, которые ведёт не менеджер (например, поток мониторинга)
+        self._state_providers: List[Tuple[Callable[[str], bool], StateProvider]] = []
+        # Доставка на другие воркеры/узлы через Redis (None — только локально)
+        self._fanout: Optional[RedisFanout] = None
+
+    async def start_fanout(self) -> None:
+        fanout = RedisFanout(
+            settings.REDIS_URL,
+            self._on_fanout_message,
+            lambda: list(self.active_connections),
+        )
+        if await fanout.start():
+            self._fanout = fanout
+
+    async def stop_fanout(self) -> None:
+        fanout, self._fanout = self._fanout, None
+        if fanout is not None:
+            await fanout.stop()
+
+    async def _on_fanout_message(self, room_id: str, payload: Dict[str, Any]) -> None:
+        if "state" in payload:
+            await self._apply_state(payload["state"], room_id, payload["patch_type"])
+        elif "text" in payload:
+            self._deliver_local(payload["text"], room_id, payload.get("coalesce"))
+
     async def connect(self, websocket: WebSocket, room_id: str):
         await websocket.accept()
         if room_id not in self.active_connections:
             self.active_connections[room_id] = set()
         self.active_connections[room_id].add(websocket)
+        outbound = _Outbound(self, websocket, room_id)
+        outbound.task = asyncio.create_task(outbound.run())
+        self._outbound[websocket] = outbound
+        if self._fanout is not None:
+            await self._fanout.sync_subscriptions()
         logger.info(f"WS connected to room {room_id}")
-    
+
     def disconnect(self, websocket: WebSocket, room_id: str):
         if room_id in self.active_connections:
             self.active_connections[room_id].discard(websocket)
             if not self.active_connections[room_id]:
                 del self.active_connections[room_id]
-    
-    async def broadcast(self, message: dict, room_id: str):
-        """Отправить сообщение ВСЕМ в комнате"""
-        if room_id in self.active_connections:
-            disconnected = set()
-            for connection in self.active_connections[room_id]:
-                try:
-                    await connection.send_text(json.dumps(message, ensure_ascii=False))
-                except Exception:
-                    disconnected.add(connection)
-            
-            for conn in disconnected:
-                self.active_connections[room_id].discard(conn)
+                if self._fanout is not None:
+                    self._fanout.schedule_sync()
+        outbound = self._outbound.pop(websocket, None)
+        if outbound is not None and outbound.task is not None and outbound.task is not asyncio.current_task():
+            outbound.task.cancel()
+
+    async def drop(self, websocket: WebSocket, room_id: str) -> None:
+        """Отключить сокет, который не принимает кадры (обрыв или таймаут отправки)."""
+        self.disconnect(websocket, room_id)
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+
+    async def send_personal(self, message: dict, websocket: WebSocket) -> None:
+        """Кадр одному сокету через его очередь — порядок с рассылками сохраняется."""
+        outbound = self._outbound.get(websocket)
+        if outbound is not None:
+            outbound.enqueue(json.dumps(message, ensure_ascii=False))
+
+    def _deliver_local(self, text: str, room_id: str, coalesce_key: Optional[str] = None) -> None:
+        connections = self.active_connections.get(room_id)
+        if not connections:
+            return
+        for connection in list(connections):
+            outbound = self._outbound.get(connection)
+            if outbound is not None:
+                outbound.enqueue(text, coalesce_key)
+
+    async def broadcast(self, message: dict, room_id: str, coalesce_key: Optional[str] = None):
+        """Отправить сообщение ВСЕМ в комнате — на всех воркерах.
+
+        JSON кодируется один раз; кадр кладётся в очередь каждого сокета, отправка идёт
+        параллельно. ``coalesce_key`` — ещё не отправленный кадр с тем же ключом заменяется
+        новым (для сообщений с полным состоянием).
+        """
+        text = json.dumps(message, ensure_ascii=False)
+        self._deliver_local(text, room_id, coalesce_key)
+        if self._fanout is not None:
+            self._fanout.publish(room_id, {"text": text, "coalesce": coalesce_key})
+
+    async def broadcast_local(self, message: dict, room_id: str) -> None:
+        """Только сокетам этого воркера (данные, которые каждый воркер готовит сам)."""
+        self._deliver_local(json.dumps(message, ensure_ascii=False), room_id)
+
+    def add_state_provider(self, matches: Callable[[str], bool], provider: StateProvider) -> None:
+        self._state_providers.append((matches, provider))
+
+    def has_state(self, room_id: str) -> bool:
+        return room_id in self._states or any(matches(room_id) for matches, _ in self._state_providers)
+
+    def state_message(self, room_id: str) -> Optional[dict]:
+        """Полное текущее состояние комнаты с его ``seq`` (подключение и resync)."""
+        entry = self._states.get(room_id)
+        if entry is None:
+            return None
+        return {**entry["state"], "seq": entry["seq"]}
+
+    async def full_state_message(self, room_id: str) -> Optional[dict]:
+        message = self.state_message(room_id)
+        if message is not None:
+            return message
+        for matches, provider in self._state_providers:
+            if matches(room_id):
+                return await provider(room_id)
+        return None
+
+    async def broadcast_state(self, state: dict, room_id: str, patch_type: str) -> None:
+        """Разослать состояние патчем относительно предыдущего, с монотонным ``seq`` комнаты.
+
+        Первое состояние уходит целиком; без изменений ничего не отправляется.
+        Клиент, заметивший пропуск ``seq``, присылает ``{"type": "resync"}``.
+        Другим воркерам уходит полное состояние: патч и ``seq`` каждый считает для своих сокетов.
+        """
+        changed = await self._apply_state(state, room_id, patch_type)
+        if changed and self._fanout is not None:
+            self._fanout.publish(room_id, {"state": state, "patch_type": patch_type})
+
+    async def _apply_state(self, state: dict, room_id: str, patch_type: str) -> bool:
+        entry = self._states.get(room_id)
+        state = copy.deepcopy(state)
+        if entry is None:
+            self._states[room_id] = {"seq": 1, "state": state}
+            message = self.state_message(room_id)
+            self._deliver_local(json.dumps(message, ensure_ascii=False), room_id, message.get("type"))
+            return True
+        ops = diff_state(entry["state"], state)
+        if not ops:
+            return False
+        entry["seq"] += 1
+        entry["state"] = state
+        message = {"type": patch_type, "seq": entry["seq"], "ops": ops}
+        self._deliver_local(json.dumps(message, ensure_ascii=False), room_id)
+        return True
 
-manager = ConnectionManager()  # Единственный глобальный экземпляр
\ No newline at end of file
+manager = ConnectionManager()  # Единственный глобальный экземпляр
@@ -0,0 +1,111 @@
+"""Патчи состояния для WebSocket-рассылок (вместо повторной отправки целого payload).
+
+Операции:
+
+- ``{"op": "set", "path": [...], "value": v}`` — заменить значение;
+- ``{"op": "del", "path": [...]}`` — удалить ключ;
+- ``{"op": "list", "path": [...], "key": "id", "remove": [...], "upsert": [...], "order": [...]}`` —
+  список объектов с ключом: удалить/обновить/добавить элементы. Новые элементы
+  по умолчанию встают в начало (как объявления операционной); ``order`` передаётся,
+  только если итоговый порядок отличается от порядка по умолчанию.
+"""
+from __future__ import annotations
+
+import copy
+from typing import Any, Dict, List, Optional, Sequence
+
+LIST_ITEM_KEYS = ("id",)
+
+_MISSING = object()
+
+
+def _list_key(previous: List[Any], current: List[Any]) -> Optional[str]:
+    items = previous + current
+    if not items or not all(isinstance(item, dict) for item in items):
+        return None
+    for key in LIST_ITEM_KEYS:
+        if all(key in item for item in items):
+            return key
+    return None
+
+
+def _default_order(previous_keys: List[Any], removed: set, added: List[Any]) -> List[Any]:
+    return added + [k for k in previous_keys if k not in removed]
+
+
+def _diff_list(path: List[Any], key: str, previous: List[Dict], current: List[Dict]) -> Dict[str, Any]:
+    before = {item[key]: item for item in previous}
+    current_keys = [item[key] for item in current]
+    current_set = set(current_keys)
+    removed = [k for k in before if k not in current_set]
+    upsert = [item for item in current if before.get(item[key]) != item]
+    added = [item[key] for item in current if item[key] not in before]
+    op: Dict[str, Any] = {"op": "list", "path": path, "key": key}
+    if removed:
+        op["remove"] = removed
+    if upsert:
+        op["upsert"] = upsert
+    if _default_order(list(before), set(removed), added) != current_keys:
+        op["order"] = current_keys
+    return op
+
+
+def diff_state(
+    previous: Dict[str, Any],
+    current: Dict[str, Any],
+    path: Sequence[Any] = (),
+) -> List[Dict[str, Any]]:
+    """Минимальный набор операций, переводящий ``previous`` в ``current``."""
+    ops: List[Dict[str, Any]] = []
+    for key in previous:
+        if key not in current:
+            ops.append({"op": "del", "path": [*path, key]})
+    for key, value in current.items():
+        old = previous.get(key, _MISSING)
+        if old == value:
+            continue
+        item_path = [*path, key]
+        if isinstance(old, dict) and isinstance(value, dict):
+            ops.extend(diff_state(old, value, item_path))
+            continue
+        if isinstance(old, list) and isinstance(value, list):
+            list_key = _list_key(old, value)
+            if list_key is not None:
+                ops.append(_diff_list(item_path, list_key, old, value))
+                continue
+        ops.append({"op": "set", "path": item_path, "value": value})
+    return ops
+
+
+def _apply_list(items: List[Dict], op: Dict[str, Any]) -> List[Dict]:
+    key = op["key"]
+    by_key = {item[key]: item for item in items}
+    removed = set(op.get("remove", []))
+    for k in removed:
+        by_key.pop(k, None)
+    added = []
+    for item in op.get("upsert", []):
+        if item[key] not in by_key:
+            added.append(item[key])
+        by_key[item[key]] = item
+    order = op.get("order")
+    if order is None:
+        order = _default_order([item[key] for item in items], removed, added)
+    return [by_key[k] for k in order if k in by_key]
+
+
+def apply_ops(state: Dict[str, Any], ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Применить операции к копии состояния (зеркало логики клиента)."""
+    result = copy.deepcopy(state)
+    for op in ops:
+        *parents, last = op["path"]
+        target = result
+        for part in parents:
+            target = target.setdefault(part, {})
+        if op["op"] == "del":
+            target.pop(last, None)
+        elif op["op"] == "list":
+            target[last] = _apply_list(target.get(last) or [], op)
+        else:
+            target[last] = copy.deepcopy(op["value"])
+    return result
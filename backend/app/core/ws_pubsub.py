@@ -0,0 +1,162 @@
+"""Рассылка WebSocket между воркерами uvicorn через Redis pub/sub.
+
+У каждого воркера свой ``ConnectionManager`` и свои сокеты. Рассылка доставляется
+локально сразу, а в Redis публикуется для остальных воркеров/узлов:
+
+- публикации копятся и уходят одним pipeline раз в ``WS_PUBLISH_BATCH_MS``;
+- воркер подписан на канал комнаты, только пока у него есть локальные сокеты этой комнаты;
+- собственные сообщения (по ``origin``) воркер игнорирует — они уже доставлены.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "ws:room:"
+
+MessageHandler = Callable[[str, Dict[str, Any]], Any]
+
+
+class RedisFanout:
+    def __init__(
+        self,
+        redis_url: str,
+        on_message: MessageHandler,
+        local_rooms: Callable[[], Iterable[str]],
+        batch_ms: Optional[int] = None,
+    ):
+        self.redis_url = redis_url
+        self.on_message = on_message
+        self.local_rooms = local_rooms
+        self.batch_seconds = (batch_ms if batch_ms is not None else settings.WS_PUBLISH_BATCH_MS) / 1000
+        self.origin = uuid.uuid4().hex
+        self._client: Optional[aioredis.Redis] = None
+        self._pubsub = None
+        self._subscribed: Set[str] = set()
+        self._sync_lock = asyncio.Lock()
+        self._pending: List[Tuple[str, str]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._listener_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> bool:
+        try:
+            client = aioredis.from_url(self.redis_url, decode_responses=True, socket_timeout=5)
+            await client.ping()
+        except Exception as exc:
+            logger.warning("WS Redis fan-out unavailable, local delivery only: %s", exc)
+            return False
+        self._client = client
+        self._pubsub = client.pubsub()
+        self._listener_task = asyncio.create_task(self._listen())
+        await self.sync_subscriptions()
+        logger.info("WS Redis fan-out started (origin %s)", self.origin)
+        return True
+
+    async def stop(self) -> None:
+        for task in (self._listener_task, self._flush_task):
+            if task is not None:
+                task.cancel()
+        await self._flush()
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._pubsub = None
+        self._subscribed.clear()
+
+    # --- публикация -----------------------------------------------------
+
+    def publish(self, room_id: str, payload: Dict[str, Any]) -> None:
+        """Поставить сообщение в ближайший batch (не ждёт Redis)."""
+        if self._client is None:
+            return
+        data = json.dumps({"origin": self.origin, **payload}, ensure_ascii=False)
+        self._pending.append((f"{CHANNEL_PREFIX}{room_id}", data))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.batch_seconds)
+        await self._flush()
+
+    async def _flush(self) -> None:
+        batch, self._pending = self._pending, []
+        if not batch or self._client is None:
+            return
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                for channel, data in batch:
+                    pipe.publish(channel, data)
+                await pipe.execute()
+            metrics.inc("ws_pubsub_published", len(batch))
+            metrics.observe("ws_pubsub_batch_size", len(batch), buckets=(1, 2, 5, 10, 25, 50, 100))
+        except Exception as exc:
+            metrics.inc("ws_pubsub_publish_errors")
+            logger.warning("WS Redis publish failed (%s messages): %s", len(batch), exc)
+
+    # --- подписки -------------------------------------------------------
+
+    async def sync_subscriptions(self) -> None:
+        """Подписки = комнаты, где у воркера есть локальные сокеты."""
+        if self._pubsub is None:
+            return
+        async with self._sync_lock:
+            wanted = set(self.local_rooms())
+            added = wanted - self._subscribed
+            removed = self._subscribed - wanted
+            try:
+                if added:
+                    await self._pubsub.subscribe(*(f"{CHANNEL_PREFIX}{room}" for room in added))
+                if removed:
+                    await self._pubsub.unsubscribe(*(f"{CHANNEL_PREFIX}{room}" for room in removed))
+            except Exception as exc:
+                logger.warning("WS Redis subscription update failed: %s", exc)
+                return
+            self._subscribed = wanted
+
+    def schedule_sync(self) -> None:
+        if self._pubsub is not None:
+            asyncio.create_task(self.sync_subscriptions())
+
+    async def _listen(self) -> None:
+        while True:
+            if not self._pubsub.subscribed:
+                await asyncio.sleep(0.5)
+                continue
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("WS Redis listener error: %s", exc)
+                await asyncio.sleep(1.0)
+                continue
+            if not message or message.get("type") != "message":
+                continue
+            try:
+                payload = json.loads(message["data"])
+            except (TypeError, ValueError):
+                continue
+            if payload.get("origin") == self.origin:
+                continue
+            room_id = message["channel"][len(CHANNEL_PREFIX):]
+            try:
+                result = self.on_message(room_id, payload)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as exc:
+                logger.warning("WS fan-out delivery to %s failed: %s", room_id, exc)
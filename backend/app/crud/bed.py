@@ -1,4 +1,9 @@
+from typing import Dict, Iterable, List
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
+from app.crud.room import IN_CHUNK_SIZE
 from app.models.bed import Bed
 
 def get_bed_by_external_id(db: Session, external_id: str):
@@ -9,4 +14,31 @@ def create_bed(db: Session, external_id: str, number: str, room_id: int):
     db.add(db_bed)
     db.commit()
     db.refresh(db_bed)
-    return db_bed
\ No newline at end of file
+    return db_bed
+
+def get_bed_ids_by_external_ids(db: Session, external_ids: Iterable[str]) -> Dict[str, int]:
+    """external_id → id для набора коек (запрос ``IN`` пачками)."""
+    ids = list(external_ids)
+    result: Dict[str, int] = {}
+    for i in range(0, len(ids), IN_CHUNK_SIZE):
+        rows = db.execute(
+            select(Bed.external_id, Bed.id).where(Bed.external_id.in_(ids[i:i + IN_CHUNK_SIZE]))
+        ).all()
+        result.update({row.external_id: row.id for row in rows})
+    return result
+
+def insert_missing_beds(db: Session, rows: List[dict]) -> Dict[str, int]:
+    """Вставить койки одним ``INSERT ... ON CONFLICT DO NOTHING`` без commit."""
+    if not rows:
+        return {}
+    stmt = (
+        pg_insert(Bed)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[Bed.external_id])
+        .returning(Bed.external_id, Bed.id)
+    )
+    result = {row.external_id: row.id for row in db.execute(stmt)}
+    missing = [row["external_id"] for row in rows if row["external_id"] not in result]
+    if missing:
+        result.update(get_bed_ids_by_external_ids(db, missing))
+    return result
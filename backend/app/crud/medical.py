@@ -1,33 +1,56 @@
 from datetime import timedelta
+from typing import Optional
 from fastapi import HTTPException
-from sqlalchemy import desc
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.models.medical import MedicalRecord, Procedure as ProcedureModel, ProcedureStatus
+from app.models.medical import Appointment as AppointmentModel, MedicalRecord, Procedure as ProcedureModel, ProcedureStatus
 from app.schemas.medical import ObservationCreate, ObservationUpdate, ProcedureCreate
 
+def _observation_summary(rec: MedicalRecord) -> dict:
+    return {
+        "id": rec.id,
+        "patient_id": rec.patient_id,
+        "record_date": rec.record_date,
+        "temperature": rec.temperature,
+        "blood_pressure_systolic": rec.blood_pressure_systolic,
+        "blood_pressure_diastolic": rec.blood_pressure_diastolic,
+        "pulse": rec.pulse,
+        "complaints": rec.complaints,
+        "examination": rec.examination,
+        "created_at": rec.created_at
+    }
+
+def _observation_detail(rec: MedicalRecord) -> dict:
+    return {
+        **_observation_summary(rec),
+        "respiration_rate": rec.respiration_rate,
+        "spO2": rec.spO2,
+        "weight": rec.weight,
+        "height": rec.height,
+        "diagnosis": rec.diagnosis,
+        "recommendations": rec.recommendations,
+    }
+
+def _observations_by_patient_stmt(patient_id: int):
+    return (
+        select(MedicalRecord)
+        .where(MedicalRecord.patient_id == patient_id)
+        .order_by(desc(MedicalRecord.created_at))
+    )
+
 def get_observations_by_patient(db: Session, patient_id: int):
-    records = db.query(MedicalRecord).filter(MedicalRecord.patient_id == patient_id).order_by(desc(MedicalRecord.created_at)).all()
-    # Преобразуем в Pydantic-объекты
-    observations = []
-    for rec in records:
-        observations.append({
-            "id": rec.id,
-            "patient_id": rec.patient_id,
-            "record_date": rec.record_date,
-            "temperature": rec.temperature,
-            "blood_pressure_systolic": rec.blood_pressure_systolic,
-            "blood_pressure_diastolic": rec.blood_pressure_diastolic,
-            "pulse": rec.pulse,
-            "complaints": rec.complaints,
-            "examination": rec.examination,
-            "created_at": rec.created_at
-        })
-    return observations
+    records = db.execute(_observations_by_patient_stmt(patient_id)).scalars().all()
+    return [_observation_summary(rec) for rec in records]
 
-def create_observation(db: Session, obs: ObservationCreate, user_id: int):
+async def get_observations_by_patient_async(db: AsyncSession, patient_id: int):
+    records = (await db.execute(_observations_by_patient_stmt(patient_id))).scalars().all()
+    return [_observation_summary(rec) for rec in records]
+
+def _new_observation(obs: ObservationCreate, user_id: int) -> MedicalRecord:
     from datetime import datetime
     moscow_now = datetime.utcnow() + timedelta(hours=3)
-    record = MedicalRecord(
+    return MedicalRecord(
         patient_id=obs.patient_id,
         record_date=obs.record_date,
         temperature=obs.temperature,
@@ -45,70 +68,73 @@ def create_observation(db: Session, obs: ObservationCreate, user_id: int):
         created_by=user_id,
         created_at=moscow_now
     )
+
+def create_observation(db: Session, obs: ObservationCreate, user_id: int):
+    record = _new_observation(obs, user_id)
     db.add(record)
     db.commit()
     db.refresh(record)
+    return _observation_detail(record)
 
-    return {
-        "id": record.id,
-        "patient_id": record.patient_id,
-        "record_date": record.record_date,
-        "temperature": record.temperature,
-        "blood_pressure_systolic": record.blood_pressure_systolic,
-        "blood_pressure_diastolic": record.blood_pressure_diastolic,
-        "pulse": record.pulse,
-        "respiration_rate": record.respiration_rate,
-        "spO2": record.spO2,
-        "weight": record.weight,
-        "height": record.height,
-        "complaints": record.complaints,
-        "examination": record.examination,
-        "diagnosis": record.diagnosis,
-        "recommendations": record.recommendations,
-        "created_at": record.created_at
-    }
+async def create_observation_async(db: AsyncSession, obs: ObservationCreate, user_id: int):
+    record = _new_observation(obs, user_id)
+    db.add(record)
+    await db.commit()
+    await db.refresh(record)
+    return _observation_detail(record)
 
-def update_observation_in_db(
-    db: Session, 
-    observation_id: int, 
-    obs_update: ObservationUpdate, 
-    user_id: int
-):
-    record = db.query(MedicalRecord).filter(MedicalRecord.id == observation_id).first()
+def _apply_observation_update(record: Optional[MedicalRecord], obs_update: ObservationUpdate) -> MedicalRecord:
     if not record:
         raise HTTPException(status_code=404, detail="Observation not found")
-
     # Обновляем только те поля, которые переданы (включая None)
     for field, value in obs_update.model_dump(exclude_unset=True).items():
         setattr(record, field, value)
+    return record
 
+def update_observation_in_db(
+    db: Session, 
+    observation_id: int, 
+    obs_update: ObservationUpdate, 
+    user_id: int
+):
+    record = _apply_observation_update(db.get(MedicalRecord, observation_id), obs_update)
     db.commit()
     db.refresh(record)
+    return _observation_summary(record)
 
-    return {
-        "id": record.id,
-        "patient_id": record.patient_id,
-        "record_date": record.record_date,
-        "temperature": record.temperature,
-        "blood_pressure_systolic": record.blood_pressure_systolic,
-        "blood_pressure_diastolic": record.blood_pressure_diastolic,
-        "pulse": record.pulse,
-        "complaints": record.complaints,
-        "examination": record.examination,
-        "created_at": record.created_at
-    }
+async def update_observation_in_db_async(
+    db: AsyncSession,
+    observation_id: int,
+    obs_update: ObservationUpdate,
+    user_id: int
+):
+    record = _apply_observation_update(await db.get(MedicalRecord, observation_id), obs_update)
+    await db.commit()
+    await db.refresh(record)
+    return _observation_summary(record)
 
 def delete_observation_from_db(db: Session, observation_id: int):
-    record = db.query(MedicalRecord).filter(MedicalRecord.id == observation_id).first()
+    record = db.get(MedicalRecord, observation_id)
     if not record:
         raise HTTPException(status_code=404, detail="Observation not found")
     db.delete(record)
     db.commit()
 
+async def delete_observation_from_db_async(db: AsyncSession, observation_id: int):
+    record = await db.get(MedicalRecord, observation_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Observation not found")
+    await db.delete(record)
+    await db.commit()
+
 def get_procedures_by_patient(db: Session, patient_id: int):
     procedures = db.query(ProcedureModel).filter(ProcedureModel.patient_id == patient_id).all()
     return procedures
 
+async def get_procedures_by_patient_async(db: AsyncSession, patient_id: int):
+    result = await db.execute(select(ProcedureModel).where(ProcedureModel.patient_id == patient_id))
+    return result.scalars().all()
+
 def _normalize_procedure_status(status: str) -> ProcedureStatus:
     normalized = status.upper().replace("-", "_")
     if normalized == "IN_PROGRES":
@@ -119,20 +145,30 @@ def _normalize_procedure_status(status: str) -> ProcedureStatus:
         raise HTTPException(status_code=400, detail=f"Invalid procedure status: {status}")
 
 
-def update_procedure_status(db: Session, procedure_id: int, status: str):
-    proc = db.query(ProcedureModel).filter(ProcedureModel.id == procedure_id).first()
+def _apply_procedure_status(proc: Optional[ProcedureModel], status: str) -> ProcedureModel:
     if not proc:
         raise HTTPException(status_code=404, detail="Procedure not found")
     proc.status = _normalize_procedure_status(status)
     if proc.status == ProcedureStatus.COMPLETED:
         from datetime import datetime
         proc.completed_at = datetime.utcnow()
+    return proc
+
+
+def update_procedure_status(db: Session, procedure_id: int, status: str):
+    proc = _apply_procedure_status(db.get(ProcedureModel, procedure_id), status)
     db.commit()
     db.refresh(proc)
     return proc
 
-def create_procedure(db: Session, proc: ProcedureCreate, user_id: int):
-    record = ProcedureModel(
+async def update_procedure_status_async(db: AsyncSession, procedure_id: int, status: str):
+    proc = _apply_procedure_status(await db.get(ProcedureModel, procedure_id), status)
+    await db.commit()
+    await db.refresh(proc)
+    return proc
+
+def _new_procedure(proc: ProcedureCreate, user_id: int) -> ProcedureModel:
+    return ProcedureModel(
         patient_id=proc.patient_id,
         name=proc.name,
         description=proc.description,
@@ -140,12 +176,25 @@ def create_procedure(db: Session, proc: ProcedureCreate, user_id: int):
         status=proc.status,
         created_by=user_id
     )
+
+def create_procedure(db: Session, proc: ProcedureCreate, user_id: int):
+    record = _new_procedure(proc, user_id)
     db.add(record)
     db.commit()
     db.refresh(record)
     return record
 
+async def create_procedure_async(db: AsyncSession, proc: ProcedureCreate, user_id: int):
+    record = _new_procedure(proc, user_id)
+    db.add(record)
+    await db.commit()
+    await db.refresh(record)
+    return record
+
 def get_appointments_by_patient(db: Session, patient_id: int):
-    from app.models.medical import Appointment as AppointmentModel
     appointments = db.query(AppointmentModel).filter(AppointmentModel.patient_id == patient_id).all()
-    return appointments
\ No newline at end of file
+    return appointments
+
+async def get_appointments_by_patient_async(db: AsyncSession, patient_id: int):
+    result = await db.execute(select(AppointmentModel).where(AppointmentModel.patient_id == patient_id))
+    return result.scalars().all()
\ No newline at end of file
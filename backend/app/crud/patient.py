@@ -1,7 +1,27 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func, select, update
+from app.crud.room import IN_CHUNK_SIZE
 from app.models.patient import Patient, PatientStatus
 
+# Поля, которые импорт из 1С пишет в пациента
+ONEC_PATIENT_FIELDS = (
+    "full_name",
+    "admission_date",
+    "discharge_date",
+    "status",
+    "bed_id",
+    "document_id",
+    "branch_id",
+    "department_id",
+    "department_name",
+    "onec_hash",
+)
+
 def get_all_active_patients(db: Session, patient_id: int = None):
     query = db.query(Patient).filter(Patient.status == PatientStatus.ACTIVE)
     if patient_id:
@@ -11,6 +31,13 @@ def get_all_active_patients(db: Session, patient_id: int = None):
 def get_patient_by_id(db: Session, patient_id: int):
     return db.query(Patient).filter(Patient.id == patient_id).first()
 
+async def get_patient_by_id_async(db: AsyncSession, patient_id: int):
+    return await db.get(Patient, patient_id)
+
+async def get_patients_by_status_async(db: AsyncSession, status: PatientStatus):
+    result = await db.execute(select(Patient).where(Patient.status == status))
+    return result.scalars().all()
+
 def get_patient_by_external_id(db: Session, external_id: str):
     return db.query(Patient).filter(Patient.external_id == external_id).first()
 
@@ -45,17 +72,18 @@ def create_patient(
     return db_patient
 
 
-def get_patients_needing_sync(db: Session, limit: int = 100):
-    """Пациенты с external_id для фоновой синхронизации с 1С."""
-    return (
-        db.query(Patient)
-        .filter(
-            Patient.status == PatientStatus.ACTIVE,
-            Patient.external_id.isnot(None),
-        )
-        .limit(limit)
-        .all()
+def get_patients_needing_sync(db: Session, limit: int = 100, after_id: Optional[int] = None):
+    """Пациенты с external_id для фоновой синхронизации с 1С.
+
+    Страница по ``id`` (keyset): следующую запрашивают с ``after_id`` = id последнего.
+    """
+    query = db.query(Patient).filter(
+        Patient.status == PatientStatus.ACTIVE,
+        Patient.external_id.isnot(None),
     )
+    if after_id is not None:
+        query = query.filter(Patient.id > after_id)
+    return query.order_by(Patient.id).limit(limit).all()
 
 
 def update_patient_sync_status(db: Session, patient_id: int, result: dict):
@@ -67,3 +95,75 @@ def update_patient_sync_status(db: Session, patient_id: int, result: dict):
     db.commit()
     db.refresh(patient)
     return patient
+
+
+def get_patients_for_import(db: Session, external_ids: Iterable[str]) -> Dict[str, dict]:
+    """Пациенты пачки выгрузки 1С (в т.ч. выписанные): external_id → поля импорта."""
+    columns = [Patient.id, Patient.external_id, *(getattr(Patient, f) for f in ONEC_PATIENT_FIELDS)]
+    ids = list(external_ids)
+    result: Dict[str, dict] = {}
+    for i in range(0, len(ids), IN_CHUNK_SIZE):
+        rows = db.execute(
+            select(*columns).where(Patient.external_id.in_(ids[i:i + IN_CHUNK_SIZE]))
+        ).mappings()
+        for row in rows:
+            result[row["external_id"]] = dict(row)
+    return result
+
+
+def get_active_patient_ids(db: Session) -> Dict[str, int]:
+    """external_id → id активных пациентов из 1С."""
+    rows = db.execute(
+        select(Patient.external_id, Patient.id).where(
+            Patient.status == PatientStatus.ACTIVE,
+            Patient.external_id.isnot(None),
+        )
+    ).all()
+    return {row.external_id: row.id for row in rows}
+
+
+def upsert_patients(db: Session, rows: List[dict]) -> int:
+    """Новые и изменённые пациенты одним ``INSERT ... ON CONFLICT (external_id) DO UPDATE`` без commit."""
+    if not rows:
+        return 0
+    stmt = pg_insert(Patient).values(rows)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Patient.external_id],
+        set_={
+            **{field: getattr(excluded, field) for field in ONEC_PATIENT_FIELDS},
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+    return len(rows)
+
+
+def discharge_patients(db: Session, patient_ids: List[int], when: datetime) -> int:
+    """Выписать пациентов одним ``UPDATE``; уже указанная дата выписки сохраняется."""
+    if not patient_ids:
+        return 0
+    db.execute(
+        update(Patient)
+        .where(Patient.id.in_(patient_ids))
+        .values(
+            status=PatientStatus.DISCHARGED,
+            discharge_date=func.coalesce(Patient.discharge_date, when),
+            updated_at=func.now(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return len(patient_ids)
+
+
+def bulk_update_patient_sync_status(db: Session, results: List[Tuple[int, dict]]) -> int:
+    """Результаты синхронизации пачки одним ``UPDATE`` по первичному ключу и одним commit."""
+    changes = [
+        {"id": patient_id, "external_id": str(result["onec_id"])}
+        for patient_id, result in results
+        if result.get("success") and result.get("onec_id")
+    ]
+    if changes:
+        db.execute(update(Patient), changes)
+    db.commit()
+    return len(changes)
@@ -1,8 +1,17 @@
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core.etag import row_version, row_version_async
 from app.models.room import Room as RoomModel
 from app.models.bed import Bed as BedModel
 from app.models.patient import Patient, PatientStatus
 
+# Параметров в одном ``IN`` — с запасом до лимита PostgreSQL (65535 на запрос)
+IN_CHUNK_SIZE = 5000
+
 def get_room_by_external_id(db: Session, external_id: str):
     return db.query(RoomModel).filter(RoomModel.external_id == external_id).first()
 
@@ -13,30 +22,86 @@ def create_room(db: Session, external_id: str, number: str, name: str):
     db.refresh(db_room)
     return db_room
 
-def get_all_rooms_with_beds(db: Session):
-    rooms = db.query(RoomModel).all()
+def get_room_ids_by_external_ids(db: Session, external_ids: Iterable[str]) -> Dict[str, int]:
+    """external_id → id для набора палат (запрос ``IN`` пачками)."""
+    ids = list(external_ids)
+    result: Dict[str, int] = {}
+    for i in range(0, len(ids), IN_CHUNK_SIZE):
+        rows = db.execute(
+            select(RoomModel.external_id, RoomModel.id).where(
+                RoomModel.external_id.in_(ids[i:i + IN_CHUNK_SIZE])
+            )
+        ).all()
+        result.update({row.external_id: row.id for row in rows})
+    return result
+
+def insert_missing_rooms(db: Session, rows: List[dict]) -> Dict[str, int]:
+    """Вставить палаты одним ``INSERT ... ON CONFLICT DO NOTHING`` без commit.
+
+    Возвращает external_id → id всех строк, включая вставленные параллельно другим процессом.
+    """
+    if not rows:
+        return {}
+    stmt = (
+        pg_insert(RoomModel)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[RoomModel.external_id])
+        .returning(RoomModel.external_id, RoomModel.id)
+    )
+    result = {row.external_id: row.id for row in db.execute(stmt)}
+    missing = [row["external_id"] for row in rows if row["external_id"] not in result]
+    if missing:
+        result.update(get_room_ids_by_external_ids(db, missing))
+    return result
+
+def _rooms_with_beds_stmt():
+    return (
+        select(RoomModel, BedModel, Patient)
+        .outerjoin(BedModel, BedModel.room_id == RoomModel.id)
+        .outerjoin(
+            Patient,
+            and_(Patient.bed_id == BedModel.id, Patient.status == PatientStatus.ACTIVE),
+        )
+        .order_by(RoomModel.id, BedModel.id, Patient.id)
+    )
+
+def _group_rooms_with_beds(rows) -> List[dict]:
     result = []
+    rooms: Dict[int, dict] = {}
+    beds: Dict[int, dict] = {}
+    for room, bed, patient in rows:
+        room_item = rooms.get(room.id)
+        if room_item is None:
+            room_item = rooms[room.id] = {"id": room.id, "number": room.number, "beds": []}
+            result.append(room_item)
+        if bed is None or bed.id in beds:
+            # На койке несколько активных пациентов — показываем первого, как раньше
+            continue
+        beds[bed.id] = {
+            "id": bed.id,
+            "number": bed.number,
+            "patient": patient  # будет сериализован через Pydantic
+        }
+        room_item["beds"].append(beds[bed.id])
+
+    return result
+
+def get_all_rooms_with_beds(db: Session):
+    """Палаты → койки → активный пациент одним запросом (LEFT JOIN, фильтр статуса в SQL)."""
+    return _group_rooms_with_beds(db.execute(_rooms_with_beds_stmt()).all())
+
+async def get_all_rooms_with_beds_async(db: AsyncSession):
+    return _group_rooms_with_beds((await db.execute(_rooms_with_beds_stmt())).all())
+
+_ROOMS_VERSION_SOURCES = (
+    (RoomModel, ()),
+    (BedModel, ()),
+    (Patient, (Patient.status == PatientStatus.ACTIVE,)),
+)
+
+def get_rooms_version(db: Session) -> Tuple:
+    """Версия дерева палат для ETag: палаты, койки и активные пациенты."""
+    return row_version(db, *_ROOMS_VERSION_SOURCES)
 
-    for r in rooms:
-        beds = db.query(BedModel).filter(BedModel.room_id == r.id).all()
-        beds_with_patients = []
-
-        for b in beds:
-            patient = None
-            if b.patients:
-                active_patients = [p for p in b.patients if p.status == PatientStatus.ACTIVE]
-                if active_patients:
-                    patient = active_patients[0]
-            beds_with_patients.append({
-                "id": b.id,
-                "number": b.number,
-                "patient": patient  # будет сериализован через Pydantic
-            })
-
-        result.append({
-            "id": r.id,
-            "number": r.number,
-            "beds": beds_with_patients
-        })
-
-    return result
\ No newline at end of file
+async def get_rooms_version_async(db: AsyncSession) -> Tuple:
+    return await row_version_async(db, *_ROOMS_VERSION_SOURCES)
@@ -1,3 +1,5 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.user import User as UserModel, UserRole
 from app.schemas.user import UserCreate
@@ -29,6 +31,10 @@ def get_user_by_email(db: Session, email: str):
 def get_users(db: Session, skip: int = 0, limit: int = 100):
     return db.query(UserModel).offset(skip).limit(limit).all()
 
+async def get_users_async(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.execute(select(UserModel).offset(skip).limit(limit))
+    return result.scalars().all()
+
 def create_user(db: Session, user: UserCreate):
     hashed_password = get_password_hash(user.password)
     db_user = UserModel(
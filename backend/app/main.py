@@ -1,10 +1,21 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 
+from app.bracelet_alerts.vitals_history import bracelet_vitals_recorder
 from app.core.config import settings
+from app.core.database import async_engine
 from app.api.v1.api import api_router
+from app.api.v1.endpoints.operating_room import or_atmosphere_poller
+from app.core.metrics import metrics
+from app.core.websocket_manager import manager
+from app.deps import get_current_active_user
+from app.models.user import User, UserRole
+from app.services.monitoring_cache import monitoring_snapshot_cache
+from app.services.monitoring_service import async_monitoring_service
+from app.services.monitoring_stream import monitoring_stream
+from app.services.shared_state import start_invalidation_listener, stop_invalidation_listener
 
 
 @asynccontextmanager
@@ -16,9 +27,34 @@ async def lifespan(app: FastAPI):
     
     # Схема БД — только через Alembic (docker CMD: alembic upgrade head).
     # create_all конфликтует с миграциями (дубли enum/таблиц в PostgreSQL).
-    
+
+    # Состояние операционной общее для воркеров: чужие записи приходят инвалидацией
+    start_invalidation_listener()
+
+    # Рассылки WebSocket доходят до сокетов на всех воркерах
+    if settings.WS_REDIS_FANOUT_ENABLED:
+        await manager.start_fanout()
+
+    # Один фоновый опрос BLE/ATM на процесс вместо запроса на каждый планшет
+    # Каждый снимок рассылается подписчикам monitoring:{room_id} / bracelets как дельта
+    if settings.MONITORING_SNAPSHOT_REFRESHER_ENABLED:
+        monitoring_snapshot_cache.add_listener(monitoring_stream.on_snapshot)
+        if settings.BRACELET_VITALS_ENABLED:
+            monitoring_snapshot_cache.add_listener(bracelet_vitals_recorder.on_snapshot)
+        monitoring_snapshot_cache.start_refresher()
+
+    # Датчики операционной опрашиваются в фоне; табло и WebSocket читают показания из памяти
+    if settings.OR_ATMOSPHERE_POLLER_ENABLED:
+        or_atmosphere_poller.start()
+
     yield
-    
+
+    await or_atmosphere_poller.stop()
+    await monitoring_snapshot_cache.stop_refresher()
+    await manager.stop_fanout()
+    stop_invalidation_listener()
+    await async_monitoring_service.aclose()
+    await async_engine.dispose()
     print("👋 Shutting down...")
 
 
@@ -64,4 +100,14 @@ async def health_check():
     """
     Health check endpoint для мониторинга.
     """
-    return {"status": "healthy", "timestamp": "isoformat"}
\ No newline at end of file
+    return {"status": "healthy", "timestamp": "isoformat"}
+
+
+@app.get("/metrics")
+async def metrics_endpoint(current_user: User = Depends(get_current_active_user)):
+    """
+    Внутренние метрики процесса (счётчики, гистограммы задержек) — только для админа.
+    """
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return metrics.snapshot()
@@ -4,6 +4,7 @@ from .user import User, UserRole
 from .room import Room
 from .bed import Bed
 from .patient import Patient, PatientStatus
+from .bracelet_vitals import BraceletRollup, BraceletSample
 from .medical import (
     MedicalRecord,
     Appointment,
@@ -20,6 +21,8 @@ __all__ = [
     "Bed",
     "Patient",
     "PatientStatus",
+    "BraceletSample",
+    "BraceletRollup",
     "MedicalRecord",
     "Appointment",
     "Procedure",
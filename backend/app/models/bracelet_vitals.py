@@ -0,0 +1,65 @@
+from sqlalchemy import BigInteger, Column, DateTime, Float, ForeignKey, Index, Integer, SmallInteger, String
+from sqlalchemy import UniqueConstraint
+
+from .base import Base
+
+
+class BraceletSample(Base):
+    """Сырые показания браслета: одна строка на замер устройства, метрики — столбцами.
+
+    ``ts`` — время замера из устройства (если оно его сообщает); пара ``(ble_mac, ts)``
+    уникальна, повтор того же замера отбрасывается ``ON CONFLICT DO NOTHING``.
+    """
+
+    __tablename__ = "bracelet_samples"
+
+    id = Column(BigInteger, primary_key=True)
+    ts = Column(DateTime, nullable=False)
+    ble_mac = Column(String(32), nullable=False)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="SET NULL"), nullable=True)
+
+    pulse = Column(Float)
+    spo2 = Column(Float)
+    temp = Column(Float)
+    respiration = Column(Float)
+    press = Column(Float)
+    hrv = Column(Float)
+    stress = Column(Float)
+    sleep = Column(Float)
+    battery = Column(Float)
+
+    __table_args__ = (
+        Index("ix_bracelet_samples_patient_ts", "patient_id", "ts"),
+        Index("uq_bracelet_samples_mac_ts", "ble_mac", "ts", unique=True),
+        Index("ix_bracelet_samples_ts", "ts"),
+    )
+
+
+class BraceletRollup(Base):
+    """Агрегаты по пациенту и метрике за минуту/час; обновляются upsert-ом при записи."""
+
+    __tablename__ = "bracelet_rollups"
+
+    id = Column(BigInteger, primary_key=True)
+    patient_id = Column(Integer, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False)
+    metric = Column(String(16), nullable=False)
+    # Длина корзины в секундах: 60 — минута, 3600 — час
+    resolution = Column(SmallInteger, nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+
+    count = Column(Integer, nullable=False, default=0)
+    sum = Column(Float, nullable=False, default=0.0)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+    last = Column(Float, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "patient_id",
+            "metric",
+            "resolution",
+            "bucket_start",
+            name="uq_bracelet_rollups_bucket",
+        ),
+        Index("ix_bracelet_rollups_resolution_bucket", "resolution", "bucket_start"),
+    )
@@ -27,6 +27,7 @@ class Patient(BaseModel):
     branch_id = Column(String)    # Филиал из 1С
     department_id = Column(String)  # Подразделение из 1С
     department_name = Column(String)  # Название подразделения
+    onec_hash = Column(String(64))  # SHA-256 документа 1С (КлиентыСтационара)
     ble_mac = Column(String, index=True)  # MAC браслета без двоеточий
     vital_threshold_overrides = Column(JSON, nullable=True)  # Персональные пороги pulse/spo2
 
@@ -135,3 +135,17 @@ class BraceletCheckResponse(BaseModel):
     alerts_skipped_dedup: int
     monitoring_connected: bool
     message: str
+    alerts_queued: int = 0
+
+
+class BraceletTrendResponse(BaseModel):
+    """Ряд для графика в столбцах: ``timestamps[i]`` (секунды Unix, UTC) ↔ ``values[i]``."""
+    patient_id: int
+    metric: str
+    unit: str
+    mode: str
+    # 0 — сырые замеры, 60 — минутные агрегаты, 3600 — часовые
+    resolution: int
+    source_points: int
+    timestamps: List[int] = Field(default_factory=list)
+    values: List[float] = Field(default_factory=list)
@@ -1,155 +1,324 @@
+import codecs
+import hashlib
+import json
+import logging
+import time
 import requests
 from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+try:
+    import ijson
+except ImportError:  # pragma: no cover - ijson есть в образе backend
+    ijson = None
 from sqlalchemy.orm import Session
-from app.models.patient import Patient, PatientStatus
-from app.models.room import Room
-from app.models.bed import Bed  # ✅ Правильный импорт
+from app.core.config import settings
+from app.models.patient import PatientStatus
 from app.schemas.medical import HospitalDocument
-from app.crud.bed import get_bed_by_external_id, create_bed
-from app.crud.room import get_room_by_external_id, create_room
-from app.crud.patient import get_patient_by_external_id, create_patient
+from app.crud.bed import get_bed_ids_by_external_ids, insert_missing_beds
+from app.crud.room import get_room_ids_by_external_ids, insert_missing_rooms
+from app.crud.patient import (
+    ONEC_PATIENT_FIELDS,
+    discharge_patients,
+    get_active_patient_ids,
+    get_patients_for_import,
+    upsert_patients,
+)
+
+logger = logging.getLogger(__name__)
 
 BASE_URL = 'http://172.191.7.27/g8_mis/hs/bwi/DictionaryData'
 AUTH_HEADER = {'Authorization': 'Basic bW9uaXRvcjo0NzE1'}
 
-def fetch_from_1c():
+DOCUMENTS_PATH = "Ответ.КлиентыСтационара.item"
+
+def _request_documents(stream: bool = False) -> requests.Response:
     payload = {
         "Key": "bc1ff18a4ee04bb993df251cf0ebbfb4",
         "Method": "GetHospitalDocuments"
     }
-    response = requests.post(BASE_URL, json=payload, headers=AUTH_HEADER)
+    response = requests.post(
+        BASE_URL, json=payload, headers=AUTH_HEADER, stream=stream, timeout=settings.ONEC_TIMEOUT
+    )
     response.raise_for_status()
-    return response.json()
+    return response
+
+def fetch_from_1c():
+    return _request_documents().json()
+
+class _BomSkippingReader:
+    """Файловый объект над телом ответа без UTF-8 BOM (1С часто пишет его перед JSON)."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._head = b""
+        self._checked = False
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._checked:
+            self._checked = True
+            head = self._raw.read(3)
+            self._head = head[3:] if head.startswith(codecs.BOM_UTF8) else head
+        data = self._raw.read(size)
+        if self._head:
+            data, self._head = self._head + data, b""
+        return data
+
+def iter_hospital_documents() -> Iterator[dict]:
+    """Документы ``КлиентыСтационара`` по одному, не читая ответ 1С целиком.
+
+    Без ijson — прежний разбор ``response.json()`` целиком.
+    """
+    if ijson is None:
+        yield from fetch_from_1c().get("Ответ", {}).get("КлиентыСтационара", [])
+        return
+    response = _request_documents(stream=True)
+    try:
+        response.raw.decode_content = True
+        yield from ijson.items(_BomSkippingReader(response.raw), DOCUMENTS_PATH, use_float=True)
+    finally:
+        response.close()
+
+def iter_document_chunks(chunk_size: int) -> Iterator[List[Tuple[HospitalDocument, str]]]:
+    """Пачки (документ, хэш) не больше ``chunk_size``."""
+    chunk: List[Tuple[HospitalDocument, str]] = []
+    for doc in iter_hospital_documents():
+        chunk.append((_hospital_document(doc), document_hash(doc)))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 def parse_date(date_str: str) -> datetime:
     return datetime.strptime(date_str, "%d.%m.%Y %H:%M:%S")
 
-def sync_with_1c(db: Session):
-    raw_data = fetch_from_1c()
-    docs = raw_data.get("Ответ", {}).get("КлиентыСтационара", [])
-
-    processed_count = 0
-    archived_count = 0
-    active_count = 0
-    new_count = 0
-
-    # ✅ Текущая дата для сравнения (без времени)
-    now = datetime.utcnow().date()
-
-    # ✅ Получаем всех активных пациентов из БД
-    all_patients_in_db = db.query(Patient).filter(Patient.status == PatientStatus.ACTIVE).all()
-    all_patients_in_db_dict = {p.external_id: p for p in all_patients_in_db}
-
-    # ✅ Собираем пациентов из 1С
-    patients_from_1c = {}
-    for doc in docs:
-        hospital_doc = HospitalDocument(
-            document=doc["Документ"],
-            branch=doc["Филиал"],
-            room=doc["Палата"],
-            room_name=doc["ПалатаНаименование"].strip(),
-            client=doc["Клиент"],
-            client_name=doc["КлиентНаименование"],
-            bed=doc["КойкоМесто"],
-            bed_name=doc["КойкоМестоНаименование"],
-            start_date=doc["ДатаНачала"],
-            end_date=doc["ДатаОкончания"],
-            department=doc["Подразделение"],
-            department_name=doc["ПодразделениеНаименование"]
-        )
-        patients_from_1c[hospital_doc.client] = hospital_doc
-
-    # ✅ Обработка существующих пациентов
-    for external_id, patient in all_patients_in_db_dict.items():
-        if external_id not in patients_from_1c:
-            # Пациент есть в БД, но отсутствует в 1С — архивируем
-            patient.status = PatientStatus.DISCHARGED  # ✅ Правильный статус
-            if not patient.discharge_date:
-                patient.discharge_date = datetime.utcnow()
-            archived_count += 1
-            continue
-
-        hospital_doc = patients_from_1c[external_id]
-        discharge_date = parse_date(hospital_doc.end_date).date() if hospital_doc.end_date else None
-
-        # ✅ Архивируем ТОЛЬКО если дата выписки уже наступила (включая сегодня)
-        if discharge_date and discharge_date < now:
-            patient.status = PatientStatus.DISCHARGED  # ✅ Правильный статус
-            patient.discharge_date = datetime.combine(discharge_date, datetime.min.time())
-            archived_count += 1
-        else:
-            # Пациент активен — обновляем данные
-            admission_date = parse_date(hospital_doc.start_date)
-            
-            # Найти или создать палату
-            room = get_room_by_external_id(db, hospital_doc.room)
-            if not room:
-                room = create_room(db, hospital_doc.room, hospital_doc.room_name.replace("Палата № ", ""), hospital_doc.room_name)
-
-            # Найти или создать койку
-            bed = get_bed_by_external_id(db, hospital_doc.bed)
-            if not bed:
-                bed = create_bed(db, hospital_doc.bed, hospital_doc.bed_name.replace("Койка № ", ""), room.id)
-
-            patient.full_name = hospital_doc.client_name
-            patient.admission_date = admission_date
-            patient.bed_id = bed.id
-            patient.department_name = hospital_doc.department_name
-            active_count += 1
-
-    # ✅ Добавление новых пациентов
-    for external_id, hospital_doc in patients_from_1c.items():
-        if external_id in all_patients_in_db_dict:
-            continue  # Уже обработан выше
-
-        # Найти или создать палату
-        room = get_room_by_external_id(db, hospital_doc.room)
-        if not room:
-            room = create_room(db, hospital_doc.room, hospital_doc.room_name.replace("Палата № ", ""), hospital_doc.room_name)
-
-        # Найти или создать койку
-        bed = get_bed_by_external_id(db, hospital_doc.bed)
-        if not bed:
-            bed = create_bed(db, hospital_doc.bed, hospital_doc.bed_name.replace("Койка № ", ""), room.id)
-
-        admission_date = parse_date(hospital_doc.start_date)
-        discharge_date = parse_date(hospital_doc.end_date).date() if hospital_doc.end_date else None
-
-        # ✅ Статус определяется по дате выписки
-        if discharge_date and discharge_date < now:
-            status = PatientStatus.DISCHARGED  # ✅ Правильный статус
-        else:
-            status = PatientStatus.ACTIVE
+def _hospital_document(doc: dict) -> HospitalDocument:
+    return HospitalDocument(
+        document=doc["Документ"],
+        branch=doc["Филиал"],
+        room=doc["Палата"],
+        room_name=doc["ПалатаНаименование"].strip(),
+        client=doc["Клиент"],
+        client_name=doc["КлиентНаименование"],
+        bed=doc["КойкоМесто"],
+        bed_name=doc["КойкоМестоНаименование"],
+        start_date=doc["ДатаНачала"],
+        end_date=doc["ДатаОкончания"],
+        department=doc["Подразделение"],
+        department_name=doc["ПодразделениеНаименование"]
+    )
+
+def _discharge_date(hospital_doc: HospitalDocument) -> Optional[datetime]:
+    if not hospital_doc.end_date:
+        return None
+    return datetime.combine(parse_date(hospital_doc.end_date).date(), datetime.min.time())
 
-        # Создаём нового пациента
-        patient = create_patient(
+def document_hash(doc: dict) -> str:
+    """SHA-256 документа 1С; порядок ключей не влияет."""
+    return hashlib.sha256(json.dumps(doc, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def _ensure_rooms_and_beds(db: Session, docs: List[HospitalDocument], dry_run: bool = False) -> Dict[str, Any]:
+    """Палаты и койки документов: недостающие — двумя пакетными ``INSERT`` (в dry-run только подсчёт)."""
+    room_ids = get_room_ids_by_external_ids(db, {d.room for d in docs})
+    bed_ids = get_bed_ids_by_external_ids(db, {d.bed for d in docs})
+
+    new_rooms = {
+        d.room: {"external_id": d.room, "number": d.room_name.replace("Палата № ", ""), "name": d.room_name}
+        for d in docs
+        if d.room not in room_ids
+    }
+    new_bed_docs = {d.bed: d for d in docs if d.bed not in bed_ids}
+    if not dry_run:
+        room_ids.update(insert_missing_rooms(db, list(new_rooms.values())))
+        bed_ids.update(insert_missing_beds(db, [
+            {
+                "external_id": d.bed,
+                "number": d.bed_name.replace("Койка № ", ""),
+                "room_id": room_ids[d.room],
+                "is_occupied": True,
+            }
+            for d in new_bed_docs.values()
+        ]))
+    return {"bed_ids": bed_ids, "rooms_created": len(new_rooms), "beds_created": len(new_bed_docs)}
+
+class _ImportRun:
+    """Счётчики и время фаз одного импорта; пачки документов применяются по очереди."""
+
+    def __init__(self, db: Session, dry_run: bool):
+        self.db = db
+        self.dry_run = dry_run
+        # ✅ Текущая дата для сравнения (без времени)
+        self.today = datetime.utcnow().date()
+        self.seen: Set[str] = set()
+        self.counts = {"processed_count": 0, "archived_count": 0, "active_count": 0, "new_count": 0}
+        self.diff = {"added": 0, "moved_bed": 0, "updated": 0, "discharged": 0, "unchanged": 0}
+        self.rooms_created = 0
+        self.beds_created = 0
+        self.rows_written = 0
+        self.chunks = 0
+        self.timings: Dict[str, float] = {}
+        self._mark = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        now_ts = time.perf_counter()
+        self.timings[phase] = round(self.timings.get(phase, 0.0) + (now_ts - self._mark) * 1000, 1)
+        self._mark = now_ts
+
+    def apply_chunk(self, chunk: List[Tuple[HospitalDocument, str]]) -> None:
+        db = self.db
+        counts, diff = self.counts, self.diff
+        # Повтор клиента в выгрузке — действует последний документ
+        patients_from_1c = {hospital_doc.client: (hospital_doc, doc_hash) for hospital_doc, doc_hash in chunk}
+        self.seen.update(patients_from_1c)
+        self.chunks += 1
+
+        existing = get_patients_for_import(db, patients_from_1c.keys())
+        changed: Dict[str, Tuple[HospitalDocument, str, PatientStatus, Optional[datetime]]] = {}
+        for external_id, (hospital_doc, doc_hash) in patients_from_1c.items():
+            discharge_date = _discharge_date(hospital_doc)
+            # ✅ Статус определяется по дате выписки (выписываем, если дата уже наступила)
+            if discharge_date and discharge_date.date() < self.today:
+                status = PatientStatus.DISCHARGED
+            else:
+                status = PatientStatus.ACTIVE
+            current = existing.get(external_id)
+            if current is not None and current["onec_hash"] == doc_hash and current["status"] == status:
+                diff["unchanged"] += 1
+                if status == PatientStatus.ACTIVE:
+                    counts["active_count"] += 1
+                continue
+            changed[external_id] = (hospital_doc, doc_hash, status, discharge_date)
+        self.lap("prefetch")
+
+        # Койка нужна всем, кроме активных пациентов, которых сейчас выписываем по дате
+        places = _ensure_rooms_and_beds(
             db,
-            external_id=hospital_doc.client,
-            full_name=hospital_doc.client_name,
-            admission_date=admission_date,
-            discharge_date=datetime.combine(discharge_date, datetime.min.time()) if discharge_date else None,
-            status=status,
-            bed_id=bed.id,
-            document_id=hospital_doc.document,
-            branch_id=hospital_doc.branch,
-            department_id=hospital_doc.department,
-            department_name=hospital_doc.department_name
+            [
+                hospital_doc
+                for external_id, (hospital_doc, _, status, _) in changed.items()
+                if status == PatientStatus.ACTIVE
+                or existing.get(external_id, {}).get("status") != PatientStatus.ACTIVE
+            ],
+            dry_run=self.dry_run,
         )
+        bed_ids = places["bed_ids"]
+        self.rooms_created += places["rooms_created"]
+        self.beds_created += places["beds_created"]
+        self.lap("rooms_beds")
 
-        if status == PatientStatus.DISCHARGED:
-            archived_count += 1
-        else:
-            active_count += 1
-            new_count += 1
+        rows = []
+        for external_id, (hospital_doc, doc_hash, status, discharge_date) in changed.items():
+            current = existing.get(external_id)
+            if current is not None and current["status"] == PatientStatus.ACTIVE:
+                before = {field: current[field] for field in ONEC_PATIENT_FIELDS}
+                row = dict(before, onec_hash=doc_hash)
+                if status == PatientStatus.DISCHARGED:
+                    row["status"] = PatientStatus.DISCHARGED
+                    row["discharge_date"] = discharge_date
+                    counts["archived_count"] += 1
+                    diff["discharged"] += 1
+                else:
+                    # Пациент активен — обновляем данные
+                    row["full_name"] = hospital_doc.client_name
+                    row["admission_date"] = parse_date(hospital_doc.start_date)
+                    row["bed_id"] = bed_ids.get(hospital_doc.bed)
+                    row["department_name"] = hospital_doc.department_name
+                    counts["active_count"] += 1
+                    if row["bed_id"] != before["bed_id"]:
+                        diff["moved_bed"] += 1
+                    elif {**row, "onec_hash": before["onec_hash"]} == before:
+                        # Поменялись только поля, которые импорт не переносит, — досчитываем хэш
+                        diff["unchanged"] += 1
+                    else:
+                        diff["updated"] += 1
+            else:
+                row = {
+                    "full_name": hospital_doc.client_name,
+                    "admission_date": parse_date(hospital_doc.start_date),
+                    "discharge_date": discharge_date,
+                    "status": status,
+                    "bed_id": bed_ids.get(hospital_doc.bed),
+                    "document_id": hospital_doc.document,
+                    "branch_id": hospital_doc.branch,
+                    "department_id": hospital_doc.department,
+                    "department_name": hospital_doc.department_name,
+                    "onec_hash": doc_hash,
+                }
+                if status == PatientStatus.DISCHARGED:
+                    counts["archived_count"] += 1
+                else:
+                    counts["active_count"] += 1
+                    counts["new_count"] += 1
+                if current is None or status == PatientStatus.ACTIVE:
+                    diff["added"] += 1
+                else:
+                    diff["updated"] += 1
+                counts["processed_count"] += 1
+            rows.append({"external_id": external_id, **row})
+
+        if not self.dry_run:
+            self.rows_written += upsert_patients(db, rows)
+        self.lap("patients")
+
+    def discharge_missing(self) -> None:
+        """Активные пациенты, которых не было ни в одной пачке, — выписка одним ``UPDATE``."""
+        to_discharge = [
+            patient_id
+            for external_id, patient_id in get_active_patient_ids(self.db).items()
+            if external_id not in self.seen
+        ]
+        self.counts["archived_count"] += len(to_discharge)
+        self.diff["discharged"] += len(to_discharge)
+        if not self.dry_run:
+            discharge_patients(self.db, to_discharge, datetime.utcnow())
+        self.lap("discharge")
 
-        processed_count += 1
 
-    db.commit()
+def sync_with_1c(db: Session, dry_run: bool = False, chunk_size: Optional[int] = None):
+    """Импорт стационара из 1С одной транзакцией.
 
+    Ответ 1С читается потоком (ijson), документы применяются пачками по
+    ``ONEC_IMPORT_CHUNK_SIZE``: пациенты, палаты и койки пачки — запросами ``IN``,
+    пациенты с прежним хэшем документа (``onec_hash``) и статусом не трогаются,
+    остальные пишутся пакетным upsert. Отсутствующие в выгрузке активные пациенты
+    выписываются одним ``UPDATE`` в конце. ``dry_run`` считает разницу (``diff``)
+    без записи. В ответе — суммарное время фаз (``timings_ms``).
+    """
+    chunk_size = max(1, chunk_size or settings.ONEC_IMPORT_CHUNK_SIZE)
+    run = _ImportRun(db, dry_run)
+    try:
+        chunks = iter_document_chunks(chunk_size)
+        for chunk in chunks:
+            run.lap("fetch_parse")
+            run.apply_chunk(chunk)
+        run.lap("fetch_parse")
+        run.discharge_missing()
+        if dry_run:
+            db.rollback()
+        else:
+            db.commit()
+            run.lap("commit")
+    except Exception:
+        db.rollback()
+        raise
+
+    diff = run.diff
+    logger.info(
+        "1C import%s: %s, %s patient rows written in %s chunk(s), %s rooms / %s beds created, timings %s",
+        " (dry run)" if dry_run else "", diff, run.rows_written, run.chunks,
+        run.rooms_created, run.beds_created, run.timings,
+    )
     return {
-        "processed_count": processed_count,
-        "archived_count": archived_count,
-        "active_count": active_count,
-        "new_count": new_count,
-        "message": f"Обработано {processed_count} записей ({active_count} активных, {archived_count} выписанных, {new_count} новых)"
-    }
\ No newline at end of file
+        "dry_run": dry_run,
+        **run.counts,
+        "diff": diff,
+        "rooms_created": run.rooms_created,
+        "beds_created": run.beds_created,
+        "chunks": run.chunks,
+        "timings_ms": run.timings,
+        "message": (
+            f"{'Проверка без записи: ' if dry_run else ''}"
+            f"новых {diff['added']}, смена койки {diff['moved_bed']}, обновлено {diff['updated']}, "
+            f"выписано {diff['discharged']}, без изменений {diff['unchanged']}"
+        ),
+    }
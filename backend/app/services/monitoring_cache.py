@@ -0,0 +1,204 @@
+"""Общий снимок мониторинга BLE/ATM для всех потребителей процесса.
+
+Дашборды палат, обзор браслетов и Celery-проверка читают один и тот же
+разобранный снимок (``ble``/``atm``), а не ходят на сервер мониторинга
+на каждый запрос. Обновление — single-flight, устаревший снимок отдаётся
+сразу (stale-while-revalidate), свежий готовит фоновый refresher из lifespan.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.monitoring_service import (
+    ATM_METRICS,
+    MonitoringService,
+    fetch_atmosphere_for_zone,
+    fetch_missing_atm_metrics,
+    fetch_monitoring_snapshot,
+    fetch_zones_atmosphere,
+    list_available_atm_zones,
+    monitoring_service,
+)
+
+logger = logging.getLogger(__name__)
+
+SnapshotListener = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class MonitoringSnapshotCache:
+    def __init__(
+        self,
+        service: MonitoringService,
+        ttl_seconds: Optional[float] = None,
+        max_stale_seconds: Optional[float] = None,
+    ):
+        self.service = service
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.MONITORING_SNAPSHOT_TTL_SEC
+        self.max_stale_seconds = (
+            max_stale_seconds
+            if max_stale_seconds is not None
+            else settings.MONITORING_SNAPSHOT_MAX_STALE_SEC
+        )
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._fetched_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+        self._refresher_task: Optional[asyncio.Task] = None
+        self._listeners: List[SnapshotListener] = []
+        self._notified: Optional[Dict[str, Any]] = None
+        # Атмосфера по зонам палат: дозапрос /atm/{zone}/… делает refresher, не запросы и не поток
+        self._zone_atm: Dict[int, Dict[str, Any]] = {}
+        self._zones_requested: Dict[int, float] = {}
+
+    def _age(self) -> float:
+        return time.monotonic() - self._fetched_at
+
+    def peek(self) -> Optional[Dict[str, Any]]:
+        """Текущий снимок без обращения к серверу мониторинга (может быть None)."""
+        return self._snapshot
+
+    def get(self) -> Dict[str, Any]:
+        """Снимок для запроса: свежий — как есть, устаревший — сразу + фоновое обновление."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            age = self._age()
+            if age < self.ttl_seconds:
+                return snapshot
+            if age < self.max_stale_seconds:
+                self._refresh_in_background()
+                return snapshot
+        return self.refresh()
+
+    def refresh(self) -> Dict[str, Any]:
+        """Single-flight: параллельные вызовы ждут один запрос и получают его результат."""
+        requested_at = time.monotonic()
+        with self._refresh_lock:
+            if self._snapshot is not None and self._fetched_at >= requested_at:
+                return self._snapshot
+            self._refreshing = True
+            try:
+                snapshot = fetch_monitoring_snapshot(self.service)
+                snapshot["atm_zones"] = list_available_atm_zones(snapshot["atm"], self.service)
+                self._refresh_zone_atmosphere(snapshot)
+                self._snapshot = snapshot
+                self._fetched_at = time.monotonic()
+                return snapshot
+            finally:
+                self._refreshing = False
+
+    def _refresh_zone_atmosphere(self, snapshot: Dict[str, Any]) -> None:
+        """Дополнить показания зон, которые недавно запрашивали дашборды палат.
+
+        Все зоны дозапрашиваются параллельно под одним дедлайном
+        ``MONITORING_ATM_FALLBACK_DEADLINE_SEC``; не успевшая зона сохраняет прежние показания.
+        """
+        now = time.monotonic()
+        zones: Dict[int, Dict[str, Any]] = {}
+        for zone, requested_at in list(self._zones_requested.items()):
+            if now - requested_at > self.max_stale_seconds:
+                self._zones_requested.pop(zone, None)
+                self._zone_atm.pop(zone, None)
+                continue
+            zones[zone] = dict(snapshot["atm"].get(str(zone)) or {})
+        if not zones:
+            return
+        try:
+            results, timed_out = fetch_zones_atmosphere(self.service, zones)
+        except Exception as exc:
+            logger.warning("ATM zones refresh failed: %s", exc)
+            return
+        for zone, parsed in results.items():
+            if zone in timed_out and zone in self._zone_atm:
+                continue
+            self._zone_atm[zone] = parsed
+
+    def zone_atmosphere(
+        self,
+        zone: int,
+        snapshot: Dict[str, Any],
+        allow_fetch: bool = False,
+    ) -> Dict[str, Any]:
+        """Показания зоны: из кэша refresher-а, иначе из снимка.
+
+        Зона запоминается, и следующие обновления снимка дозапрашивают её недостающие метрики.
+        ``allow_fetch`` — для REST без готового кэша: дозапрос прямо в запросе.
+        """
+        self._zones_requested[zone] = time.monotonic()
+        cached = self._zone_atm.get(zone)
+        if cached is not None:
+            return cached
+        parsed = dict(snapshot["atm"].get(str(zone)) or {})
+        if not allow_fetch:
+            return parsed
+        if any(parsed.get(k) is not None for k in ATM_METRICS):
+            parsed = fetch_missing_atm_metrics(self.service, zone, parsed)
+        else:
+            parsed = fetch_atmosphere_for_zone(self.service, zone)
+        self._zone_atm[zone] = parsed
+        return parsed
+
+    def _refresh_in_background(self) -> None:
+        if self._refreshing:
+            return
+        thread = threading.Thread(target=self._safe_refresh, name="monitoring-snapshot", daemon=True)
+        thread.start()
+
+    def _safe_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as exc:
+            logger.warning("Monitoring snapshot refresh failed: %s", exc)
+
+    def add_listener(self, callback: SnapshotListener) -> None:
+        """Async-колбэк на каждый новый снимок, полученный фоновым refresher-ом."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    async def _notify_listeners(self) -> None:
+        snapshot = self._snapshot
+        if snapshot is None or snapshot is self._notified:
+            return
+        self._notified = snapshot
+        for callback in list(self._listeners):
+            try:
+                await callback(snapshot)
+            except Exception as exc:
+                logger.warning("Monitoring snapshot listener failed: %s", exc)
+
+    async def _run_refresher(self, interval: float) -> None:
+        while True:
+            await asyncio.to_thread(self._safe_refresh)
+            await self._notify_listeners()
+            await asyncio.sleep(interval)
+
+    def start_refresher(self, interval: Optional[float] = None) -> None:
+        """Фоновое обновление снимка в event loop FastAPI (вызывается из lifespan)."""
+        if self._refresher_task is not None and not self._refresher_task.done():
+            return
+        period = interval if interval is not None else settings.MONITORING_SNAPSHOT_REFRESH_SEC
+        self._refresher_task = asyncio.create_task(self._run_refresher(period))
+        logger.info("Monitoring snapshot refresher started (every %.1fs)", period)
+
+    async def stop_refresher(self) -> None:
+        task = self._refresher_task
+        self._refresher_task = None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+monitoring_snapshot_cache = MonitoringSnapshotCache(monitoring_service)
+
+
+def get_monitoring_snapshot() -> Dict[str, Any]:
+    """Общий снимок ``{health, state, ble, atm, atm_zones}``; не изменять на месте."""
+    return monitoring_snapshot_cache.get()
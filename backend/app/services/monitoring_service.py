@@ -1,13 +1,19 @@
 """Клиент тестового сервиса BLE/ATM мониторинга."""
 from __future__ import annotations
 
+import asyncio
 import logging
 import re
-from typing import Any, Dict, List, Optional
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait as futures_wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 
 from app.core.config import settings
+from app.core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -65,24 +71,64 @@ def parse_online_flag(data: Dict[str, Any]) -> Optional[bool]:
     return None
 
 
+def _endpoint_group(path: str) -> str:
+    """/atm/1/co2 -> atm; для выбора таймаута по типу запроса."""
+    return path.strip("/").split("/", 1)[0]
+
+
+def _normalize_base_url(base_url: Optional[str]) -> str:
+    raw = (base_url or settings.MONITORING_API_URL or "").rstrip("/")
+    return raw if raw.endswith("/api") else f"{raw}/api" if raw else ""
+
+
+def _endpoint_timeouts(default: float) -> Dict[str, float]:
+    return {
+        "health": min(default, settings.MONITORING_HEALTH_TIMEOUT),
+        "atm": min(default, settings.MONITORING_ATM_TIMEOUT),
+    }
+
+
+def _parse_payload(status_code: int, json_loader: Callable[[], Any]) -> Tuple[bool, Any]:
+    """404 с {error} — штатный ответ сервера мониторинга (нет зоны/метрики)."""
+    if status_code == 404:
+        try:
+            data = json_loader()
+        except ValueError:
+            data = {}
+        if isinstance(data, dict) and data.get("error"):
+            return True, data
+    return False, None
+
+
 class MonitoringService:
     def __init__(self, base_url: Optional[str] = None, timeout: Optional[int] = None):
-        raw = (base_url or settings.MONITORING_API_URL or "").rstrip("/")
-        self.base_url = raw if raw.endswith("/api") else f"{raw}/api" if raw else ""
+        self.base_url = _normalize_base_url(base_url)
         self.timeout = timeout or settings.MONITORING_API_TIMEOUT
+        self.timeouts = _endpoint_timeouts(self.timeout)
+        self._session: Optional[requests.Session] = None
+
+    def _get_session(self) -> requests.Session:
+        # Keep-alive пул вместо нового TCP-соединения на каждый requests.get
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=settings.MONITORING_API_MAX_CONNECTIONS,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
 
     def _get(self, path: str) -> Any:
         if not self.base_url:
             raise ValueError("MONITORING_API_URL is not configured")
         url = f"{self.base_url}{path}"
-        response = requests.get(url, timeout=self.timeout)
-        if response.status_code == 404:
-            try:
-                data = response.json()
-            except ValueError:
-                data = {}
-            if isinstance(data, dict) and data.get("error"):
-                return data
+        timeout = self.timeouts.get(_endpoint_group(path), self.timeout)
+        response = self._get_session().get(url, timeout=timeout)
+        handled, data = _parse_payload(response.status_code, response.json)
+        if handled:
+            return data
         response.raise_for_status()
         return response.json()
 
@@ -108,6 +154,77 @@ class MonitoringService:
         return self._get("/atm")
 
 
+class AsyncMonitoringService:
+    """Асинхронный клиент для async-маршрутов: общий keep-alive пул и лимит параллельных запросов."""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        timeout: Optional[int] = None,
+        max_connections: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.base_url = _normalize_base_url(base_url)
+        self.timeout = timeout or settings.MONITORING_API_TIMEOUT
+        self.timeouts = _endpoint_timeouts(self.timeout)
+        self.max_connections = max_connections or settings.MONITORING_API_MAX_CONNECTIONS
+        self.max_concurrency = max_concurrency or settings.MONITORING_API_MAX_CONCURRENCY
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._semaphore = None
+
+    async def _get(self, path: str) -> Any:
+        if not self.base_url:
+            raise ValueError("MONITORING_API_URL is not configured")
+        client = self._get_client()
+        timeout = self.timeouts.get(_endpoint_group(path), self.timeout)
+        async with self._semaphore:
+            response = await client.get(f"{self.base_url}{path}", timeout=timeout)
+        handled, data = _parse_payload(response.status_code, response.json)
+        if handled:
+            return data
+        response.raise_for_status()
+        return response.json()
+
+    async def get_health(self) -> Dict[str, Any]:
+        return await self._get("/health")
+
+    async def get_state(self) -> Dict[str, Any]:
+        return await self._get("/state")
+
+    async def get_ble_all(self) -> Any:
+        return await self._get("/ble")
+
+    async def get_ble_device(self, mac: str) -> Dict[str, Any]:
+        return await self._get(f"/ble/{normalize_mac(mac)}")
+
+    async def get_atm_room(self, room: int) -> Dict[str, Any]:
+        return await self._get(f"/atm/{room}")
+
+    async def get_atm_metric(self, room: int, metric: str) -> Any:
+        return await self._get(f"/atm/{room}/{metric.strip().lower()}")
+
+    async def get_atm_all(self) -> Any:
+        return await self._get("/atm")
+
+
 def _as_dict(value: Any) -> Dict[str, Any]:
     return value if isinstance(value, dict) else {}
 
@@ -205,37 +322,188 @@ def is_atm_error_response(data: Any) -> bool:
 ATM_METRICS = ("temp", "hum", "press", "co2")
 
 
+def _merge_atm_room(result: Dict[str, Any], zone: int, room_data: Dict[str, Any]) -> None:
+    if is_atm_error_response(room_data):
+        logger.warning("ATM room %s: %s", zone, room_data.get("message") or room_data.get("error"))
+        return
+    parsed = normalize_atm_zone(room_data)
+    for key in ATM_METRICS:
+        if parsed.get(key) is not None:
+            result[key] = parsed.get(key)
+
+
+def _atm_metric_value(raw: Any) -> Any:
+    """Ответ /atm/{zone}/{metric} -> значение (None для {error})."""
+    if is_atm_error_response(raw):
+        return None
+    if isinstance(raw, dict):
+        return unwrap_metric(raw)
+    return raw
+
+
+# Общий пул для дозапросов /atm/{zone}/{metric}: потоки не создаются на каждый запрос
+_atm_fallback_executor = ThreadPoolExecutor(
+    max_workers=len(ATM_METRICS) * 2,
+    thread_name_prefix="atm-fallback",
+)
+
+
+def _record_atm_fallback(requested: int, timed_out: int, started: float) -> None:
+    metrics.inc("monitoring_atm_fallback_calls", requested)
+    if timed_out:
+        metrics.inc("monitoring_atm_fallback_timeouts", timed_out)
+    metrics.observe("monitoring_atm_fallback_seconds", time.monotonic() - started)
+
+
+def fetch_missing_atm_metrics(
+    service: MonitoringService,
+    zone: int,
+    result: Dict[str, Any],
+    deadline: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Параллельный дозапрос недостающих метрик; что не пришло к дедлайну — остаётся None."""
+    missing = [key for key in ATM_METRICS if result.get(key) is None]
+    if not missing:
+        return result
+    timeout = deadline if deadline is not None else settings.MONITORING_ATM_FALLBACK_DEADLINE_SEC
+    started = time.monotonic()
+    futures = {
+        _atm_fallback_executor.submit(service.get_atm_metric, zone, key): key
+        for key in missing
+    }
+    done, not_done = futures_wait(futures, timeout=timeout)
+    for future in done:
+        key = futures[future]
+        try:
+            result[key] = _atm_metric_value(future.result())
+        except Exception as exc:
+            logger.debug("ATM %s/%s failed: %s", zone, key, exc)
+    for future in not_done:
+        future.cancel()
+    if not_done:
+        logger.debug("ATM %s: fallback deadline %.1fs exceeded for %s", zone, timeout, len(not_done))
+    _record_atm_fallback(len(missing), len(not_done), started)
+    return result
+
+
+def fetch_zones_atmosphere(
+    service: MonitoringService,
+    zones: Dict[int, Dict[str, Any]],
+    deadline: Optional[float] = None,
+) -> Tuple[Dict[int, Dict[str, Any]], List[int]]:
+    """Атмосфера нескольких зон параллельно под одним общим дедлайном.
+
+    ``zones`` — зона -> показания из снимка. Зоне без показаний сначала запрашивается
+    ``/atm/{zone}``, по его ответу — недостающие ``/atm/{zone}/{metric}``; остальным зонам
+    метрики дозапрашиваются сразу. Все запросы идут в общий пул дозапросов.
+    Возвращает показания и зоны, не уложившиеся в дедлайн.
+    """
+    timeout = deadline if deadline is not None else settings.MONITORING_ATM_FALLBACK_DEADLINE_SEC
+    started = time.monotonic()
+    ends_at = started + timeout
+    results: Dict[int, Dict[str, Any]] = {}
+    # future -> (зона, метрика); метрика None — запрос /atm/{zone}
+    futures: Dict[Future, Tuple[int, Optional[str]]] = {}
+
+    def submit_missing(zone: int) -> None:
+        for key in ATM_METRICS:
+            if results[zone].get(key) is None:
+                futures[_atm_fallback_executor.submit(service.get_atm_metric, zone, key)] = (zone, key)
+
+    for zone, data in zones.items():
+        if any(data.get(key) is not None for key in ATM_METRICS):
+            results[zone] = dict(data)
+            submit_missing(zone)
+        else:
+            results[zone] = {key: None for key in ATM_METRICS}
+            futures[_atm_fallback_executor.submit(service.get_atm_room, zone)] = (zone, None)
+    requested = len(futures)
+
+    pending = set(futures)
+    while pending:
+        remaining = ends_at - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = futures_wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            zone, key = futures[future]
+            if key is None:
+                try:
+                    _merge_atm_room(results[zone], zone, _as_dict(future.result()))
+                except Exception as exc:
+                    logger.warning("ATM room %s failed: %s", zone, exc)
+                before = len(futures)
+                submit_missing(zone)
+                requested += len(futures) - before
+                pending.update(list(futures)[before:])
+                continue
+            try:
+                results[zone][key] = _atm_metric_value(future.result())
+            except Exception as exc:
+                logger.debug("ATM %s/%s failed: %s", zone, key, exc)
+
+    timed_out: Set[int] = set()
+    for future in pending:
+        future.cancel()
+        timed_out.add(futures[future][0])
+    if pending:
+        logger.debug("ATM zones: fallback deadline %.1fs exceeded for %s", timeout, sorted(timed_out))
+    if requested:
+        _record_atm_fallback(requested, len(pending), started)
+    return results, sorted(timed_out)
+
+
+async def fetch_missing_atm_metrics_async(
+    service: AsyncMonitoringService,
+    zone: int,
+    result: Dict[str, Any],
+    deadline: Optional[float] = None,
+) -> Dict[str, Any]:
+    missing = [key for key in ATM_METRICS if result.get(key) is None]
+    if not missing:
+        return result
+    timeout = deadline if deadline is not None else settings.MONITORING_ATM_FALLBACK_DEADLINE_SEC
+    started = time.monotonic()
+    tasks = {
+        asyncio.ensure_future(service.get_atm_metric(zone, key)): key
+        for key in missing
+    }
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in done:
+        key = tasks[task]
+        exc = task.exception()
+        if exc is not None:
+            logger.debug("ATM %s/%s failed: %s", zone, key, exc)
+            continue
+        result[key] = _atm_metric_value(task.result())
+    for task in pending:
+        task.cancel()
+    _record_atm_fallback(len(missing), len(pending), started)
+    return result
+
+
 def fetch_atmosphere_for_zone(service: MonitoringService, zone: int) -> Dict[str, Any]:
-    """Собирает атмосферу: сначала /atm/{zone}, затем дозапрос /atm/{zone}/{metric}."""
+    """Собирает атмосферу: сначала /atm/{zone}, затем параллельный дозапрос /atm/{zone}/{metric}."""
     result: Dict[str, Any] = {k: None for k in ATM_METRICS}
 
     try:
-        room_data = _as_dict(service.get_atm_room(zone))
-        if is_atm_error_response(room_data):
-            logger.warning("ATM room %s: %s", zone, room_data.get("message") or room_data.get("error"))
-        else:
-            parsed = normalize_atm_zone(room_data)
-            for key in ATM_METRICS:
-                if parsed.get(key) is not None:
-                    result[key] = parsed.get(key)
+        _merge_atm_room(result, zone, _as_dict(service.get_atm_room(zone)))
     except Exception as exc:
         logger.warning("ATM room %s failed: %s", zone, exc)
 
-    for key in ATM_METRICS:
-        if result[key] is not None:
-            continue
-        try:
-            raw = service.get_atm_metric(zone, key)
-            if is_atm_error_response(raw):
-                continue
-            if isinstance(raw, dict):
-                result[key] = unwrap_metric(raw)
-            else:
-                result[key] = raw
-        except Exception as exc:
-            logger.debug("ATM %s/%s failed: %s", zone, key, exc)
+    return fetch_missing_atm_metrics(service, zone, result)
 
-    return result
+
+async def fetch_atmosphere_for_zone_async(service: AsyncMonitoringService, zone: int) -> Dict[str, Any]:
+    """Как fetch_atmosphere_for_zone, но без потоков — на async-клиенте."""
+    result: Dict[str, Any] = {k: None for k in ATM_METRICS}
+
+    try:
+        _merge_atm_room(result, zone, _as_dict(await service.get_atm_room(zone)))
+    except Exception as exc:
+        logger.warning("ATM room %s failed: %s", zone, exc)
+
+    return await fetch_missing_atm_metrics_async(service, zone, result)
 
 
 def metrics_from_device(device: Dict[str, Any]) -> Dict[str, Any]:
@@ -255,6 +523,26 @@ def parse_atmosphere(zone_data: Optional[Dict[str, Any]]) -> Optional[Dict[str,
     }
 
 
+def _build_snapshot(
+    health: Dict[str, Any],
+    state: Dict[str, Any],
+    ble_map: Dict[str, Dict[str, Any]],
+    atm_map: Dict[str, Dict[str, Any]],
+) -> Dict[str, Any]:
+    return {
+        "health": health,
+        "state": state,
+        "ble": ble_map,
+        "atm": atm_map,
+    }
+
+
+def _ble_map_from_raw(ble_raw: Any) -> Dict[str, Dict[str, Any]]:
+    if isinstance(ble_raw, (dict, list)):
+        return _extract_ble_map({"ble": ble_raw})
+    return {}
+
+
 def fetch_monitoring_snapshot(service: MonitoringService) -> Dict[str, Any]:
     health: Dict[str, Any] = {"ok": False}
     state: Dict[str, Any] = {}
@@ -275,11 +563,7 @@ def fetch_monitoring_snapshot(service: MonitoringService) -> Dict[str, Any]:
     except Exception as exc:
         logger.warning("Monitoring state failed: %s", exc)
         try:
-            ble_raw = service.get_ble_all()
-            if isinstance(ble_raw, dict):
-                ble_map = _extract_ble_map({"ble": ble_raw})
-            elif isinstance(ble_raw, list):
-                ble_map = _extract_ble_map({"ble": ble_raw})
+            ble_map = _ble_map_from_raw(service.get_ble_all())
         except Exception as ble_exc:
             logger.warning("Monitoring ble fallback failed: %s", ble_exc)
 
@@ -293,12 +577,8 @@ def fetch_monitoring_snapshot(service: MonitoringService) -> Dict[str, Any]:
         if not ble_map and not atm_map:
             state = {"error": str(exc)}
 
-    return {
-        "health": health,
-        "state": state,
-        "ble": ble_map,
-        "atm": atm_map,
-    }
+    return _build_snapshot(health, state, ble_map, atm_map)
 
 
 monitoring_service = MonitoringService()
+async_monitoring_service = AsyncMonitoringService()
@@ -0,0 +1,242 @@
+"""Живой поток мониторинга по WebSocket вместо опроса REST с планшетов.
+
+Каналы ``ConnectionManager``:
+
+- ``monitoring:{room_id}`` — дашборд палаты (койки, браслеты, атмосфера);
+- ``bracelets`` — обзор браслетов для поста медсестры.
+
+На каждый новый снимок мониторинга payload канала строится один раз
+(независимо от числа подписчиков), сравнивается с предыдущим и в сокеты
+уходят только изменившиеся койки, устройства и показания атмосферы.
+Новый подписчик получает полный ``*_snapshot``, дальше — ``*_delta``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.database import SessionLocal
+from app.core.websocket_manager import ConnectionManager, manager
+from app.services.monitoring_cache import monitoring_snapshot_cache
+
+logger = logging.getLogger(__name__)
+
+MONITORING_CHANNEL_PREFIX = "monitoring:"
+BRACELETS_CHANNEL = "bracelets"
+
+_DASHBOARD_META_FIELDS = (
+    "connected",
+    "error",
+    "health",
+    "monitor_zone",
+    "available_atm_zones",
+    "atmosphere_error",
+    "sensors_updated_at",
+)
+
+_OVERVIEW_SUMMARY_FIELDS = (
+    "patients_total",
+    "patients_with_ble",
+    "patients_online",
+    "patients_without_mac",
+    "alerts_found",
+    "monitoring_connected",
+    "max_bot_configured",
+    "alerts_enabled",
+    "error",
+)
+
+
+def monitoring_channel(room_id: int) -> str:
+    return f"{MONITORING_CHANNEL_PREFIX}{room_id}"
+
+
+def parse_monitoring_channel(channel: str) -> Optional[int]:
+    if not channel.startswith(MONITORING_CHANNEL_PREFIX):
+        return None
+    try:
+        return int(channel[len(MONITORING_CHANNEL_PREFIX):])
+    except ValueError:
+        return None
+
+
+def is_stream_channel(channel: str) -> bool:
+    return channel == BRACELETS_CHANNEL or parse_monitoring_channel(channel) is not None
+
+
+def _diff_items(
+    previous: Iterable[Dict[str, Any]],
+    current: Iterable[Dict[str, Any]],
+    key: str,
+) -> Tuple[List[Dict[str, Any]], List[Any]]:
+    """Изменившиеся/новые элементы и ключи удалённых."""
+    before = {item[key]: item for item in previous}
+    changed: List[Dict[str, Any]] = []
+    seen = set()
+    for item in current:
+        item_key = item[key]
+        seen.add(item_key)
+        if before.get(item_key) != item:
+            changed.append(item)
+    removed = [item_key for item_key in before if item_key not in seen]
+    return changed, removed
+
+
+def _dashboard_delta(previous: Dict[str, Any], current: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    delta: Dict[str, Any] = {}
+    meta = {k: current.get(k) for k in _DASHBOARD_META_FIELDS if previous.get(k) != current.get(k)}
+    if meta:
+        delta["meta"] = meta
+    if previous.get("atmosphere") != current.get("atmosphere"):
+        delta["atmosphere"] = current.get("atmosphere")
+    beds, removed_beds = _diff_items(previous.get("beds", []), current.get("beds", []), "bed_id")
+    if beds:
+        delta["beds"] = beds
+    if removed_beds:
+        delta["removed_beds"] = removed_beds
+    devices, removed_devices = _diff_items(
+        previous.get("unassigned_ble", []), current.get("unassigned_ble", []), "mac"
+    )
+    if devices:
+        delta["unassigned_ble"] = devices
+    if removed_devices:
+        delta["removed_ble"] = removed_devices
+    if not delta:
+        return None
+    delta.update(
+        type="monitoring_delta",
+        room_id=current["room_id"],
+        refreshed_at=current.get("refreshed_at"),
+    )
+    return delta
+
+
+def _overview_delta(previous: Dict[str, Any], current: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    delta: Dict[str, Any] = {}
+    summary = {
+        k: current.get(k) for k in _OVERVIEW_SUMMARY_FIELDS if previous.get(k) != current.get(k)
+    }
+    if summary:
+        delta["summary"] = summary
+    patients, removed_patients = _diff_items(
+        previous.get("patients", []), current.get("patients", []), "patient_id"
+    )
+    if patients:
+        delta["patients"] = patients
+    if removed_patients:
+        delta["removed_patients"] = removed_patients
+    devices, removed_devices = _diff_items(
+        previous.get("unassigned_devices", []), current.get("unassigned_devices", []), "mac"
+    )
+    if devices:
+        delta["unassigned_devices"] = devices
+    if removed_devices:
+        delta["removed_devices"] = removed_devices
+    if not delta:
+        return None
+    delta.update(type="bracelets_delta", checked_at=current.get("checked_at"))
+    return delta
+
+
+def _snapshot_message(channel: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    if channel == BRACELETS_CHANNEL:
+        return {"type": "bracelets_snapshot", "overview": payload}
+    return {"type": "monitoring_snapshot", "room_id": payload["room_id"], "dashboard": payload}
+
+
+def _delta_message(
+    channel: str,
+    previous: Dict[str, Any],
+    current: Dict[str, Any],
+) -> Optional[Dict[str, Any]]:
+    if channel == BRACELETS_CHANNEL:
+        return _overview_delta(previous, current)
+    return _dashboard_delta(previous, current)
+
+
+class MonitoringStream:
+    def __init__(self, connections: ConnectionManager):
+        self.connections = connections
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        # Один сервис алертов (Redis дедупа, MAX-нотификатор) на поток, а не на каждый цикл
+        self._alert_service = None
+        # Resync и переполненная очередь сокета получают полный снимок канала
+        connections.add_state_provider(is_stream_channel, self.initial_message)
+
+    def _active_channels(self) -> List[str]:
+        return [c for c in list(self.connections.active_connections) if is_stream_channel(c)]
+
+    def _build_payloads(
+        self,
+        channels: List[str],
+        snapshot: Optional[Dict[str, Any]],
+    ) -> Dict[str, Dict[str, Any]]:
+        """Один payload на канал — сколько бы сокетов ни было подписано.
+
+        Только общий снимок и БД: атмосфера зон берётся из кэша refresher-а, HTTP здесь нет.
+        """
+        from app.api.v1.endpoints.bracelet_alerts import build_bracelet_overview
+        from app.api.v1.endpoints.monitoring import build_monitoring_dashboard
+        from app.bracelet_alerts.service import BraceletAlertService
+        from app.models.room import Room
+
+        payloads: Dict[str, Dict[str, Any]] = {}
+        db = SessionLocal()
+        try:
+            for channel in channels:
+                try:
+                    if channel == BRACELETS_CHANNEL:
+                        if self._alert_service is None:
+                            self._alert_service = BraceletAlertService()
+                        overview = build_bracelet_overview(db, self._alert_service)
+                        payloads[channel] = overview.model_dump(mode="json")
+                        continue
+                    room = db.query(Room).filter(Room.id == parse_monitoring_channel(channel)).first()
+                    if room is None:
+                        continue
+                    dashboard = build_monitoring_dashboard(db, room, snapshot, allow_fetch=False)
+                    payloads[channel] = dashboard.model_dump(mode="json")
+                except Exception as exc:
+                    logger.warning("Monitoring stream %s build failed: %s", channel, exc)
+                    db.rollback()
+        finally:
+            db.close()
+        return payloads
+
+    async def initial_message(self, channel: str) -> Optional[Dict[str, Any]]:
+        """Полный снимок для только что подключённого сокета."""
+        async with self._lock:
+            payload = self._state.get(channel)
+            if payload is None:
+                snapshot = monitoring_snapshot_cache.peek()
+                built = await asyncio.to_thread(self._build_payloads, [channel], snapshot)
+                payload = built.get(channel)
+                if payload is None:
+                    return None
+                self._state[channel] = payload
+            return _snapshot_message(channel, payload)
+
+    async def on_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        """Колбэк общего снимка мониторинга: рассылает только изменения."""
+        async with self._lock:
+            channels = self._active_channels()
+            for stale in set(self._state) - set(channels):
+                del self._state[stale]
+            if not channels:
+                return
+            payloads = await asyncio.to_thread(self._build_payloads, channels, snapshot)
+            for channel, payload in payloads.items():
+                previous = self._state.get(channel)
+                self._state[channel] = payload
+                if previous is None:
+                    message = _snapshot_message(channel, payload)
+                else:
+                    message = _delta_message(channel, previous, payload)
+                if message is not None:
+                    # Каждый воркер строит поток из своего снимка — в Redis не публикуем
+                    await self.connections.broadcast_local(message, channel)
+
+
+monitoring_stream = MonitoringStream(manager)
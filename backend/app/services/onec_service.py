@@ -1,16 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import time
 import requests
-from typing import Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from app.core.config import settings
 from app.models.patient import Patient
 import logging
 
 logger = logging.getLogger(__name__)
 
+# (id пациента, результат sync_patient или {"success": False, "error": ...}, задержка запроса в секундах)
+SyncOutcome = Tuple[int, Dict[str, Any], float]
+
+
+def _isoformat(value) -> Optional[str]:
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def build_patient_payload(patient: Patient) -> Dict[str, Any]:
+    """Тело запроса синхронизации; собирается в потоке сессии БД, а не в пуле отправки."""
+    return {
+        "external_id": patient.external_id or f"medcenter-{patient.id}",
+        "full_name": patient.full_name,
+        "birth_date": _isoformat(patient.birth_date),
+        "gender": patient.gender,
+        "medical_record_number": patient.medical_record_number,
+        "admission_date": _isoformat(patient.admission_date),
+        "discharge_date": _isoformat(patient.discharge_date),
+        "status": patient.status,
+        "bed_id": patient.bed_id,
+        "department_name": patient.department_name
+    }
+
+
+def sync_stats(outcomes: Sequence[SyncOutcome], elapsed: float) -> Dict[str, Any]:
+    """Пропускная способность и задержки запросов одного прогона."""
+    latencies = sorted(latency for _, _, latency in outcomes)
+    synced = sum(1 for _, result, _ in outcomes if result.get("success"))
+
+    def percentile(q: float) -> Optional[float]:
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+
+    return {
+        "total": len(outcomes),
+        "synced": synced,
+        "failed": len(outcomes) - synced,
+        "elapsed_sec": round(elapsed, 3),
+        "per_sec": round(len(outcomes) / elapsed, 2) if elapsed > 0 else None,
+        "latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)},
+    }
+
+
 class OneCService:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, workers: Optional[int] = None):
         self.base_url = base_url.rstrip("/")
-        self.timeout = 30  # секунд
-    
+        self.timeout = settings.ONEC_TIMEOUT  # секунд
+        self.workers = max(1, workers or settings.ONEC_SYNC_WORKERS)
+        # Одна сессия на сервис: keep-alive соединения переиспользуются потоками пула
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+        self._http.headers["Content-Type"] = "application/json"
+        self._batch_supported = True
+
+    def close(self) -> None:
+        self._http.close()
+
     def sync_patient(self, patient: Patient) -> Dict[str, Any]:
         """
         Синхронизировать пациента с 1С
@@ -26,31 +87,20 @@ class OneCService:
         if not self.base_url:
             raise ValueError("URL 1С не настроен (ONE_C_URL)")
         
+        return self._sync_payload(patient.id, build_patient_payload(patient))
+
+    def _sync_payload(self, patient_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            payload = {
-                "external_id": patient.external_id or f"medcenter-{patient.id}",
-                "full_name": patient.full_name,
-                "birth_date": patient.birth_date,
-                "gender": patient.gender,
-                "medical_record_number": patient.medical_record_number,
-                "admission_date": patient.admission_date.isoformat() if hasattr(patient.admission_date, 'isoformat') else str(patient.admission_date),
-                "discharge_date": patient.discharge_date.isoformat() if patient.discharge_date and hasattr(patient.discharge_date, 'isoformat') else None,
-                "status": patient.status,
-                "bed_id": patient.bed_id,
-                "department_name": patient.department_name
-            }
-            
-            response = requests.post(
+            response = self._http.post(
                 f"{self.base_url}/api/patients/sync",
                 json=payload,
                 timeout=self.timeout,
-                headers={"Content-Type": "application/json"}
             )
             
             response.raise_for_status()
             result = response.json()
             
-            logger.info(f"Успешная синхронизация пациента {patient.id} с 1С. 1С ID: {result.get('onec_id')}")
+            logger.info(f"Успешная синхронизация пациента {patient_id} с 1С. 1С ID: {result.get('onec_id')}")
             return {
                 "success": True,
                 "onec_id": result.get("onec_id"),
@@ -59,21 +109,106 @@ class OneCService:
             }
             
         except requests.exceptions.Timeout:
-            error_msg = f"Таймаут при синхронизации пациента {patient.id} с 1С"
+            error_msg = f"Таймаут при синхронизации пациента {patient_id} с 1С"
             logger.error(error_msg)
             raise TimeoutError(error_msg)
             
         except requests.exceptions.ConnectionError as e:
-            error_msg = f"Ошибка подключения к 1С при синхронизации пациента {patient.id}: {e}"
+            error_msg = f"Ошибка подключения к 1С при синхронизации пациента {patient_id}: {e}"
             logger.error(error_msg)
             raise ConnectionError(error_msg)
             
         except requests.exceptions.HTTPError as e:
-            error_msg = f"HTTP ошибка 1С при синхронизации пациента {patient.id}: {e} - {e.response.text if e.response else ''}"
+            error_msg = f"HTTP ошибка 1С при синхронизации пациента {patient_id}: {e} - {e.response.text if e.response else ''}"
             logger.error(error_msg)
             raise
             
         except Exception as e:
-            error_msg = f"Неизвестная ошибка при синхронизации пациента {patient.id}: {e}"
+            error_msg = f"Неизвестная ошибка при синхронизации пациента {patient_id}: {e}"
             logger.error(error_msg)
-            raise
\ No newline at end of file
+            raise
+
+    def sync_batch(self, items: Sequence[Tuple[int, Dict[str, Any]]]) -> Optional[List[SyncOutcome]]:
+        """Пачка пациентов одним запросом ``/api/patients/sync-batch``.
+
+        ``None`` — 1С не поддерживает пакетный метод (404/405), вызывающий шлёт по одному.
+        """
+        started = time.perf_counter()
+        response = self._http.post(
+            f"{self.base_url}/api/patients/sync-batch",
+            json={"patients": [payload for _, payload in items]},
+            timeout=self.timeout,
+        )
+        if response.status_code in (404, 405):
+            return None
+        response.raise_for_status()
+        latency = time.perf_counter() - started
+        by_external_id = {
+            str(item.get("external_id")): item for item in (response.json() or {}).get("results", [])
+        }
+        outcomes: List[SyncOutcome] = []
+        for patient_id, payload in items:
+            item = by_external_id.get(str(payload["external_id"]))
+            if item is None:
+                result = {"success": False, "error": "Нет результата в ответе 1С"}
+            else:
+                result = {
+                    "success": bool(item.get("success", True)) and not item.get("error"),
+                    "onec_id": item.get("onec_id"),
+                    "synced_at": item.get("synced_at") or datetime.utcnow().isoformat(),
+                    "errors": item.get("errors", []),
+                }
+                if not result["success"]:
+                    result["error"] = item.get("error") or "; ".join(map(str, result["errors"]))
+            outcomes.append((patient_id, result, latency))
+        return outcomes
+
+    def sync_many(
+        self,
+        items: Sequence[Tuple[int, Dict[str, Any]]],
+        batch_size: int = 0,
+    ) -> List[SyncOutcome]:
+        """Синхронизировать пачку: пакетным методом, если включён, иначе пулом потоков.
+
+        Ошибка одного пациента не прерывает остальных — она попадает в результат.
+        """
+        if not self.base_url:
+            raise ValueError("URL 1С не настроен (ONE_C_URL)")
+        outcomes: List[SyncOutcome] = []
+        if batch_size > 0 and self._batch_supported:
+            chunks = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(chunks) or 1)) as pool:
+                batched = list(pool.map(self._sync_batch_safe, chunks))
+            pending: List[Tuple[int, Dict[str, Any]]] = []
+            for chunk, result in zip(chunks, batched):
+                if result is None:
+                    pending.extend(chunk)
+                else:
+                    outcomes.extend(result)
+            if not pending:
+                return outcomes
+            logger.warning("1С не поддерживает пакетную синхронизацию — отправка по одному")
+            self._batch_supported = False
+            items = pending
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(items) or 1)) as pool:
+            outcomes.extend(pool.map(lambda item: self._sync_one_safe(*item), items))
+        return outcomes
+
+    def _sync_batch_safe(self, items: Sequence[Tuple[int, Dict[str, Any]]]) -> Optional[List[SyncOutcome]]:
+        started = time.perf_counter()
+        try:
+            return self.sync_batch(items)
+        except Exception as e:
+            logger.error(f"Ошибка пакетной синхронизации {len(items)} пациентов с 1С: {e}")
+            latency = time.perf_counter() - started
+            return [(patient_id, {"success": False, "error": str(e)}, latency) for patient_id, _ in items]
+
+    def _sync_one_safe(self, patient_id: int, payload: Dict[str, Any]) -> SyncOutcome:
+        started = time.perf_counter()
+        try:
+            result = self._sync_payload(patient_id, payload)
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        return patient_id, result, time.perf_counter() - started
+
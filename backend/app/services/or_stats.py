@@ -0,0 +1,216 @@
+"""Счётчики табло операционной: один агрегатный запрос и кэш до следующей записи.
+
+Счётчики считаются одним ``SELECT`` с группировкой назначений и наблюдений по пациенту.
+Результат хранится в памяти процесса вместе с «поколением» — счётчиком в Redis
+(``operating_room:stats_generation``), который увеличивает любой commit, изменивший
+пациентов, назначения или наблюдения (события сессии SQLAlchemy, в т.ч. пакетные
+``INSERT``/``UPDATE`` через ``Session.execute``). Пока поколение не изменилось, табло
+не обращается к БД. Записи в обход ORM-сессии подхватываются по ``OR_STATS_CACHE_TTL_SEC``.
+
+``INCR`` поколения уходит в отдельный поток: commit в AsyncSession вызывает слушатель
+прямо в event loop. Поколение из Redis читается не чаще раза в ``OR_STATS_GENERATION_TTL_SEC``,
+после ошибки Redis не опрашивается ``OR_STATS_REDIS_BACKOFF_SEC``. Слушатели сессии
+подключает ``register_session_listeners()`` при импорте ``app.core.database``.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import and_, case, event, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.medical import MedicalRecord, Prescription, PrescriptionStatus
+from app.models.patient import Patient, PatientStatus
+from app.services.shared_state import _get_redis
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "operating_room:stats_generation"
+TRACKED_MODELS = (Patient, Prescription, MedicalRecord)
+
+_DIRTY_FLAG = "or_stats_dirty"
+
+
+def compute_or_stats(db: Session) -> Dict[str, int]:
+    """Пять счётчиков табло одним запросом."""
+    rx = (
+        select(
+            Prescription.patient_id.label("patient_id"),
+            func.count().label("total"),
+            func.sum(case((Prescription.status == PrescriptionStatus.ACTIVE, 1), else_=0)).label("active"),
+            func.sum(case((Prescription.status == PrescriptionStatus.COMPLETED, 1), else_=0)).label("completed"),
+        )
+        .group_by(Prescription.patient_id)
+        .subquery()
+    )
+    obs = (
+        select(MedicalRecord.patient_id.label("patient_id"), func.count().label("total"))
+        .group_by(MedicalRecord.patient_id)
+        .subquery()
+    )
+    total = func.coalesce(rx.c.total, 0)
+    active = func.coalesce(rx.c.active, 0)
+    completed = func.coalesce(rx.c.completed, 0)
+    observations = func.coalesce(obs.c.total, 0)
+
+    def count_if(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+    row = db.execute(
+        select(
+            func.count(Patient.id),
+            count_if(and_(total == 0, observations == 0)),
+            count_if(active > 0),
+            count_if(and_(total > 0, completed == total)),
+            count_if(and_(total > 0, active == 0)),
+        )
+        .select_from(Patient)
+        .outerjoin(rx, rx.c.patient_id == Patient.id)
+        .outerjoin(obs, obs.c.patient_id == Patient.id)
+        .where(Patient.status == PatientStatus.ACTIVE)
+    ).one()
+    return {
+        "active_patients": int(row[0]),
+        "awaiting_examination": int(row[1]),
+        "active_prescriptions": int(row[2]),
+        "completed_prescriptions": int(row[3]),
+        "ready_for_discharge": int(row[4]),
+    }
+
+
+class OrStatsCache:
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        generation_ttl: Optional[float] = None,
+        redis_backoff: Optional[float] = None,
+    ):
+        self.ttl = float(ttl if ttl is not None else settings.OR_STATS_CACHE_TTL_SEC)
+        self.generation_ttl = float(
+            generation_ttl if generation_ttl is not None else settings.OR_STATS_GENERATION_TTL_SEC
+        )
+        self.redis_backoff = float(
+            redis_backoff if redis_backoff is not None else settings.OR_STATS_REDIS_BACKOFF_SEC
+        )
+        self._local_generation = 0
+        self._cached: Optional[Tuple[str, float, Dict[str, int]]] = None
+        self._remote: Optional[Tuple[float, str]] = None
+        self._redis_retry_at = 0.0
+        self._bump_pending = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="or-stats")
+
+    def _client(self):
+        """Клиент Redis; в окне после ошибки — None без повторного подключения."""
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        client = _get_redis()
+        if client is None:
+            self._redis_failed()
+        return client
+
+    def _redis_failed(self) -> None:
+        self._redis_retry_at = time.monotonic() + self.redis_backoff
+
+    def _remote_generation(self) -> Optional[str]:
+        remote = self._remote
+        now = time.monotonic()
+        if remote is not None and now - remote[0] < self.generation_ttl:
+            return remote[1]
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            value = str(client.get(GENERATION_KEY) or 0)
+        except Exception as exc:
+            logger.debug("OR stats generation unavailable: %s", exc)
+            self._redis_failed()
+            return None
+        self._remote = (now, value)
+        return value
+
+    def generation(self) -> str:
+        """Общее поколение из Redis; без Redis — только записи этого процесса."""
+        remote = self._remote_generation()
+        if remote is not None:
+            return f"r{remote}:{self._local_generation}"
+        return f"l{self._local_generation}"
+
+    def invalidate(self) -> None:
+        """Сбросить кэш процесса; ``INCR`` в Redis — в фоновом потоке, подряд идущие склеиваются."""
+        with self._lock:
+            self._local_generation += 1
+            self._cached = None
+            if self._bump_pending:
+                return
+            self._bump_pending = True
+        self._executor.submit(self._bump_remote)
+
+    def _bump_remote(self) -> None:
+        with self._lock:
+            self._bump_pending = False
+        client = self._client()
+        if client is None:
+            return
+        try:
+            client.incr(GENERATION_KEY)
+        except Exception as exc:
+            logger.debug("OR stats generation not bumped: %s", exc)
+            self._redis_failed()
+
+    def get(self, db: Session, generation: Optional[str] = None) -> Dict[str, int]:
+        generation = generation or self.generation()
+        cached = self._cached
+        if cached is not None and cached[0] == generation and time.monotonic() - cached[1] < self.ttl:
+            return cached[2]
+        stats = compute_or_stats(db)
+        self._cached = (generation, time.monotonic(), stats)
+        return stats
+
+
+or_stats_cache = OrStatsCache()
+
+
+def _touches_tracked(mapper) -> bool:
+    return mapper is not None and issubclass(mapper.class_, TRACKED_MODELS)
+
+
+def _mark_dirty_after_flush(session, flush_context) -> None:
+    if any(isinstance(obj, TRACKED_MODELS) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info[_DIRTY_FLAG] = True
+
+
+def _mark_dirty_on_bulk(orm_execute_state) -> None:
+    if (
+        orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    ) and _touches_tracked(orm_execute_state.bind_mapper):
+        orm_execute_state.session.info[_DIRTY_FLAG] = True
+
+
+def _invalidate_after_commit(session) -> None:
+    if session.info.pop(_DIRTY_FLAG, False):
+        or_stats_cache.invalidate()
+
+
+def _forget_after_rollback(session) -> None:
+    session.info.pop(_DIRTY_FLAG, None)
+
+
+_SESSION_LISTENERS = (
+    ("after_flush", _mark_dirty_after_flush),
+    ("do_orm_execute", _mark_dirty_on_bulk),
+    ("after_commit", _invalidate_after_commit),
+    ("after_rollback", _forget_after_rollback),
+)
+
+
+def register_session_listeners() -> None:
+    """Подключить сброс кэша к событиям всех ``Session`` (и AsyncSession); повторный вызов безопасен."""
+    for name, listener in _SESSION_LISTENERS:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
@@ -0,0 +1,203 @@
+"""Общее для всех воркеров состояние в Redis с версиями и compare-and-set.
+
+``VersionedDocument`` — JSON-документ под ключом Redis и счётчик версии рядом
+(``{key}:version``). Чтение идёт из памяти процесса, без обращения к Redis.
+Запись — ``update(mutator)``: WATCH → чтение актуальной версии → изменение → MULTI/EXEC;
+при гонке повтор. После записи в канал ``shared_state:invalidate`` уходит новая версия,
+остальные воркеры перечитывают документ (слушатель запускается из lifespan).
+
+Без Redis документ живёт только в памяти процесса (как раньше для одного воркера).
+"""
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "shared_state:invalidate"
+CAS_MAX_ATTEMPTS = 10
+
+_ORIGIN = uuid.uuid4().hex
+_redis: Optional[redis.Redis] = None
+_documents: Dict[str, "VersionedDocument"] = {}
+_listener: Optional[Any] = None
+
+
+class SharedStateConflict(Exception):
+    """Документ меняли параллельно дольше, чем хватило попыток CAS."""
+
+
+def _get_redis() -> Optional[redis.Redis]:
+    global _redis
+    if _redis is not None:
+        return _redis
+    try:
+        client = redis.from_url(settings.REDIS_URL, decode_responses=True, socket_timeout=1)
+        client.ping()
+        _redis = client
+        return _redis
+    except Exception as exc:
+        logger.warning("Shared state Redis unavailable: %s", exc)
+        return None
+
+
+class VersionedDocument:
+    def __init__(
+        self,
+        key: str,
+        default: Dict[str, Any],
+        normalize: Optional[Callable[[Any], Dict[str, Any]]] = None,
+    ):
+        self.key = key
+        self.version_key = f"{key}:version"
+        self.default = copy.deepcopy(default)
+        self.normalize = normalize
+        self._state: Dict[str, Any] = copy.deepcopy(default)
+        self._version = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        _documents[key] = self
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self) -> Dict[str, Any]:
+        """Текущее состояние из памяти; не изменять на месте — только через ``update``."""
+        if not self._loaded:
+            self.reload()
+        return self._state
+
+    def _decode(self, raw: Optional[str]) -> Dict[str, Any]:
+        data: Any = None
+        if raw:
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                logger.warning("Shared state %s: invalid JSON in Redis, using defaults", self.key)
+        if self.normalize is not None:
+            return self.normalize(data)
+        return data if isinstance(data, dict) else copy.deepcopy(self.default)
+
+    def _set_local(self, state: Dict[str, Any], version: int) -> None:
+        with self._lock:
+            if version < self._version:
+                return
+            self._state = state
+            self._version = version
+            self._loaded = True
+
+    def reload(self) -> None:
+        """Перечитать документ и версию из Redis одним MULTI."""
+        client = _get_redis()
+        if client is None:
+            self._loaded = True
+            return
+        try:
+            pipe = client.pipeline()
+            pipe.get(self.key)
+            pipe.get(self.version_key)
+            raw, version = pipe.execute()
+        except Exception as exc:
+            logger.warning("Shared state %s load failed: %s", self.key, exc)
+            self._loaded = True
+            return
+        self._set_local(self._decode(raw), int(version or 0))
+
+    def update(self, mutator: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        """CAS-обновление: ``mutator`` меняет копию актуального состояния на месте.
+
+        Исключение из ``mutator`` (например, HTTPException 404) отменяет запись.
+        """
+        client = _get_redis()
+        if client is None:
+            state = copy.deepcopy(self.get())
+            mutator(state)
+            self._set_local(state, self._version + 1)
+            return state
+        state, version = self._compare_and_set(client, mutator)
+        self._set_local(state, version)
+        try:
+            client.publish(
+                INVALIDATION_CHANNEL,
+                json.dumps({"key": self.key, "version": version, "origin": _ORIGIN}),
+            )
+        except Exception as exc:
+            logger.warning("Shared state %s invalidation publish failed: %s", self.key, exc)
+        return state
+
+    def _compare_and_set(
+        self,
+        client: redis.Redis,
+        mutator: Callable[[Dict[str, Any]], None],
+    ) -> Tuple[Dict[str, Any], int]:
+        with client.pipeline() as pipe:
+            for _ in range(CAS_MAX_ATTEMPTS):
+                try:
+                    pipe.watch(self.key, self.version_key)
+                    state = self._decode(pipe.get(self.key))
+                    mutator(state)
+                    pipe.multi()
+                    pipe.set(self.key, json.dumps(state, ensure_ascii=False))
+                    pipe.incr(self.version_key)
+                    _, version = pipe.execute()
+                    return state, int(version)
+                except redis.WatchError:
+                    continue
+        raise SharedStateConflict(f"{self.key}: too many concurrent updates")
+
+
+def _on_invalidation(message: Dict[str, Any]) -> None:
+    try:
+        payload = json.loads(message["data"])
+    except (TypeError, ValueError):
+        return
+    if payload.get("origin") == _ORIGIN:
+        return
+    document = _documents.get(payload.get("key"))
+    if document is not None and int(payload.get("version") or 0) > document.version:
+        document.reload()
+
+
+def _on_listener_error(exc: BaseException, pubsub: Any, thread: Any) -> None:
+    # redis-py переподпишется сам; пропущенные за время обрыва версии перечитываем
+    logger.warning("Shared state invalidation listener error: %s", exc)
+    time.sleep(1.0)
+    for document in list(_documents.values()):
+        document.reload()
+
+
+def start_invalidation_listener() -> None:
+    """Фоновый поток подписки на инвалидацию (вызывается из lifespan)."""
+    global _listener
+    if _listener is not None:
+        return
+    client = _get_redis()
+    if client is None:
+        return
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**{INVALIDATION_CHANNEL: _on_invalidation})
+    _listener = pubsub.run_in_thread(
+        sleep_time=1.0, daemon=True, exception_handler=_on_listener_error
+    )
+    # Изменения, пропущенные до подписки
+    for document in list(_documents.values()):
+        document.reload()
+
+
+def stop_invalidation_listener() -> None:
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
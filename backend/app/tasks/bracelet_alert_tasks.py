@@ -1,18 +1,18 @@
 """Фоновая проверка показателей браслетов."""
 from celery import shared_task
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 import logging
 
+from app.bracelet_alerts.dispatch_queue import MaxDispatchQueue
 from app.bracelet_alerts.service import BraceletAlertService
+from app.bracelet_alerts.vitals_history import prune_vitals
 from app.core.config import settings
+from app.core.database import SessionLocal
 
 logger = logging.getLogger(__name__)
 
 
 def _get_task_db():
-    engine = create_engine(settings.DATABASE_URL)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    """Сессия из общего пула процесса воркера (см. ``celery_worker``)."""
     return SessionLocal()
 
 
@@ -26,15 +26,19 @@ def check_bracelet_vitals_and_notify(self):
         service = BraceletAlertService()
         result = service.check_and_notify(db, send_to_max=True)
         logger.info(
-            "Bracelet check: alerts=%s sent=%s skipped=%s",
+            "Bracelet check: alerts=%s sent=%s queued=%s skipped=%s",
             result.alerts_found,
             result.alerts_sent,
+            result.alerts_queued,
             result.alerts_skipped_dedup,
         )
+        if result.alerts_queued:
+            deliver_max_notifications.delay()
         return {
             "success": True,
             "alerts_found": result.alerts_found,
             "alerts_sent": result.alerts_sent,
+            "alerts_queued": result.alerts_queued,
             "alerts_skipped_dedup": result.alerts_skipped_dedup,
         }
     except Exception as exc:
@@ -42,3 +46,37 @@ def check_bracelet_vitals_and_notify(self):
         raise self.retry(exc=exc, countdown=60)
     finally:
         db.close()
+
+
+@shared_task
+def deliver_max_notifications():
+    """Доставка очереди оповещений MAX (по расписанию и сразу после проверки)."""
+    result = MaxDispatchQueue().deliver_pending()
+    if result.claimed:
+        logger.info(
+            "MAX dispatch: jobs=%s messages=%s retried=%s dropped=%s deferred=%s",
+            result.claimed,
+            result.messages_sent,
+            result.retried,
+            result.dropped,
+            result.deferred,
+        )
+    return {
+        "claimed": result.claimed,
+        "messages_sent": result.messages_sent,
+        "retried": result.retried,
+        "dropped": result.dropped,
+        "deferred": result.deferred,
+    }
+
+
+@shared_task
+def prune_bracelet_vitals():
+    """Удаление истории показаний браслетов старше сроков хранения."""
+    db = _get_task_db()
+    try:
+        deleted = prune_vitals(db)
+        logger.info("Bracelet vitals pruned: %s", deleted)
+        return deleted
+    finally:
+        db.close()
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 from app.core.config import settings
 
 celery_app = Celery(
@@ -26,5 +27,52 @@ celery_app.conf.update(
             "task": "app.tasks.bracelet_alert_tasks.check_bracelet_vitals_and_notify",
             "schedule": float(settings.BRACELET_ALERT_CHECK_INTERVAL_SEC),
         },
+        "prune-bracelet-vitals-hourly": {
+            "task": "app.tasks.bracelet_alert_tasks.prune_bracelet_vitals",
+            "schedule": 3600.0,
+        },
+        "deliver-max-notifications": {
+            "task": "app.tasks.bracelet_alert_tasks.deliver_max_notifications",
+            "schedule": float(settings.MAX_DISPATCH_INTERVAL_SEC),
+        },
     },
 )
+
+
+# Пулы, где задачи выполняются потоками/гринлетами в одном процессе
+_SHARED_PROCESS_POOLS = ("threads", "gevent", "eventlet")
+
+
+def _task_db_pool_size(concurrency: int) -> int:
+    if settings.CELERY_DB_POOL_SIZE is not None:
+        return settings.CELERY_DB_POOL_SIZE
+    return max(1, concurrency)
+
+
+@worker_init.connect
+def _init_worker_db(sender=None, **kwargs):
+    """solo/threads/gevent: задачи идут в главном процессе — пул под всю конкурентность."""
+    from app.core.database import configure_engine
+
+    pool_cls = getattr(sender, "pool_cls", None)
+    pool_name = f"{getattr(pool_cls, '__module__', '')}.{getattr(pool_cls, '__name__', pool_cls)}"
+    if any(name in pool_name for name in _SHARED_PROCESS_POOLS):
+        concurrency = int(getattr(sender, "concurrency", 1) or 1)
+    else:
+        concurrency = 1
+    configure_engine(_task_db_pool_size(concurrency), settings.CELERY_DB_MAX_OVERFLOW)
+
+
+@worker_process_init.connect
+def _init_worker_process_db(**kwargs):
+    """prefork: дочерний процесс выполняет задачи по одной — свой небольшой пул."""
+    from app.core.database import configure_engine
+
+    configure_engine(_task_db_pool_size(1), settings.CELERY_DB_MAX_OVERFLOW)
+
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process_db(**kwargs):
+    from app.core import database
+
+    database.engine.dispose()
@@ -1,61 +1,119 @@
+import time
 from datetime import datetime
+from typing import Optional
 from celery import shared_task
 from app.core.config import settings
-from app.services.onec_service import OneCService
+from app.core.metrics import metrics
+from app.services.onec_service import OneCService, build_patient_payload, sync_stats
 from app.services.mit_service import sync_with_1c
-from app.crud.patient import get_patients_needing_sync, update_patient_sync_status
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from app.crud.patient import bulk_update_patient_sync_status, get_patients_needing_sync
+from app.core.database import SessionLocal
+from app.services.shared_state import _get_redis
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+ONEC_SYNC_CURSOR_KEY = "onec_sync:after_id"
+
+
 def _get_task_db():
-    engine = create_engine(settings.DATABASE_URL)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    """Сессия из общего пула процесса воркера (см. ``celery_worker``)."""
     return SessionLocal()
 
+
+def _load_sync_cursor() -> Optional[int]:
+    """id, после которого продолжить синхронизацию; None — с начала."""
+    client = _get_redis()
+    if client is None:
+        return None
+    try:
+        value = client.get(ONEC_SYNC_CURSOR_KEY)
+        return int(value) if value else None
+    except Exception as exc:
+        logger.warning("Курсор синхронизации с 1С не прочитан: %s", exc)
+        return None
+
+
+def _save_sync_cursor(after_id: Optional[int]) -> None:
+    client = _get_redis()
+    if client is None:
+        return
+    try:
+        if after_id is None:
+            client.delete(ONEC_SYNC_CURSOR_KEY)
+        else:
+            client.set(ONEC_SYNC_CURSOR_KEY, after_id)
+    except Exception as exc:
+        logger.warning("Курсор синхронизации с 1С не сохранён: %s", exc)
+
 @shared_task(bind=True, max_retries=3)
 def import_hospital_documents_from_1c(self):
     """Импорт стационарных пациентов из 1С — по расписанию Celery Beat."""
+    db = _get_task_db()
     try:
-        db = _get_task_db()
         result = sync_with_1c(db)
-        db.close()
         logger.info("✅ Импорт из 1С: %s", result.get("message", result))
         return {"success": True, **result}
     except Exception as e:
         logger.error("🔥 Ошибка импорта из 1С: %s", e)
         raise self.retry(exc=e, countdown=300)
+    finally:
+        db.close()
 
 
 @shared_task(bind=True, max_retries=3)
 def sync_patients_with_1c(self):
-    """Фоновая синхронизация пациентов с 1С (БЕЗ вебсокетов!)"""
+    """Фоновая синхронизация пациентов с 1С (БЕЗ вебсокетов!)
+
+    Страницы по ``ONEC_SYNC_PAGE_SIZE`` (keyset по id), запросы — пулом
+    ``ONEC_SYNC_WORKERS`` потоков или пакетами ``ONEC_SYNC_BATCH_SIZE``,
+    статусы страницы — одним UPDATE. Новые страницы не берутся после
+    ``ONEC_SYNC_RUN_BUDGET_SEC``; курсор (id последнего обработанного) хранится
+    в Redis, следующий запуск продолжает с него, после последней страницы — с начала.
+    """
+    if not settings.ONEC_BASE_URL:
+        logger.warning("Синхронизация с 1С пропущена: ONEC_BASE_URL не задан")
+        return {"success": False, "synced_count": 0}
+
+    db = _get_task_db()
+    onec_service = OneCService(settings.ONEC_BASE_URL)
     try:
-        db = _get_task_db()
-        
-        patients = get_patients_needing_sync(db)
-        logger.info(f"Начата синхронизация {len(patients)} пациентов с 1С")
-        
-        onec_service = OneCService(settings.ONEC_BASE_URL or "")
-        
-        synced_count = 0
-        for patient in patients:
-            try:
-                result = onec_service.sync_patient(patient)
-                update_patient_sync_status(db, patient.id, result)
-                logger.info(f"✅ Пациент {patient.id} синхронизирован")
-                synced_count += 1
-            except Exception as e:
-                logger.error(f"❌ Ошибка синхронизации {patient.id}: {e}")
-                update_patient_sync_status(db, patient.id, {"error": str(e), "success": False})
-        
-        db.close()
-        logger.info(f"✅ Синхронизация завершена. Обработано: {synced_count}/{len(patients)}")
-        return {"success": True, "synced_count": synced_count}
-    
+        started = time.perf_counter()
+        deadline = started + settings.ONEC_SYNC_RUN_BUDGET_SEC
+        page_size = max(1, settings.ONEC_SYNC_PAGE_SIZE)
+        outcomes = []
+        after_id = _load_sync_cursor()
+        while True:
+            patients = get_patients_needing_sync(db, limit=page_size, after_id=after_id)
+            if not patients:
+                after_id = None
+                break
+            after_id = patients[-1].id
+            items = [(patient.id, build_patient_payload(patient)) for patient in patients]
+            page = onec_service.sync_many(items, batch_size=settings.ONEC_SYNC_BATCH_SIZE)
+            bulk_update_patient_sync_status(db, [(patient_id, result) for patient_id, result, _ in page])
+            for patient_id, result, latency in page:
+                metrics.observe("onec_sync_request_seconds", latency)
+                if not result.get("success"):
+                    logger.error(f"❌ Ошибка синхронизации {patient_id}: {result.get('error')}")
+            outcomes.extend(page)
+            if len(patients) < page_size:
+                after_id = None
+                break
+            if time.perf_counter() > deadline:
+                break
+        _save_sync_cursor(after_id)
+
+        stats = sync_stats(outcomes, time.perf_counter() - started)
+        metrics.inc("onec_sync_patients", stats["synced"])
+        metrics.inc("onec_sync_failures", stats["failed"])
+        logger.info(f"✅ Синхронизация завершена. Обработано: {stats['synced']}/{stats['total']}, статистика: {stats}")
+        return {"success": True, "synced_count": stats["synced"], "stats": stats}
+
     except Exception as e:
         logger.error(f"🔥 Критическая ошибка: {e}")
         raise self.retry(exc=e, countdown=60)
+    finally:
+        onec_service.close()
+        db.close()
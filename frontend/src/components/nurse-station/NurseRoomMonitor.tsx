@@ -1,5 +1,6 @@
 import React, { useCallback, useEffect, useMemo, useState } from 'react';
 import { apiService } from '../../services/api';
+import { useBraceletStream, useMonitoringStream } from '../../hooks/useMonitoringStream';
 import { Bed, Patient, Room } from '../../types';
 import type { VitalAlert } from '../../types/braceletAlerts';
 import { MonitoringDashboard } from '../../types/monitoring';
@@ -20,6 +21,8 @@ import {
 import './NurseRoomMonitor.css';
 
 const POLL_MS = 4000;
+/** При живых WS monitoring:{roomId} и bracelets REST — только страховка */
+const FALLBACK_POLL_MS = 30000;
 
 interface NurseRoomMonitorProps {
   rooms: Room[];
@@ -51,6 +54,24 @@ const NurseRoomMonitor: React.FC<NurseRoomMonitorProps> = ({ rooms, onPatientSel
     }
   }, [rooms, activeRoomId]);
 
+  const { dashboard: liveDashboard, receivedAt, live: dashboardLive } =
+    useMonitoringStream(activeRoomId);
+  const { overview: liveOverview, live: braceletsLive } = useBraceletStream();
+
+  useEffect(() => {
+    if (!liveDashboard) return;
+    setDashboard(liveDashboard);
+    setLastUpdatedAt(receivedAt ?? new Date());
+    setLoading(false);
+  }, [liveDashboard, receivedAt]);
+
+  useEffect(() => {
+    if (!liveOverview) return;
+    const map = new Map<number, VitalAlert[]>();
+    liveOverview.patients.forEach((p) => map.set(p.patient_id, p.alerts));
+    setAlertsByPatient(map);
+  }, [liveOverview]);
+
   const activeRoom = useMemo(
     () => rooms.find((r) => r.id === activeRoomId) ?? null,
     [rooms, activeRoomId],
@@ -105,13 +126,21 @@ const NurseRoomMonitor: React.FC<NurseRoomMonitorProps> = ({ rooms, onPatientSel
     if (!activeRoomId) return undefined;
     void loadDashboard(false);
     void loadBraceletAlerts();
-    const timer = setInterval(() => {
-      void loadDashboard(true);
-      void loadBraceletAlerts();
-    }, POLL_MS);
-    return () => clearInterval(timer);
+    return undefined;
   }, [activeRoomId, loadDashboard, loadBraceletAlerts]);
 
+  useEffect(() => {
+    if (!activeRoomId) return undefined;
+    const timer = setInterval(
+      () => {
+        void loadDashboard(true);
+        void loadBraceletAlerts();
+      },
+      dashboardLive && braceletsLive ? FALLBACK_POLL_MS : POLL_MS,
+    );
+    return () => clearInterval(timer);
+  }, [activeRoomId, loadDashboard, loadBraceletAlerts, dashboardLive, braceletsLive]);
+
   const flattenBleMetrics = (
     metrics: Record<string, string | number | boolean | null>,
   ): Record<string, unknown> => {
@@ -1,9 +1,12 @@
 import React, { useCallback, useEffect, useRef, useState } from 'react';
 import { apiService } from '../../services/api';
+import { useMonitoringStream } from '../../hooks/useMonitoringStream';
 import { MonitoringDashboard } from '../../types/monitoring';
 import './RoomMonitoringTab.css';
 
 const MONITORING_POLL_MS = 3000;
+/** Данные идут по WS monitoring:{roomId}; REST — только страховка */
+const MONITORING_FALLBACK_POLL_MS = 30000;
 
 const METRIC_LABELS: Record<string, string> = {
   temp: 'Температура',
@@ -55,6 +58,16 @@ const RoomMonitoringTab: React.FC<RoomMonitoringTabProps> = ({ roomId }) => {
   const requestSeqRef = useRef(0);
   const hasDataRef = useRef(false);
   const inFlightRef = useRef(false);
+  const { dashboard: liveDashboard, receivedAt, live } = useMonitoringStream(roomId);
+
+  useEffect(() => {
+    if (!liveDashboard) return;
+    setDashboard(liveDashboard);
+    hasDataRef.current = true;
+    setLastRefreshedAt(receivedAt ?? new Date());
+    setInitialLoading(false);
+    setError(liveDashboard.connected ? null : liveDashboard.error || 'Сервис мониторинга недоступен');
+  }, [liveDashboard, receivedAt]);
 
   const load = useCallback(
     async (options?: { silent?: boolean; force?: boolean }) => {
@@ -113,16 +126,23 @@ const RoomMonitoringTab: React.FC<RoomMonitoringTabProps> = ({ roomId }) => {
     if (!roomId) return undefined;
 
     void load({ silent: false });
-    const interval = setInterval(() => {
-      void load({ silent: true });
-    }, MONITORING_POLL_MS);
 
     return () => {
-      clearInterval(interval);
       requestSeqRef.current += 1;
     };
   }, [roomId, load]);
 
+  useEffect(() => {
+    if (!roomId) return undefined;
+    const interval = setInterval(
+      () => {
+        void load({ silent: true });
+      },
+      live ? MONITORING_FALLBACK_POLL_MS : MONITORING_POLL_MS,
+    );
+    return () => clearInterval(interval);
+  }, [roomId, load, live]);
+
   if (!roomId) {
     return (
       <div className="monitoring-tab empty">
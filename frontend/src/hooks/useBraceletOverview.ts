@@ -1,8 +1,11 @@
 import { useCallback, useEffect, useRef, useState } from 'react';
 import { apiService } from '../services/api';
 import type { BraceletOverview } from '../types/braceletAlerts';
+import { useBraceletStream } from './useMonitoringStream';
 
 const OVERVIEW_POLL_MS = 30_000;
+/** При живом WS `bracelets` REST — только страховка */
+const OVERVIEW_FALLBACK_POLL_MS = 120_000;
 
 export function useBraceletOverview(enabled = true) {
   const [overview, setOverview] = useState<BraceletOverview | null>(null);
@@ -10,6 +13,11 @@ export function useBraceletOverview(enabled = true) {
   const [checking, setChecking] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const mountedRef = useRef(true);
+  const { overview: liveOverview, live } = useBraceletStream(enabled);
+
+  useEffect(() => {
+    if (liveOverview) setOverview(liveOverview);
+  }, [liveOverview]);
 
   useEffect(() => {
     mountedRef.current = true;
@@ -62,10 +70,13 @@ export function useBraceletOverview(enabled = true) {
 
   useEffect(() => {
     if (!enabled) return undefined;
-    void fetchOverview(false);
-    const interval = setInterval(() => void fetchOverview(true), OVERVIEW_POLL_MS);
+    if (!live) void fetchOverview(false);
+    const interval = setInterval(
+      () => void fetchOverview(true),
+      live ? OVERVIEW_FALLBACK_POLL_MS : OVERVIEW_POLL_MS,
+    );
     return () => clearInterval(interval);
-  }, [enabled, fetchOverview]);
+  }, [enabled, fetchOverview, live]);
 
   return {
     overview,
@@ -0,0 +1,109 @@
+import { useCallback, useEffect, useState } from 'react';
+import { useWebSocket, WebSocketMessage } from './useWebSocket';
+import type { MonitoringDashboard, MonitoringDelta } from '../types/monitoring';
+import type { BraceletOverview, BraceletOverviewDelta } from '../types/braceletAlerts';
+
+/** Заменяет изменившиеся элементы по ключу, удаляет removed, новые — в конец. */
+export function mergeByKey<T, K extends keyof T>(
+  items: T[],
+  changed: T[] | undefined,
+  removed: T[K][] | undefined,
+  key: K,
+): T[] {
+  if (!changed?.length && !removed?.length) return items;
+  const removedSet = new Set(removed ?? []);
+  const changedMap = new Map((changed ?? []).map((item) => [item[key], item]));
+  const result = items
+    .filter((item) => !removedSet.has(item[key]))
+    .map((item) => {
+      const next = changedMap.get(item[key]);
+      if (next) changedMap.delete(item[key]);
+      return next ?? item;
+    });
+  changedMap.forEach((item) => result.push(item));
+  return result;
+}
+
+export function applyMonitoringDelta(
+  prev: MonitoringDashboard,
+  delta: MonitoringDelta,
+): MonitoringDashboard {
+  return {
+    ...prev,
+    ...(delta.meta ?? {}),
+    atmosphere: 'atmosphere' in delta ? delta.atmosphere : prev.atmosphere,
+    beds: mergeByKey(prev.beds, delta.beds, delta.removed_beds, 'bed_id'),
+    unassigned_ble: mergeByKey(prev.unassigned_ble, delta.unassigned_ble, delta.removed_ble, 'mac'),
+    refreshed_at: delta.refreshed_at ?? prev.refreshed_at,
+  };
+}
+
+export function applyBraceletOverviewDelta(
+  prev: BraceletOverview,
+  delta: BraceletOverviewDelta,
+): BraceletOverview {
+  return {
+    ...prev,
+    ...(delta.summary ?? {}),
+    checked_at: delta.checked_at ?? prev.checked_at,
+    patients: mergeByKey(prev.patients, delta.patients, delta.removed_patients, 'patient_id'),
+    unassigned_devices: mergeByKey(
+      prev.unassigned_devices ?? [],
+      delta.unassigned_devices,
+      delta.removed_devices,
+      'mac',
+    ),
+  };
+}
+
+/**
+ * Живой дашборд палаты по WS `monitoring:{roomId}`.
+ * Сервер шлёт monitoring_snapshot при подключении, дальше — только изменения.
+ */
+export function useMonitoringStream(roomId: number | null | undefined) {
+  const [dashboard, setDashboard] = useState<MonitoringDashboard | null>(null);
+  const [receivedAt, setReceivedAt] = useState<Date | null>(null);
+
+  useEffect(() => {
+    setDashboard(null);
+    setReceivedAt(null);
+  }, [roomId]);
+
+  const onMessage = useCallback(
+    (message: WebSocketMessage) => {
+      if (message.type === 'monitoring_snapshot' && message.room_id === roomId) {
+        setDashboard(message.dashboard as MonitoringDashboard);
+        setReceivedAt(new Date());
+      }
+      if (message.type === 'monitoring_delta' && message.room_id === roomId) {
+        setDashboard((prev) => (prev ? applyMonitoringDelta(prev, message as MonitoringDelta) : prev));
+        setReceivedAt(new Date());
+      }
+    },
+    [roomId],
+  );
+
+  useWebSocket(roomId ? `monitoring:${roomId}` : '', onMessage, { allowAnonymous: true });
+
+  return { dashboard, receivedAt, live: dashboard != null };
+}
+
+/** Живой обзор браслетов по WS `bracelets` (медсестра/админ). */
+export function useBraceletStream(enabled = true) {
+  const [overview, setOverview] = useState<BraceletOverview | null>(null);
+
+  const onMessage = useCallback((message: WebSocketMessage) => {
+    if (message.type === 'bracelets_snapshot') {
+      setOverview(message.overview as BraceletOverview);
+    }
+    if (message.type === 'bracelets_delta') {
+      setOverview((prev) =>
+        prev ? applyBraceletOverviewDelta(prev, message as BraceletOverviewDelta) : prev,
+      );
+    }
+  }, []);
+
+  useWebSocket(enabled ? 'bracelets' : '', onMessage);
+
+  return { overview, live: overview != null };
+}
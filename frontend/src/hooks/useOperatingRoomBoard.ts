@@ -14,6 +14,7 @@ import type {
   OrDisplaySettings,
   OrStatsView,
 } from '../types/operatingRoom';
+import { applyStatePatch, StatePatchOp } from '../utils/statePatch';
 
 const CONFIG_POLL_MS = 3000;
 const BOARD_POLL_MS = 10000;
@@ -267,6 +268,42 @@ export function useOperatingRoomBoard(options?: { withStats?: boolean }) {
     };
   }, [applyRemoteConfig, setAtmosphereSticky, withStats]);
 
+  const applyBoardMessage = useCallback(
+    (message: WebSocketMessage) => {
+      applyRemoteConfig({
+        status: message.status,
+        updated_at: message.updated_at ?? null,
+        display: message.display ?? DEFAULT_DISPLAY,
+        announcements: message.announcements ?? [],
+        atmosphere_config: message.atmosphere_config ?? DEFAULT_ATMOSPHERE_CONFIG,
+        atmosphere: message.atmosphere,
+      });
+      if (message.atmosphere_config?.source === 'sensor') {
+        void apiService
+          .getOperatingRoomAtmosphere()
+          .then((data) => {
+            setAtmosphereSticky(data.atmosphere);
+            setAtmosphereError(data.atmosphere_error);
+          })
+          .catch(() => undefined);
+      } else if (hasAtmValues(message.atmosphere)) {
+        setAtmosphereSticky(message.atmosphere);
+      }
+    },
+    [applyRemoteConfig, setAtmosphereSticky],
+  );
+
+  // Доска по WS: полное or_board_changed, затем or_board_patch с seq; при пропуске — resync
+  const boardStateRef = useRef<WebSocketMessage | null>(null);
+  const boardSeqRef = useRef<number | null>(null);
+  const resyncPendingRef = useRef(false);
+  const sendRef = useRef<(message: object) => boolean>(() => false);
+
+  const requestResync = useCallback(() => {
+    if (resyncPendingRef.current) return;
+    resyncPendingRef.current = sendRef.current({ type: 'resync' });
+  }, []);
+
   const onWsMessage = useCallback(
     (message: WebSocketMessage) => {
       if (message.type === 'or_status_changed' && isOrStatus(message.status)) {
@@ -276,31 +313,30 @@ export function useOperatingRoomBoard(options?: { withStats?: boolean }) {
         }
       }
       if (message.type === 'or_board_changed') {
-        applyRemoteConfig({
-          status: message.status,
-          updated_at: message.updated_at ?? null,
-          display: message.display ?? DEFAULT_DISPLAY,
-          announcements: message.announcements ?? [],
-          atmosphere_config: message.atmosphere_config ?? DEFAULT_ATMOSPHERE_CONFIG,
-          atmosphere: message.atmosphere,
-        });
-        if (message.atmosphere_config?.source === 'sensor') {
-          void apiService
-            .getOperatingRoomAtmosphere()
-            .then((data) => {
-              setAtmosphereSticky(data.atmosphere);
-              setAtmosphereError(data.atmosphere_error);
-            })
-            .catch(() => undefined);
-        } else if (hasAtmValues(message.atmosphere)) {
-          setAtmosphereSticky(message.atmosphere);
+        boardStateRef.current = message;
+        boardSeqRef.current = typeof message.seq === 'number' ? message.seq : null;
+        resyncPendingRef.current = false;
+        applyBoardMessage(message);
+      }
+      if (message.type === 'or_board_patch') {
+        const base = boardStateRef.current;
+        const seq = boardSeqRef.current;
+        if (base == null || seq == null || message.seq > seq + 1) {
+          requestResync();
+          return;
         }
+        if (message.seq <= seq) return;
+        const next = applyStatePatch(base, (message.ops ?? []) as StatePatchOp[]);
+        boardStateRef.current = next;
+        boardSeqRef.current = message.seq;
+        applyBoardMessage(next);
       }
     },
-    [applyRemoteConfig, setAtmosphereSticky],
+    [applyBoardMessage, requestResync],
   );
 
-  useWebSocket('or', onWsMessage, { allowAnonymous: true });
+  const { send } = useWebSocket('or', onWsMessage, { allowAnonymous: true });
+  sendRef.current = send;
 
   return {
     status,
@@ -1,4 +1,4 @@
-import { useEffect, useRef } from 'react';
+import { useCallback, useEffect, useRef } from 'react';
 
 export interface WebSocketMessage {
   type: string;
@@ -124,4 +124,14 @@ export const useWebSocket = (
       }
     };
   }, [room, allowAnonymous]);
+
+  /** Сообщение серверу (например, resync); false — сокет сейчас не открыт. */
+  const send = useCallback((message: object): boolean => {
+    const socket = socketRef.current;
+    if (!socket || socket.readyState !== WebSocket.OPEN) return false;
+    socket.send(JSON.stringify(message));
+    return true;
+  }, []);
+
+  return { send };
 };
@@ -95,6 +95,17 @@ export interface BraceletOverview {
   unassigned_devices?: UnassignedBleDevice[];
 }
 
+/** WS bracelets — изменения относительно последнего обзора */
+export interface BraceletOverviewDelta {
+  type: 'bracelets_delta';
+  checked_at?: string;
+  summary?: Partial<BraceletOverview>;
+  patients?: PatientBraceletStatus[];
+  removed_patients?: number[];
+  unassigned_devices?: UnassignedBleDevice[];
+  removed_devices?: string[];
+}
+
 export interface BraceletCheckResult {
   checked_at: string;
   alerts_found: number;
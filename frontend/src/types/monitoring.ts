@@ -43,3 +43,16 @@ export interface MonitoringDashboard {
   refreshed_at?: string | null;
   sensors_updated_at?: string | null;
 }
+
+/** WS monitoring:{room_id} — изменения относительно последнего снимка */
+export interface MonitoringDelta {
+  type: 'monitoring_delta';
+  room_id: number;
+  refreshed_at?: string | null;
+  meta?: Partial<MonitoringDashboard>;
+  atmosphere?: AtmosphereView | null;
+  beds?: BedMonitoringView[];
+  removed_beds?: number[];
+  unassigned_ble?: BleDeviceView[];
+  removed_ble?: string[];
+}
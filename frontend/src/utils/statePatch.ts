@@ -0,0 +1,55 @@
+/**
+ * Патчи состояния из WebSocket (зеркало backend `app/core/ws_delta.py`).
+ * Новые элементы списков по ключу — в начало, если сервер не прислал `order`.
+ */
+export type StatePatchOp =
+  | { op: 'set'; path: string[]; value: unknown }
+  | { op: 'del'; path: string[] }
+  | {
+      op: 'list';
+      path: string[];
+      key: string;
+      remove?: unknown[];
+      upsert?: Record<string, unknown>[];
+      order?: unknown[];
+    };
+
+type Obj = Record<string, any>;
+
+function applyList(items: Obj[], op: Extract<StatePatchOp, { op: 'list' }>): Obj[] {
+  const { key } = op;
+  const byKey = new Map<unknown, Obj>(items.map((item) => [item[key], item]));
+  const removed = new Set(op.remove ?? []);
+  removed.forEach((k) => byKey.delete(k));
+  const added: unknown[] = [];
+  (op.upsert ?? []).forEach((item) => {
+    if (!byKey.has(item[key])) added.push(item[key]);
+    byKey.set(item[key], item);
+  });
+  const order =
+    op.order ?? [...added, ...items.map((item) => item[key]).filter((k) => !removed.has(k))];
+  return order.filter((k) => byKey.has(k)).map((k) => byKey.get(k)!);
+}
+
+/** Возвращает новый объект; исходное состояние не меняется. */
+export function applyStatePatch<T extends Obj>(state: T, ops: StatePatchOp[]): T {
+  const root: Obj = { ...state };
+  ops.forEach((op) => {
+    const parents = op.path.slice(0, -1);
+    const last = op.path[op.path.length - 1];
+    let target = root;
+    parents.forEach((part) => {
+      const child = target[part];
+      target[part] = child && typeof child === 'object' ? { ...child } : {};
+      target = target[part];
+    });
+    if (op.op === 'del') {
+      delete target[last];
+    } else if (op.op === 'list') {
+      target[last] = applyList(Array.isArray(target[last]) ? target[last] : [], op);
+    } else {
+      target[last] = op.value;
+    }
+  });
+  return root as T;
+}